@@ -5,70 +5,437 @@
 # Authors: Edoardo Sabatini - Data Worker and ChatGPT 3.5 Python Programmer
 # Date: May 22, 2024
 
-from flask import Flask, jsonify, request
+from flask import Flask, g, jsonify, request
+import click
+import base64
+import binascii
 import json
-from data_simulation import Prize  # Importing Prize from data_simulation.py
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from itertools import islice
+from types import MappingProxyType
+from data_simulation import Prize, PrizeDetails  # Importing Prize and PrizeDetails from data_simulation.py
+from metrics import Registry
+from profiling import RequestProfiler
+from query_planner import TEXT_FIELDS
+from response_cache import ResponseCache
+from snapshot import write_snapshot
+from sort_index import parse_sort
+from sqlite_storage import SQLitePrizeStore
 
 app = Flask(__name__)
 app.json.sort_keys = False
 
-prize = Prize()
+# Size of the generated mock data, configurable through the environment for load testing
+app.config.from_mapping(
+    NUM_CATALOGS=int(os.environ.get("PRIZE_NUM_CATALOGS", 5)),
+    PRIZES_PER_CATALOG=int(os.environ.get("PRIZE_PRIZES_PER_CATALOG", 10)),
+    LAZY_MOCK_DATA=os.environ.get("PRIZE_LAZY_MOCK_DATA", "false").lower() == "true",
+    RESPONSE_CACHE_SIZE=int(os.environ.get("PRIZE_RESPONSE_CACHE_SIZE", 1024)),
+    QUERY_CACHE_SIZE=int(os.environ.get("PRIZE_QUERY_CACHE_SIZE", 1024)),  # Parsed query strings of the listing endpoints kept in an LRU cache
+    EXPORT_CHUNK_SIZE=256,  # Number of NDJSON lines written per chunk of a streamed export
+    BATCH_MAX_OPERATIONS=int(os.environ.get("PRIZE_BATCH_MAX_OPERATIONS", 1000)),
+    STORAGE=os.environ.get("PRIZE_STORAGE", "memory"),  # "memory", "sqlite" or "shared"
+    SQLITE_PATH=os.environ.get("PRIZE_SQLITE_PATH", "prizes.db"),
+    SNAPSHOT_PATH=os.environ.get("PRIZE_SNAPSHOT_PATH"),  # Binary snapshot to load the in-memory catalogs from
+    SHARED_MEMORY_NAME=os.environ.get("PRIZE_SHARED_MEMORY_NAME", "prizes"),  # Prefix of the shared memory segment names
+    ASGI_WORKERS=int(os.environ.get("PRIZE_ASGI_WORKERS", 32)),  # Worker threads running requests under asgi_app.py
+    SEARCH_WORKERS=int(os.environ.get("PRIZE_SEARCH_WORKERS", 8)),  # Threads counting the matches of catalogs for /api/prizes/search
+    SEARCH_MAX_CATALOGS=int(os.environ.get("PRIZE_SEARCH_MAX_CATALOGS", 64)),  # Most catalogs a search counting its total may span
+    SEARCH_MAX_DEPTH=int(os.environ.get("PRIZE_SEARCH_MAX_DEPTH", 1000)),  # Most matches a search page may read from one catalog
+    # Request profiling, off unless PRIZE_PROFILING is set to true
+    PROFILING=os.environ.get("PRIZE_PROFILING", "false").lower() == "true",
+    PROFILE_DIR=os.environ.get("PRIZE_PROFILE_DIR", "profiles"),
+    PROFILE_MAX_FILES=int(os.environ.get("PRIZE_PROFILE_MAX_FILES", 100)),  # Older .pstats files are removed beyond this
+    PROFILE_ENDPOINTS=[endpoint for endpoint in os.environ.get("PRIZE_PROFILE_ENDPOINTS", "").split(",") if endpoint],
+    PROFILE_TOKEN=os.environ.get("PRIZE_PROFILE_TOKEN"),  # Value of the X-Profile header that asks for a profile
+    PROFILE_SAMPLE_EVERY=int(os.environ.get("PRIZE_PROFILE_SAMPLE_EVERY", 0)),  # Profile 1 in N list_prizes requests, 0 to disable
+)
+
+def create_store(config):
+    """Create the prize storage engine selected by the configuration."""
+    if config["STORAGE"] == "sqlite":
+        return SQLitePrizeStore(config["SQLITE_PATH"], config["NUM_CATALOGS"], config["PRIZES_PER_CATALOG"])
+    if config["STORAGE"] == "shared":
+        from shared_storage import SharedMemoryPrizeStore  # Imported here because it needs fcntl, which only exists on POSIX
+        return SharedMemoryPrizeStore(config["SHARED_MEMORY_NAME"], config["NUM_CATALOGS"], config["PRIZES_PER_CATALOG"])
+    return Prize(config["NUM_CATALOGS"], config["PRIZES_PER_CATALOG"], config["LAZY_MOCK_DATA"], config["SNAPSHOT_PATH"])
+
+prize = create_store(app.config)
+response_cache = ResponseCache(app.config["RESPONSE_CACHE_SIZE"])
+search_executor = ThreadPoolExecutor(app.config["SEARCH_WORKERS"], thread_name_prefix="prize-search")
+
+metrics = Registry()
+request_seconds = metrics.histogram("prize_request_duration_seconds", "Time spent handling a request, by endpoint and method.", ("endpoint", "method"))
+requests_total = metrics.counter("prize_requests_total", "Requests handled, by endpoint, method and status code.", ("endpoint", "method", "status"))
+stage_seconds = metrics.histogram("prize_stage_duration_seconds", "Time spent in each stage of a request, by endpoint and stage.", ("endpoint", "stage"))
+
+@app.before_request
+def start_request_timer():
+    g.request_started = g.stage_started = time.perf_counter()
+
+@app.after_request
+def record_request_metrics(response):
+    # Streamed responses are timed until their headers are ready, not until the last chunk is sent
+    endpoint = request.endpoint or "unmatched"
+    request_seconds.observe(time.perf_counter() - g.request_started, endpoint, request.method)
+    requests_total.inc(endpoint, request.method, str(response.status_code))
+    return response
+
+profiler = RequestProfiler(app.config["PROFILE_DIR"], app.config["PROFILE_MAX_FILES"], app.config["PROFILE_ENDPOINTS"],
+                           app.config["PROFILE_TOKEN"], app.config["PROFILE_SAMPLE_EVERY"])
+
+@app.before_request
+def start_profiling():
+    g.profile = None
+    if app.config["PROFILING"]:
+        g.profile_reason = profiler.reason(request.endpoint, request.headers, app.debug)
+        if g.profile_reason:
+            g.profile = profiler.start()
+
+@app.after_request
+def finish_profiling(response):
+    if g.get("profile") is not None:
+        response.headers["X-Profile-File"] = profiler.finish(g.profile, request.endpoint or "unmatched", g.profile_reason)
+    return response
+
+@app.teardown_request
+def stop_profiling(exception):
+    # Also reached when the view raised, in which case finish_profiling did not run
+    if g.get("profile") is not None:
+        g.profile.disable()
+
+def end_stage(stage):
+    """Record the time spent since the previous stage of the request ended, or since it started, under the given stage."""
+    now = time.perf_counter()
+    stage_seconds.observe(now - g.stage_started, request.endpoint, stage)
+    g.stage_started = now
+
+def json_response(body, status=200):
+    """Wrap already serialized JSON bytes in a response."""
+    return app.response_class(body, status=status, mimetype=app.json.mimetype)
+
+def prizes_json(prizes, total, **extra):
+    """Assemble a prize listing by concatenating the cached JSON fragment of each prize."""
+    extra_fields = b"".join(b',"%s":%s' % (key.encode(), json.dumps(value).encode()) for key, value in extra.items())
+    return b'{"total":%s,"prizes":[%s]%s}\n' % (json.dumps(total).encode(), b",".join(prize.to_json() for prize in prizes), extra_fields)
+
+def encode_cursor(catalog_id, prize_id):
+    """Encode the position after a prize as an opaque pagination cursor."""
+    return base64.urlsafe_b64encode(f"{catalog_id}:{prize_id}".encode()).decode().rstrip("=")
+
+def decode_cursor(cursor, catalog_id):
+    """Decode a pagination cursor issued for the given catalog, returning the prize ID to resume after or None if invalid."""
+    try:
+        decoded = base64.urlsafe_b64decode(str(cursor) + "=" * (-len(str(cursor)) % 4)).decode()
+    except (binascii.Error, UnicodeDecodeError):
+        return None
+    cursor_catalog, _, prize_id = decoded.partition(":")
+    if cursor_catalog != str(catalog_id) or not prize_id.isdigit():
+        return None
+    return int(prize_id)
 
-def validate_params(params):
+def validate_params(params, kind=dict):
+    """Decode a JSON parameter of the given kind, an object by default. Returns an empty one if missing, or None if invalid."""
     try:
-        return json.loads(params) if params else {}
+        value = json.loads(params) if params else kind()
     except json.JSONDecodeError:
         return None
+    return value if isinstance(value, kind) else None
 
-@app.route("/api/catalogs/<catalog_id>/prizes", methods=["GET"])
-def list_prizes(catalog_id):
-    # Validate catalog_id
-    if not catalog_id.isdigit() or int(catalog_id) < 1 or int(catalog_id) > 5:
-        return jsonify({"error": "Catalog ID should be an integer between 1 and 5."}), 400
-    
-    catalog_id = int(catalog_id)  # Convert to integer after validation
-    
-    filter_param = request.args.get("filter")
-    pagination_param = request.args.get("pagination")
-    
-    filter_dict = validate_params(filter_param)
-    pagination_dict = validate_params(pagination_param)
-    
-    # Validate pagination parameters
-    if pagination_dict:
-        page = pagination_dict.get('page')
-        per_page = pagination_dict.get('per_page')
-        if not str(page).isdigit() or not str(per_page).isdigit() or int(page) < 1 or int(per_page) < 1 or int(per_page) > 10:
-            return jsonify({"error": "Invalid pagination format. Page and per_page should be positive integers with per_page no greater than 10."}), 400
-    
+def filter_error(filter_dict):
+    """Return the error message if the filter parameters are invalid, otherwise None."""
     if filter_dict:
         # Validate filter parameters
         if 'id' in filter_dict and (not str(filter_dict['id']).isdigit() or int(filter_dict['id']) < 1):
-            return jsonify({"error": "Filter ID should be a positive integer."}), 400
+            return "Filter ID should be a positive integer."
         
-        if 'description' in filter_dict and len(filter_dict['description']) > 80:
-            return jsonify({"error": "Filter description should not exceed 80 characters."}), 400
+        for field in TEXT_FIELDS:
+            if field in filter_dict and not isinstance(filter_dict[field], str):
+                return f"Filter {field} should be a string."
+            if field in filter_dict and len(filter_dict[field]) > 80:
+                return f"Filter {field} should not exceed 80 characters."
         
-        if 'logical_operator' in filter_dict and filter_dict['logical_operator'].upper() not in ['AND', 'OR']:
-            return jsonify({"error": "Invalid logical operator. Use 'AND' or 'OR'."}), 400
-    
+        operator = filter_dict.get('logical_operator', 'OR')
+        if not isinstance(operator, str) or operator.upper() not in ['AND', 'OR']:
+            return "Invalid logical operator. Use 'AND' or 'OR'."
+    return None
+
+PAGE_ERROR = "Invalid pagination format. Page and per_page should be positive integers with per_page no greater than 10."
+
+def valid_page(page, per_page):
+    """Check the page and per_page of page-numbered pagination."""
+    return str(page).isdigit() and str(per_page).isdigit() and int(page) >= 1 and 1 <= int(per_page) <= 10
+
+class ListQuery:
+    """
+    The validated and normalized filter, pagination, sort and catalogs of a listing request, or the error rejecting them.
+    One instance is shared by every request with the same raw parameters, so it is never modified.
+    """
+    __slots__ = ("filter", "pagination", "sort", "catalogs", "error", "key")
+
+    def __init__(self, filter=None, pagination=None, sort=None, catalogs=None, error=None):
+        self.filter = MappingProxyType(filter or {})
+        self.pagination = MappingProxyType(pagination or {})
+        self.sort = sort  # (field, descending) tuple, or None for the ID order
+        self.catalogs = catalogs  # Sorted tuple of catalog IDs, or None for every catalog
+        self.error = error
+        # Canonical form of the filter, pagination and sort, used in response cache keys
+        self.key = (json.dumps(filter or {}, sort_keys=True), json.dumps(pagination or {}, sort_keys=True), sort)
+
+def parse_listing(filter_param, pagination_param, sort_param=None):
+    """Parse the parameters of list_prizes. A pagination cursor is kept as is, as it is decoded against the catalog of each request."""
+    filter_dict = validate_params(filter_param)
+    pagination_dict = validate_params(pagination_param)
     if filter_dict is None or pagination_dict is None:
-        return jsonify({"error": "Invalid filter or pagination format."}), 400
+        return ListQuery(error="Invalid filter or pagination format.")
+    sort = parse_sort(sort_param)
+    if sort is False:
+        return ListQuery(error="Invalid sort. Use id, title, description or image, with a leading - for descending order.")
+
+    pagination = {}
+    if pagination_dict and 'after' in pagination_dict:
+        # Cursor pagination: resume after the prize encoded in the next_cursor of the previous page
+        per_page = pagination_dict.get('per_page')
+        if not str(per_page).isdigit() or int(per_page) < 1 or int(per_page) > 10:
+            return ListQuery(error="Invalid pagination format. per_page should be a positive integer no greater than 10.")
+        if sort is not None:
+            return ListQuery(error="Cursor pagination only supports the default ID order.")
+        pagination = {"after": pagination_dict['after'], "per_page": int(per_page)}
+    elif pagination_dict:
+        if not valid_page(pagination_dict.get('page'), pagination_dict.get('per_page')):
+            return ListQuery(error=PAGE_ERROR)
+        pagination = {"page": int(pagination_dict['page']), "per_page": int(pagination_dict['per_page'])}
+
+    error = filter_error(filter_dict)
+    if error:
+        return ListQuery(error=error)
+    return ListQuery(filter_dict, pagination, sort)
+
+def parse_export(filter_param):
+    """Parse the parameters of export_prizes."""
+    filter_dict = validate_params(filter_param)
+    if filter_dict is None:
+        return ListQuery(error="Invalid filter format.")
+    error = filter_error(filter_dict)
+    if error:
+        return ListQuery(error=error)
+    return ListQuery(filter_dict)
+
+def parse_search(filter_param, pagination_param, catalogs_param):
+    """Parse the parameters of search_prizes, which pages through the first 10 matches by default."""
+    filter_dict = validate_params(filter_param)
+    pagination_dict = validate_params(pagination_param)
+    catalogs_list = validate_params(catalogs_param, list)
+    if filter_dict is None or pagination_dict is None or catalogs_list is None:
+        return ListQuery(error="Invalid filter, pagination or catalogs format.")
+
+    page = pagination_dict.get('page', 1)
+    per_page = pagination_dict.get('per_page', 10)
+    if not valid_page(page, per_page):
+        return ListQuery(error=PAGE_ERROR)
+
+    error = filter_error(filter_dict)
+    if error:
+        return ListQuery(error=error)
+
+    # All catalogs are searched unless a non-empty list of catalog IDs is given
+    catalogs = None
+    if catalogs_param:
+        if not catalogs_list or not all(str(catalog_id).isdigit() for catalog_id in catalogs_list):
+            return ListQuery(error="Catalogs should be a non-empty list of catalog IDs.")
+        catalogs = tuple(sorted({int(catalog_id) for catalog_id in catalogs_list}))
+    return ListQuery(filter_dict, {"page": int(page), "per_page": int(per_page)}, catalogs=catalogs)
+
+@lru_cache(maxsize=app.config["QUERY_CACHE_SIZE"])
+def parse_query(parser, *params):
+    """
+    Parse raw query parameters with the parser of an endpoint into a ListQuery, memoized in one LRU cache
+    shared by the listing endpoints, as most requests repeat a few distinct query strings.
+    """
+    return parser(*params)
+
+@app.route("/api/catalogs/<catalog_id>/prizes", methods=["GET"])
+def list_prizes(catalog_id):
+    # Validate catalog_id
+    max_catalog_id = app.config["NUM_CATALOGS"]
+    if not catalog_id.isdigit() or int(catalog_id) < 1 or int(catalog_id) > max_catalog_id:
+        return jsonify({"error": f"Catalog ID should be an integer between 1 and {max_catalog_id}."}), 400
     
-    prizes = prize.get_prizes(catalog_id, filter_dict, pagination_dict)
+    catalog_id = int(catalog_id)  # Convert to integer after validation
     
-    if prizes is None:
-        return jsonify({"error": f"Catalog {catalog_id} not found. The catalog ID should be an integer between 1 and 5."}), 404
+    query = parse_query(parse_listing, request.args.get("filter"), request.args.get("pagination"), request.args.get("sort"))
+    if query.error:
+        return jsonify({"error": query.error}), 400
+    filter_dict, pagination_dict = query.filter, query.pagination
+
+    after_id = None
+    if pagination_dict.get('after') is not None:
+        after_id = decode_cursor(pagination_dict['after'], catalog_id)
+        if after_id is None:
+            return jsonify({"error": "Invalid pagination cursor."}), 400
     
-    prizes_list = [prize.__dict__ for prize in prizes]
-    total_prizes = len(prizes_list)
+    # The total number of matches can be skipped with total=false to stop as soon as the page is filled
+    with_total = request.args.get("total", "true").lower() != "false"
+
+    # explain=true reports the plan chosen for the filter; it always runs the query, bypassing the cache
+    if request.args.get("explain", "false").lower() == "true":
+        if 'after' in pagination_dict:
+            return jsonify({"error": "The explain option is not available with cursor pagination."}), 400
+        end_stage("validation")
+        result = prize.explain_prizes(catalog_id, filter_dict, pagination_dict, with_total, query.sort)
+        end_stage("storage")
+        if result is None:
+            return jsonify({"error": f"Catalog {catalog_id} not found. The catalog ID should be an integer between 1 and {max_catalog_id}."}), 404
+        prizes, total_prizes, plan = result
+        return json_response(prizes_json(prizes, total_prizes, plan=plan))
+    end_stage("validation")
+
+    # The catalog version changes with every mutation, so it doubles as the ETag of the listing
+    version = prize.catalog_version(catalog_id)
+    etag = f"{catalog_id}.{version}"
+    if version is not None and request.if_none_match.contains(etag):
+        not_modified = app.response_class(status=304)
+        not_modified.set_etag(etag)
+        return not_modified
+
+    cache_key = (catalog_id, version, *query.key, with_total)
+    body = response_cache.get(cache_key)
+    if body is None:
+        cursor_mode = 'after' in pagination_dict
+        if cursor_mode:
+            result = prize.find_prizes_after(catalog_id, filter_dict, after_id, pagination_dict['per_page'])
+        else:
+            result = prize.find_prizes(catalog_id, filter_dict, pagination_dict, with_total, query.sort)
+        end_stage("storage")
+        
+        if result is None:
+            return jsonify({"error": f"Catalog {catalog_id} not found. The catalog ID should be an integer between 1 and {max_catalog_id}."}), 404
+        
+        if cursor_mode:
+            # Counting every match would defeat keyset pagination, so cursor pages carry no total
+            prizes, next_after_id = result
+            next_cursor = encode_cursor(catalog_id, next_after_id) if next_after_id is not None else None
+            body = prizes_json(prizes, None, next_cursor=next_cursor)
+        else:
+            prizes, total_prizes = result
+            body = prizes_json(prizes, total_prizes)
+        response_cache.put(cache_key, body)
+        end_stage("serialization")
+    else:
+        end_stage("cache")
     
-    response = {
-        "total": total_prizes,
-        "prizes": prizes_list
-    }
+    response = json_response(body)
+    response.set_etag(etag)
+    return response
+
+# Stream every matching prize of a catalog as newline-delimited JSON
+@app.route("/api/catalogs/<catalog_id>/prizes/export", methods=["GET"])
+def export_prizes(catalog_id):
+    # Validate catalog_id
+    max_catalog_id = app.config["NUM_CATALOGS"]
+    if not catalog_id.isdigit() or int(catalog_id) < 1 or int(catalog_id) > max_catalog_id:
+        return jsonify({"error": f"Catalog ID should be an integer between 1 and {max_catalog_id}."}), 400
     
-    return jsonify(response)
+    catalog_id = int(catalog_id)
+
+    query = parse_query(parse_export, request.args.get("filter"))
+    if query.error:
+        return jsonify({"error": query.error}), 400
+
+    matches = prize.iter_prizes(catalog_id, query.filter)
+    if matches is None:
+        return jsonify({"error": f"Catalog {catalog_id} not found."}), 404
+
+    def generate():
+        # Prizes are pulled lazily from the filter stage and written in small chunks of lines
+        chunk_size = app.config["EXPORT_CHUNK_SIZE"]
+        while True:
+            chunk = b"".join(prize_item.to_json() + b"\n" for prize_item in islice(matches, chunk_size))
+            if not chunk:
+                break
+            yield chunk
+
+    return app.response_class(generate(), mimetype="application/x-ndjson")
+
+def search_catalogs(catalog_ids, filter_dict, start, per_page):
+    """
+    Return one page of the prizes matching the filter across catalogs, in (catalog ID, prize ID) order,
+    as a list of (catalog ID, prize) pairs. The catalogs are walked in order, each read only until the page is filled,
+    and the walk stops at the first catalog that fills it; a catalog never yields more than start + per_page matches.
+    """
+    matches = []
+    skipped = 0  # Matches of the catalogs walked so far that fall before the page
+    for catalog_id in catalog_ids:
+        wanted = start - skipped + per_page - len(matches)
+        result = prize.find_prizes(catalog_id, filter_dict, {"page": 1, "per_page": wanted}, with_total=False)
+        found = [] if result is None else result[0]
+        before = min(start - skipped, len(found))
+        skipped += before
+        matches.extend((catalog_id, prize_item) for prize_item in found[before:])
+        if len(matches) == per_page:
+            break
+    return matches
+
+def count_catalogs(catalog_ids, filter_dict):
+    """
+    Return the total number of prizes matching the filter across catalogs. Counting reads every match of every catalog,
+    so it runs on the search pool: the threads overlap the I/O of the SQLite engine, while the in-memory engines
+    are bound by the GIL and gain nothing over counting one catalog after another.
+    """
+    def count(catalog_id):
+        result = prize.find_prizes(catalog_id, filter_dict, {"page": 1, "per_page": 1})
+        return 0 if result is None else result[1]
+
+    return sum(search_executor.map(count, catalog_ids))
+
+# Search prizes across catalogs
+@app.route("/api/prizes/search", methods=["GET"])
+def search_prizes():
+    query = parse_query(parse_search, request.args.get("filter"), request.args.get("pagination"), request.args.get("catalogs"))
+    if query.error:
+        return jsonify({"error": query.error}), 400
+    filter_dict = query.filter
+    page, per_page = query.pagination['page'], query.pagination['per_page']
+
+    existing_ids = sorted(prize.catalog_ids())
+    if query.catalogs is not None:
+        catalog_ids = list(query.catalogs)
+        missing = sorted(set(catalog_ids).difference(existing_ids))
+        if missing:
+            return jsonify({"error": f"Catalog {missing[0]} not found."}), 404
+    else:
+        catalog_ids = existing_ids
+
+    # Counting the total reads every match of every catalog, so it can be skipped with total=false
+    with_total = request.args.get("total", "true").lower() != "false"
+    max_catalogs = app.config["SEARCH_MAX_CATALOGS"]
+    if with_total and len(catalog_ids) > max_catalogs:
+        return jsonify({"error": f"A search counting its total can span at most {max_catalogs} catalogs; "
+                                 "select them with the catalogs parameter or pass total=false."}), 400
+    max_depth = app.config["SEARCH_MAX_DEPTH"]
+    if page * per_page > max_depth:
+        return jsonify({"error": f"A search page can't reach past the first {max_depth} matches."}), 400
+    end_stage("validation")
+
+    # The versions of the searched catalogs identify the state the response was computed from
+    versions = tuple((catalog_id, prize.catalog_version(catalog_id)) for catalog_id in catalog_ids)
+    cache_key = ("search", versions, *query.key, with_total)
+    body = response_cache.get(cache_key)
+    if body is None:
+        matches = search_catalogs(catalog_ids, filter_dict, (page - 1) * per_page, per_page)
+        total = count_catalogs(catalog_ids, filter_dict) if with_total else None
+        end_stage("storage")
+        # Each cached prize fragment gets the ID of its catalog prepended
+        items = b",".join(b'{"catalog_id":%d,%s' % (catalog_id, prize_item.to_json()[1:]) for catalog_id, prize_item in matches)
+        body = b'{"total":%s,"prizes":[%s]}\n' % (json.dumps(total).encode(), items)
+        response_cache.put(cache_key, body)
+        end_stage("serialization")
+    else:
+        end_stage("cache")
+    return json_response(body)
 
 @app.route("/api/catalogs/<catalog_id>/prize/<prize_id>", methods=["GET"])
 def get_prize(catalog_id, prize_id):
@@ -79,15 +446,24 @@ def get_prize(catalog_id, prize_id):
     catalog_id = int(catalog_id)
     prize_id = int(prize_id)
 
-    prizes = prize.get_prizes(catalog_id)
-    if prizes is None:
+    end_stage("validation")
+    prize_item = prize.get_prize(catalog_id, prize_id)
+    if prize_item is None and not prize.has_catalog(catalog_id):
         return jsonify({"error": f"Catalog {catalog_id} not found."}), 404
-
-    prize_item = next((p for p in prizes if p.id == prize_id), None)
     if prize_item is None:
         return jsonify({"error": f"Prize with ID {prize_id} not found in catalog {catalog_id}."}), 404
+    end_stage("storage")
 
-    return jsonify(prize_item.__dict__), 200
+    body = prize_item.to_json() + b"\n"
+    end_stage("serialization")
+    return json_response(body)
+
+def fields_error(fields):
+    """Return the error message if a prize field is not a string, otherwise None."""
+    for field in PrizeDetails.EDITABLE_FIELDS:
+        if field in fields and not isinstance(fields[field], str):
+            return f"Prize {field} should be a string."
+    return None
 
 # Update the details of a specific prize in a catalog
 @app.route("/api/catalogs/<catalog_id>/prize/<prize_id>", methods=["PUT"])
@@ -103,30 +479,34 @@ def update_prize(catalog_id, prize_id):
     data = request.json
     
     # Check if valid data is provided for prize update
-    if not data:
+    if not data or not isinstance(data, dict):
         return jsonify({"error": "No data provided for update."}), 400
 
-    # Get the existing prize details
-    existing_prize = prize.get_prize(catalog_id, prize_id)
-    if existing_prize is None:
+    error = fields_error(data)
+    if error:
+        return jsonify({"error": error}), 400
+
+    # Update only the attributes provided in the JSON request. The changes are applied as a
+    # one-operation batch, so they are merged into the stored prize while the catalog is locked
+    # and concurrent updates of other fields are not lost
+    changes = {key: value for key, value in data.items() if key in PrizeDetails.EDITABLE_FIELDS}
+    end_stage("validation")
+    outcomes = prize.apply_batch(catalog_id, [{"op": "update", "id": prize_id, "prize": changes}])
+    end_stage("storage")
+    updated_prize = outcomes[0] if outcomes else None
+    if updated_prize is None:
         return jsonify({"error": f"Prize with ID {prize_id} not found in catalog {catalog_id}."}), 404
 
-    # Update only the attributes provided in the JSON request
-    for key, value in data.items():
-        setattr(existing_prize, key, value)
-
-    # Save the updated prize
-    updated_prize = prize.update_prize(catalog_id, prize_id, existing_prize)
-
     # Return the updated prize details
-    return jsonify(updated_prize.__dict__), 200
+    return jsonify(updated_prize.to_dict()), 200
 
 # Create a new prize within a catalog
 @app.route("/api/catalogs/<catalog_id>/prize", methods=["POST"])
 def create_prize(catalog_id):
     # Check if the catalog ID is a valid integer
-    if not catalog_id.isdigit() or int(catalog_id) < 1 or int(catalog_id) > 5:
-        return jsonify({"error": "Catalog ID should be a valid integer between 1 and 5."}), 400
+    max_catalog_id = app.config["NUM_CATALOGS"]
+    if not catalog_id.isdigit() or int(catalog_id) < 1 or int(catalog_id) > max_catalog_id:
+        return jsonify({"error": f"Catalog ID should be a valid integer between 1 and {max_catalog_id}."}), 400
     
     catalog_id = int(catalog_id)
 
@@ -134,14 +514,87 @@ def create_prize(catalog_id):
     data = request.json
     
     # Check if valid data is provided for creating the prize
-    if not data:
+    if not data or not isinstance(data, dict):
         return jsonify({"error": "No data provided for creating prize."}), 400
+
+    if any(field not in data for field in PrizeDetails.EDITABLE_FIELDS):
+        return jsonify({"error": "A new prize needs a title, a description and an image."}), 400
+
+    error = fields_error(data)
+    if error:
+        return jsonify({"error": error}), 400
     
+    end_stage("validation")
     new_prize = prize.create_prize(catalog_id, data)
+    end_stage("storage")
     if new_prize is None:
         return jsonify({"error": f"Catalog {catalog_id} not found."}), 404
 
-    return jsonify(new_prize.__dict__), 201
+    return jsonify(new_prize.to_dict()), 201
+
+def validate_batch_operation(operation):
+    """Return an error message if a batch operation is malformed, otherwise None."""
+    if not isinstance(operation, dict) or operation.get('op') not in ('create', 'update', 'delete'):
+        return "Each operation should be an object with 'op' set to 'create', 'update' or 'delete'."
+
+    if operation['op'] != 'create' and (not str(operation.get('id')).isdigit() or int(operation['id']) < 1):
+        return "Prize ID should be a positive integer."
+
+    fields = operation.get('prize')
+    if operation['op'] == 'create' and (not isinstance(fields, dict) or any(key not in fields for key in PrizeDetails.EDITABLE_FIELDS)):
+        return "A new prize needs a title, a description and an image."
+
+    if operation['op'] == 'update' and (not isinstance(fields, dict) or not fields):
+        return "No data provided for update."
+
+    return fields_error(fields) if operation['op'] != 'delete' else None
+
+# Apply many prize creations, updates and deletions within a catalog in one request
+@app.route("/api/catalogs/<catalog_id>/prizes:batch", methods=["POST"])
+def batch_prizes(catalog_id):
+    # Check if the catalog ID is a valid integer
+    max_catalog_id = app.config["NUM_CATALOGS"]
+    if not catalog_id.isdigit() or int(catalog_id) < 1 or int(catalog_id) > max_catalog_id:
+        return jsonify({"error": f"Catalog ID should be a valid integer between 1 and {max_catalog_id}."}), 400
+    
+    catalog_id = int(catalog_id)
+
+    data = request.get_json(silent=True)
+    operations = data.get('operations') if isinstance(data, dict) else None
+    if not isinstance(operations, list) or not operations:
+        return jsonify({"error": "Provide a non-empty list of operations."}), 400
+
+    max_operations = app.config["BATCH_MAX_OPERATIONS"]
+    if len(operations) > max_operations:
+        return jsonify({"error": f"A batch should not exceed {max_operations} operations."}), 400
+
+    # Malformed operations get their own error result, the valid ones are applied together
+    results = [None] * len(operations)
+    valid = []
+    for position, operation in enumerate(operations):
+        error = validate_batch_operation(operation)
+        if error:
+            results[position] = {"status": 400, "error": error}
+        else:
+            if operation['op'] != 'create':
+                operation = dict(operation, id=int(operation['id']))
+            valid.append((position, operation))
+
+    end_stage("validation")
+    outcomes = prize.apply_batch(catalog_id, [operation for _, operation in valid])
+    end_stage("storage")
+    if outcomes is None:
+        return jsonify({"error": f"Catalog {catalog_id} not found."}), 404
+
+    for (position, operation), outcome in zip(valid, outcomes):
+        if outcome is None:
+            results[position] = {"status": 404, "error": f"Prize with ID {operation['id']} not found in catalog {catalog_id}."}
+        elif operation['op'] == 'delete':
+            results[position] = {"status": 200, "message": f"Prize with ID {operation['id']} in catalog with ID {catalog_id} deleted successfully."}
+        else:
+            results[position] = {"status": 201 if operation['op'] == 'create' else 200, "prize": outcome.to_dict()}
+
+    return jsonify({"results": results}), 200
 
 # Delete a specific prize within a catalog
 @app.route("/api/catalogs/<catalog_id>/prize/<prize_id>", methods=["DELETE"])
@@ -153,7 +606,9 @@ def delete_prize(catalog_id, prize_id):
     catalog_id = int(catalog_id)
     prize_id = int(prize_id)
 
+    end_stage("validation")
     success = prize.delete_prize(catalog_id, prize_id)
+    end_stage("storage")
     if not success:
         return jsonify({"error": f"Prize with ID {prize_id} not found in catalog {catalog_id}."}), 404
 
@@ -162,7 +617,7 @@ def delete_prize(catalog_id, prize_id):
 # List all catalogs
 @app.route("/api/catalogs", methods=["GET"])
 def list_catalogs():
-    catalogs = prize.catalog.catalogs
+    catalogs = prize.catalog_ids()
     catalog_list = [{"id": id, "name": f"Catalog {id}"} for id in catalogs]
     
     return jsonify({"catalogs": catalog_list}), 200
@@ -175,7 +630,7 @@ def get_catalog(catalog_id):
     except ValueError:
         return jsonify({"error": "Catalog ID should be a valid integer."}), 400
 
-    if catalog_id not in prize.catalog.catalogs:
+    if not prize.has_catalog(catalog_id):
         return jsonify({"error": "Catalog not found."}), 404
     
     catalog_details = {
@@ -188,12 +643,13 @@ def get_catalog(catalog_id):
 @app.route("/api/catalog/<catalog_id>", methods=["DELETE"])
 def delete_catalog(catalog_id):
     # Check if the catalog ID is a valid integer
-    if not catalog_id.isdigit() or int(catalog_id) < 1 or int(catalog_id) > 5:
-        return jsonify({"error": "Catalog ID should be a valid integer between 1 and 5."}), 400
+    max_catalog_id = app.config["NUM_CATALOGS"]
+    if not catalog_id.isdigit() or int(catalog_id) < 1 or int(catalog_id) > max_catalog_id:
+        return jsonify({"error": f"Catalog ID should be a valid integer between 1 and {max_catalog_id}."}), 400
     
     catalog_id = int(catalog_id)
 
-    success = prize.catalog.delete_catalog(catalog_id)
+    success = prize.delete_catalog(catalog_id)
     if not success:
         return jsonify({"error": f"Catalog {catalog_id} not found."}), 404
 
@@ -205,18 +661,39 @@ def create_catalog():
     # Retrieve the data for the new catalog from the JSON request
     data = request.json
 
-    # Determine the first available catalog ID
-    existing_ids = set(prize.catalog.catalogs.keys())
-    available_id = 1
-    while available_id in existing_ids:
-        available_id += 1
-
-    success = prize.catalog.create_catalog(available_id)
-    if not success:
-        return jsonify({"error": f"Failed to create catalog with ID {available_id}."}), 500
+    # The store allocates the first available catalog ID
+    available_id = prize.allocate_catalog()
 
     return jsonify({"message": f"Catalog with ID {available_id} created successfully.", "catalog_id": available_id}), 201
 
+# Expose the request metrics in the Prometheus text format
+@app.route("/metrics", methods=["GET"])
+def export_metrics():
+    return app.response_class(metrics.render(), mimetype="text/plain; version=0.0.4")
+
+@app.cli.command("save-snapshot")
+@click.argument("path")
+def save_snapshot(path):
+    """Write every catalog to a binary snapshot file that PRIZE_SNAPSHOT_PATH can load at startup."""
+    written = write_snapshot(prize, path)
+    click.echo(f"Wrote {written} prizes to {path}")
+
+@app.cli.command("destroy-shared-memory")
+def destroy_shared_memory():
+    """Remove the shared memory segments of the store, once no worker uses them anymore."""
+    if app.config["STORAGE"] != "shared":
+        raise click.UsageError("PRIZE_STORAGE is not set to shared.")
+    prize.destroy()
+    click.echo(f"Removed the shared memory segments of {app.config['SHARED_MEMORY_NAME']}")
+
 if __name__ == "__main__":
+    mode = "registered lazily" if app.config["LAZY_MOCK_DATA"] else "generated"
+    if app.config["STORAGE"] == "sqlite":
+        mode = f"opened from {app.config['SQLITE_PATH']}"
+    elif app.config["STORAGE"] == "shared":
+        mode = f"attached in shared memory as {app.config['SHARED_MEMORY_NAME']}"
+    elif app.config["SNAPSHOT_PATH"]:
+        mode = f"mapped from {app.config['SNAPSHOT_PATH']}"
+    print(f"Mock data: {app.config['NUM_CATALOGS']} catalogs x {app.config['PRIZES_PER_CATALOG']} prizes {mode} in {prize.startup_seconds:.3f}s")
     app.run(debug=True, port=5000)
 
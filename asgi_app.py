@@ -0,0 +1,110 @@
+# asgi_app.py - ASGI entry point for the prize API
+# This script exposes the Flask API on an asyncio event loop, for ASGI servers such as uvicorn or hypercorn.
+# Connections are held by the event loop; only requests being processed take a worker thread.
+
+# Authors: Edoardo Sabatini - Data Worker and ChatGPT 3.5 Python Programmer
+# Date: May 22, 2024
+
+import asyncio
+import io
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from app import app
+
+class AsgiAdapter:
+    """
+    Serves a WSGI application over ASGI.
+    The application, which may block on storage calls, runs on a bounded pool of worker threads,
+    and streamed responses are pulled from the pool one chunk at a time.
+    """
+    def __init__(self, wsgi_app, max_workers=32):
+        self.wsgi_app = wsgi_app
+        self.executor = ThreadPoolExecutor(max_workers, thread_name_prefix="prize-api")
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            await self.lifespan(receive, send)
+        elif scope["type"] == "http":
+            await self.http(scope, receive, send)
+        else:
+            raise ValueError(f"Unsupported ASGI scope type {scope['type']!r}")
+
+    async def lifespan(self, receive, send):
+        """Answer the server's startup and shutdown events, stopping the worker threads on shutdown."""
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                self.executor.shutdown(wait=True)
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    async def http(self, scope, receive, send):
+        """Handle one HTTP request."""
+        body = bytearray()
+        while True:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                return
+            body += message.get("body", b"")
+            if not message.get("more_body"):
+                break
+
+        loop = asyncio.get_running_loop()
+        response = {}
+
+        def start_response(status, headers, exc_info=None):
+            response["status"] = int(status.split(" ", 1)[0])
+            response["headers"] = [(name.lower().encode("latin-1"), value.encode("latin-1")) for name, value in headers]
+            return lambda data: None  # The legacy write() callable is not used by Flask
+
+        environ = self.environ(scope, bytes(body))
+        chunks = await loop.run_in_executor(self.executor, self.wsgi_app, environ, start_response)
+        iterator = iter(chunks)
+        try:
+            await send({"type": "http.response.start", "status": response["status"], "headers": response["headers"]})
+            while True:
+                chunk = await loop.run_in_executor(self.executor, next, iterator, None)
+                if chunk is None:
+                    break
+                if chunk:
+                    await send({"type": "http.response.body", "body": chunk, "more_body": True})
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+        finally:
+            if hasattr(chunks, "close"):
+                await loop.run_in_executor(self.executor, chunks.close)
+
+    @staticmethod
+    def environ(scope, body):
+        """Build the WSGI environment of a request from its ASGI scope."""
+        server_name, server_port = scope.get("server") or ("localhost", 80)
+        environ = {
+            "REQUEST_METHOD": scope["method"],
+            "SCRIPT_NAME": scope.get("root_path", "").encode("utf-8").decode("latin-1"),
+            "PATH_INFO": scope["path"].encode("utf-8").decode("latin-1"),
+            "QUERY_STRING": scope.get("query_string", b"").decode("latin-1"),
+            "SERVER_NAME": server_name,
+            "SERVER_PORT": str(server_port),
+            "SERVER_PROTOCOL": f"HTTP/{scope.get('http_version', '1.1')}",
+            "REMOTE_ADDR": (scope.get("client") or ("", 0))[0],
+            "CONTENT_LENGTH": str(len(body)),
+            "wsgi.version": (1, 0),
+            "wsgi.url_scheme": scope.get("scheme", "http"),
+            "wsgi.input": io.BytesIO(body),
+            "wsgi.errors": sys.stderr,
+            "wsgi.multithread": True,
+            "wsgi.multiprocess": False,
+            "wsgi.run_once": False,
+        }
+        for name, value in scope.get("headers", []):
+            name = name.decode("latin-1").upper().replace("-", "_")
+            value = value.decode("latin-1")
+            if name == "CONTENT_TYPE":
+                environ["CONTENT_TYPE"] = value
+            elif name != "CONTENT_LENGTH":
+                key = f"HTTP_{name}"
+                environ[key] = f"{environ[key]},{value}" if key in environ else value
+        return environ
+
+application = AsgiAdapter(app, app.config["ASGI_WORKERS"])
@@ -0,0 +1,162 @@
+# benchmark_api.py
+# This script benchmarks every API endpoint through the Flask test client at several data sizes.
+# It reports operations per second and latency percentiles, saves them as a JSON baseline
+# and fails when a later run regresses beyond a threshold.
+
+# Authors: Edoardo Sabatini - Data Worker and ChatGPT 3.5 Python Programmer
+# Date: May 22, 2024
+
+import argparse
+import json
+import sys
+import time
+import app as api_module
+from app import app
+from data_simulation import Prize
+from metrics import percentile
+from response_cache import ResponseCache
+
+NUM_CATALOGS = 2  # Catalog 1 is queried and changed, catalog 2 only exists so catalog routes have something to list
+NEW_PRIZE = {"title": "Benchmark prize", "description": "Created by the benchmark", "image": "https://example.com/benchmark.png"}
+
+def scenarios(size):
+    """
+    Return the benchmark scenarios for catalogs of the given size, as (name, expected status, request) tuples.
+    Each request is a function of the test client and a state dictionary shared by the scenarios of a run.
+    Read scenarios come first so the mutations don't change what they measure.
+    """
+    first_id = 1
+    middle_id = first_id + size // 2
+    last_page = max((size + 9) // 10, 1)
+    selective = f"prize {middle_id} "  # Matches the description of the middle prize only
+
+    def listing(query):
+        return lambda client, state: client.get(f"/api/catalogs/1/prizes?{query}")
+
+    def create(client, state):
+        response = client.post("/api/catalogs/1/prize", json=NEW_PRIZE)
+        state["created"].append(response.get_json()["id"])
+        return response
+
+    def delete(client, state):
+        return client.delete(f"/api/catalogs/1/prize/{state['created'].pop()}")
+
+    def batch(client, state):
+        operations = [{"op": "create", "prize": NEW_PRIZE} for _ in range(5)]
+        operations += [{"op": "delete", "id": state["created"].pop()} for _ in range(min(5, len(state["created"])))]
+        response = client.post("/api/catalogs/1/prizes:batch", json={"operations": operations})
+        state["created"].extend(result["prize"]["id"] for result in response.get_json()["results"] if "prize" in result)
+        return response
+
+    return [
+        ("list_first_page", 200, listing('pagination={"page":1,"per_page":10}')),
+        ("list_without_total", 200, listing('pagination={"page":1,"per_page":10}&total=false')),
+        ("list_deep_page", 200, listing(f'pagination={{"page":{last_page},"per_page":10}}')),
+        ("list_id_filter", 200, listing(f'filter={{"id":"{middle_id}"}}')),
+        ("list_description_filter", 200, listing(f'filter={{"description":"{selective}"}}')),
+        ("list_description_broad", 200, listing('filter={"description":"script"}&pagination={"page":1,"per_page":10}&total=false')),
+        ("list_and_filter", 200, listing(f'filter={{"id":"{middle_id}","description":"{selective}","logical_operator":"AND"}}')),
+        ("list_or_filter", 200, listing(f'filter={{"id":"{first_id}","description":"{selective}","logical_operator":"OR"}}')),
+        ("list_cursor_deep", 200, lambda client, state: client.get(
+            f'/api/catalogs/1/prizes?pagination={{"after":"{api_module.encode_cursor(1, middle_id)}","per_page":10}}')),
+        ("export_filtered", 200, lambda client, state: client.get(f'/api/catalogs/1/prizes/export?filter={{"description":"{selective}"}}')),
+        ("get_prize", 200, lambda client, state: client.get(f"/api/catalogs/1/prize/{middle_id}")),
+        ("list_catalogs", 200, lambda client, state: client.get("/api/catalogs")),
+        ("get_catalog", 200, lambda client, state: client.get("/api/catalog/1")),
+        ("update_prize", 200, lambda client, state: client.put(f"/api/catalogs/1/prize/{middle_id}", json={"title": "Benchmarked"})),
+        ("create_prize", 201, create),
+        ("batch_prizes", 200, batch),
+        ("delete_prize", 200, delete),
+    ]
+
+def run(sizes, iterations, warmup=5, use_cache=False):
+    """Run every scenario at every size and return the results keyed by 'size/scenario'."""
+    results = {}
+    app.config["TESTING"] = True
+    original_store, original_cache = api_module.prize, api_module.response_cache
+    try:
+        for size in sizes:
+            started = time.perf_counter()
+            api_module.prize = Prize(NUM_CATALOGS, size)
+            api_module.response_cache = ResponseCache(api_module.response_cache.max_entries if use_cache else 0)
+            print(f"Catalogs of {size} prizes generated in {time.perf_counter() - started:.2f}s", file=sys.stderr)
+
+            state = {"created": []}
+            with app.test_client() as client:
+                for name, expected_status, request in scenarios(size):
+                    timings = []
+                    for iteration in range(warmup + iterations):
+                        request_started = time.perf_counter()
+                        response = request(client, state)
+                        elapsed = time.perf_counter() - request_started
+                        if response.status_code != expected_status:
+                            raise AssertionError(f"{name} at {size} prizes returned {response.status_code} instead of {expected_status}")
+                        if iteration >= warmup:
+                            timings.append(elapsed)
+
+                    timings.sort()
+                    results[f"{size}/{name}"] = {
+                        "ops_per_sec": round(len(timings) / sum(timings), 1),
+                        "p50_ms": round(percentile(timings, 0.50) * 1000, 4),
+                        "p95_ms": round(percentile(timings, 0.95) * 1000, 4),
+                        "p99_ms": round(percentile(timings, 0.99) * 1000, 4),
+                    }
+    finally:
+        api_module.prize, api_module.response_cache = original_store, original_cache
+    return results
+
+def compare(results, baseline, threshold):
+    """Return a description of every result slower than its baseline by more than the threshold fraction."""
+    regressions = []
+    for key, result in results.items():
+        reference = baseline.get(key)
+        if reference is None:
+            continue
+        if result["ops_per_sec"] < reference["ops_per_sec"] * (1 - threshold):
+            regressions.append(f"{key}: {result['ops_per_sec']} ops/s, baseline {reference['ops_per_sec']} ops/s")
+        if result["p95_ms"] > reference["p95_ms"] * (1 + threshold):
+            regressions.append(f"{key}: p95 {result['p95_ms']} ms, baseline {reference['p95_ms']} ms")
+    return regressions
+
+def report(results):
+    """Print the results as a table."""
+    print(f"{'Benchmark':<40} {'ops/s':>10} {'p50 ms':>10} {'p95 ms':>10} {'p99 ms':>10}")
+    for key, result in results.items():
+        print(f"{key:<40} {result['ops_per_sec']:>10.1f} {result['p50_ms']:>10.3f} {result['p95_ms']:>10.3f} {result['p99_ms']:>10.3f}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the API endpoints through the Flask test client.")
+    parser.add_argument("--sizes", default="10,10000,1000000", help="Comma-separated prizes per catalog (default: 10,10000,1000000)")
+    parser.add_argument("--iterations", type=int, default=200, help="Measured requests per scenario (default: 200)")
+    parser.add_argument("--cache", action="store_true", help="Keep the list_prizes response cache enabled")
+    parser.add_argument("--baseline", default="benchmark_baseline.json", help="Baseline file (default: benchmark_baseline.json)")
+    parser.add_argument("--save-baseline", action="store_true", help="Write the results to the baseline file instead of comparing")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Allowed slowdown as a fraction of the baseline (default: 0.2)")
+    args = parser.parse_args()
+
+    results = run([int(size) for size in args.sizes.split(",")], args.iterations, use_cache=args.cache)
+    report(results)
+
+    if args.save_baseline:
+        with open(args.baseline, "w") as baseline_file:
+            json.dump(results, baseline_file, indent=2)
+        print(f"Baseline saved to {args.baseline}")
+        return
+
+    try:
+        with open(args.baseline) as baseline_file:
+            baseline = json.load(baseline_file)
+    except FileNotFoundError:
+        print(f"No baseline at {args.baseline}; run with --save-baseline to create one")
+        return
+
+    regressions = compare(results, baseline, args.threshold)
+    if regressions:
+        print(f"Regressions beyond {args.threshold:.0%}:")
+        for regression in regressions:
+            print(f"  {regression}")
+        sys.exit(1)
+    print(f"No regression beyond {args.threshold:.0%} against {args.baseline}")
+
+if __name__ == "__main__":
+    main()
@@ -5,8 +5,12 @@
 # Authors: Edoardo Sabatini - Data Worker and ChatGPT 3.5 Python Programmer
 # Date: May 22, 2024
 
+import uuid
 import pytest
+import app as api_module
 from app import app
+from data_simulation import Prize
+from sqlite_storage import SQLitePrizeStore
 
 @pytest.fixture
 def client():
@@ -16,3 +20,39 @@ def client():
         with app.app_context():
             yield client
 
+
+@pytest.fixture
+def prize_store(monkeypatch):
+    """Fixture to give a test its own freshly generated prize store, leaving the shared one untouched."""
+    store = Prize()
+    monkeypatch.setattr(api_module, "prize", store)
+    api_module.response_cache.clear()
+    return store
+
+
+@pytest.fixture
+def sqlite_store(monkeypatch, tmp_path):
+    """Fixture to serve the API from a fresh SQLite database in a temporary directory."""
+    store = SQLitePrizeStore(str(tmp_path / "prizes.db"))
+    monkeypatch.setattr(api_module, "prize", store)
+    api_module.response_cache.clear()
+    yield store
+    store.close()
+
+
+@pytest.fixture
+def shared_store(monkeypatch, tmp_path):
+    """Fixture to serve the API from fresh shared memory segments with a unique name."""
+    from shared_storage import SharedMemoryPrizeStore
+    name = f"prizes-test-{uuid.uuid4().hex[:12]}"
+    store = SharedMemoryPrizeStore(name, lock_path=str(tmp_path / "prizes.lock"))
+    monkeypatch.setattr(api_module, "prize", store)
+    api_module.response_cache.clear()
+    yield store
+    store.destroy()
+
+
+@pytest.fixture(params=["prize_store", "sqlite_store", "shared_store"])
+def store(request):
+    """Fixture to run a test against every storage engine: in memory, SQLite and shared memory."""
+    return request.getfixturevalue(request.param)
@@ -4,175 +4,788 @@
 # Authors: Edoardo Sabatini - Data Worker and ChatGPT 3.5 Python Programmer
 # Date: May 22, 2024
 
+import json
+import queue
+import threading
+import time
+from bisect import bisect_left, bisect_right, insort
+from functools import partial
+from itertools import count, islice
+from operator import attrgetter
+from id_allocator import CatalogIdAllocator, PrizeIdSequence
+from query_planner import CANDIDATES, EXACT, plan_filter
+from rwlock import ReadWriteLock
+from snapshot import Snapshot
+from sort_index import OrderedView, SortedIndex
+from storage import PrizeStore
+from text_index import NGRAM_SIZE, NgramIndex
+
+MOCK_BATCH_SIZE = 10000  # Number of mock prizes generated and indexed at a time
+COMPACTION_THRESHOLD = 0.25  # Fraction of tombstones in a catalog list above which it is compacted
+ITER_CHUNK_SIZE = 1000  # Number of prizes read under the catalog lock at a time when iterating over a catalog
+
+# Catalog versions are drawn from one process-wide clock seeded with the start time,
+# so a version is never reused, even after a restart or when a catalog is deleted and recreated
+_version_clock = count(time.time_ns() // 1000)
+
 class PrizeDetails:
-    """Represents a prize."""
+    """Represents a prize. Slotted so that millions of prizes do not each carry a __dict__."""
+    __slots__ = ("id", "title", "description", "image", "_json")
+    EDITABLE_FIELDS = ("title", "description", "image")
+
     def __init__(self, id, title, description, image):
         self.id = id
         self.title = title
         self.description = description
         self.image = image
+        self._json = None  # Serialized JSON fragment, built on first use
+
+    def to_dict(self):
+        """Return the prize data as a dictionary ready to be serialized."""
+        return {"id": self.id, "title": self.title, "description": self.description, "image": self.image}
+
+    def to_json(self):
+        """Return the prize serialized as compact JSON bytes, reusing the cached fragment."""
+        if self._json is None:
+            self._json = json.dumps(self.to_dict(), separators=(",", ":")).encode()
+        return self._json
+
+class Tombstone:
+    """Marks the slot of a deleted prize until its catalog is compacted. Falsy, so scans skip it with filter(None, ...)."""
+    __slots__ = ("id",)
+
+    def __init__(self, id):
+        self.id = id  # Kept so the catalog list can still be searched by ID
+
+    def __bool__(self):
+        return False
+
+class LiveView:
+    """
+    Read-only view of the live prizes of a catalog list holding tombstones.
+    Positions count live prizes only, so pages are sliced as if the list were compacted.
+    """
+    __slots__ = ("prizes", "tombstones")
+
+    def __init__(self, prizes, tombstones):
+        self.prizes = prizes
+        self.tombstones = tombstones  # Sorted positions of the tombstones in prizes
+
+    def __len__(self):
+        return len(self.prizes) - len(self.tombstones)
+
+    def __iter__(self):
+        return filter(None, self.prizes)
+
+    def __getitem__(self, item):
+        if isinstance(item, slice):
+            start, stop, _ = item.indices(len(self))
+            return list(islice(filter(None, map(self.prizes.__getitem__, range(self.raw_position(start), len(self.prizes)))),
+                               max(stop - start, 0)))
+        if item < 0:
+            item += len(self)
+        if not 0 <= item < len(self):
+            raise IndexError("live prize position out of range")
+        return self.prizes[self.raw_position(item)]
+
+    def raw_position(self, position):
+        """Return the position in the list of the live prize at the given live position."""
+        tombstones = self.tombstones
+        # tombstones[i] - i live prizes precede the i-th tombstone, a non-decreasing count
+        return position + bisect_right(range(len(tombstones)), position, key=lambda i: tombstones[i] - i)
+
+class Compactor:
+    """Compacts catalog lists on a background thread, one catalog per step, started on first use unless autostart is off."""
+    def __init__(self, autostart=True):
+        self.queue = queue.Queue()
+        self.autostart = autostart
+        self.thread = None
+        self.lock = threading.Lock()
+
+    def schedule(self, catalog, catalog_id):
+        """Queue a catalog to be compacted under its write lock."""
+        self.queue.put((catalog, catalog_id))
+        if self.autostart:
+            self.start()
+
+    def start(self):
+        """Start the background thread if it isn't running yet."""
+        with self.lock:
+            if self.thread is None:
+                self.thread = threading.Thread(target=self.run, name="prize-compactor", daemon=True)
+                self.thread.start()
+
+    def run(self):
+        while True:
+            catalog, catalog_id = self.queue.get()
+            try:
+                with catalog.lock(catalog_id).write():
+                    catalog.compact(catalog_id)
+            finally:
+                self.queue.task_done()
+
+    def wait(self):
+        """Wait until every scheduled compaction is done."""
+        self.queue.join()
+
+COMPACTOR = Compactor()  # Shared by every in-memory store of the process
 
 class Catalog:
-    """Represents a catalog of prizes."""
+    """Represents a catalog of prizes.
+
+    Prizes are appended in ascending ID order, so each catalog list stays sorted by ID.
+    Catalogs registered with a loader are only materialized the first time they are accessed.
+    Prize objects are never modified once added: updates replace them, so a reader holding a prize never sees it half updated.
+    Deleted prizes leave a tombstone in the list, which keeps positions stable; once tombstones exceed COMPACTION_THRESHOLD
+    of a list, the compactor removes them. Without a compactor, the list is compacted by the deletion itself.
+    Callers guard each catalog with the reader/writer lock returned by lock(), and catalog creation and deletion with catalogs_lock.
+    """
     def __init__(self):
         self.catalogs = {}
         self.offsets = {}  # Dictionary to store offsets for each catalog
+        self.indexes = {}  # Dictionary to store the prize ID -> prize index for each catalog
+        self.description_indexes = {}  # Dictionary to store the description n-gram index for each catalog, built on first search
+        self.sort_indexes = {}  # Dictionary to store the sorted indexes of each catalog by field, built on first sorted listing
+        self.loaders = {}  # Dictionary to store the batch loaders of catalogs not materialized yet
+        self.loaded_prize_ids = {}  # Dictionary to store the next prize ID of catalogs not materialized yet
+        self.versions = {}  # Dictionary to store the version of each catalog, bumped by every mutation
+        self.sequences = {}  # Dictionary to store the prize ID sequence of each catalog
+        self.tombstones = {}  # Dictionary to store the sorted list positions of the tombstones of each catalog
+        self.compaction_pending = set()  # Catalogs queued for compaction
+        self.compactor = COMPACTOR
+        self.catalog_id_allocator = CatalogIdAllocator()  # Hands out the lowest free catalog ID
+        self.locks = {}  # Dictionary to store the reader/writer lock of each catalog
+        self.build_locks = {}  # Dictionary to store the lock serializing the lazy index builds of each catalog
+        self.catalogs_lock = threading.Lock()  # Serializes catalog creation and deletion
+        self.materialize_lock = threading.Lock()  # Serializes the materialization of lazily registered catalogs
+
+    def _init_catalog(self, catalog_id):
+        """Set up the empty storage and indexes of a catalog."""
+        self.catalogs[catalog_id] = []
+        self.offsets[catalog_id] = (catalog_id - 1) * 10  # Calculate offset
+        self.indexes[catalog_id] = {}
+        self.description_indexes[catalog_id] = None
+        self.sort_indexes[catalog_id] = {}
+        self.sequences[catalog_id] = PrizeIdSequence()
+        self.tombstones[catalog_id] = []
+        self.catalog_id_allocator.reserve(catalog_id)
+        self.bump_version(catalog_id)
+
+    def _materialize(self, catalog_id):
+        """Generate a lazily registered catalog on first access. Concurrent first accesses wait for it to be complete."""
+        if catalog_id not in self.loaders:
+            return
+        with self.materialize_lock:
+            loader = self.loaders.get(catalog_id)
+            if loader is None:
+                return  # Materialized by another thread in the meantime
+            version = self.versions[catalog_id]
+            self._init_catalog(catalog_id)
+            for batch in loader():
+                self._append(catalog_id, batch)
+            self.sequences[catalog_id].advance(self.loaded_prize_ids.pop(catalog_id, 1) - 1)  # Keep deleted IDs retired
+            self.versions[catalog_id] = version  # Materializing does not change the catalog contents
+            del self.loaders[catalog_id]  # Only now do other threads stop waiting for the catalog
+
+    def lock(self, catalog_id):
+        """Return the reader/writer lock of the specified catalog, creating it on first use."""
+        lock = self.locks.get(catalog_id)
+        if lock is None:
+            lock = self.locks.setdefault(catalog_id, ReadWriteLock())
+        return lock
+
+    def build_lock(self, catalog_id):
+        """
+        Return the lock serializing the lazy index builds of a catalog, creating it on first use.
+        Indexes are built by readers, which share the catalog lock, so concurrent first readers take it to build only once.
+        """
+        lock = self.build_locks.get(catalog_id)
+        if lock is None:
+            lock = self.build_locks.setdefault(catalog_id, threading.Lock())
+        return lock
+
+    def register_loader(self, catalog_id, loader, next_prize_id=1):
+        """
+        Register a catalog whose prizes are produced by loader(), a callable yielding lists of prizes, on first access.
+        The prize ID sequence of the catalog starts at next_prize_id, or after its last prize if that is higher.
+        """
+        self.loaded_prize_ids[catalog_id] = next_prize_id
+        self.loaders[catalog_id] = loader
+        self.catalog_id_allocator.reserve(catalog_id)
+        self.bump_version(catalog_id)
+
+    def bump_version(self, catalog_id):
+        """Give the specified catalog a new version after a mutation."""
+        self.versions[catalog_id] = next(_version_clock)
+
+    def version(self, catalog_id):
+        """Return the current version of the specified catalog, or None if it doesn't exist."""
+        return self.versions.get(catalog_id)
+
+    def catalog_ids(self):
+        """
+        Return the IDs of all catalogs, including the ones not materialized yet. Both dictionaries are copied before use,
+        as materialization moves catalogs from one to the other; the loaders are copied first, so a catalog moved
+        in between is still found in the catalogs.
+        """
+        loaders = list(self.loaders)
+        catalogs = list(self.catalogs)
+        materialized = set(catalogs)
+        return catalogs + [catalog_id for catalog_id in loaders if catalog_id not in materialized]
+
+    def has_catalog(self, catalog_id):
+        """Check whether the specified catalog exists."""
+        return catalog_id in self.catalogs or catalog_id in self.loaders
 
     def add_prize(self, catalog_id, prize):
         """Add a prize to the specified catalog."""
+        self.add_prizes(catalog_id, [prize])
+
+    def add_prizes(self, catalog_id, prizes):
+        """Add a batch of prizes, in ascending ID order, to the specified catalog."""
+        self._materialize(catalog_id)
         if catalog_id not in self.catalogs:
-            self.catalogs[catalog_id] = []
-            self.offsets[catalog_id] = (catalog_id - 1) * 10  # Calculate offset
-        self.catalogs[catalog_id].append(prize)
+            self._init_catalog(catalog_id)
+        self._append(catalog_id, prizes)
+        self.bump_version(catalog_id)
+
+    def _append(self, catalog_id, prizes):
+        """
+        Append prizes to the list and indexes of an initialized catalog.
+        The index changes are worked out first, so a prize that can't be indexed leaves the catalog unchanged.
+        """
+        description_index = self.description_indexes[catalog_id]
+        description_grams = [description_index.grams(prize.description) for prize in prizes] if description_index is not None else []
+        added = []  # Sort index insertions, undone if a later one fails
+        try:
+            for sort_index in self.sort_indexes[catalog_id].values():
+                for prize in prizes:
+                    sort_index.add(prize)
+                    added.append((sort_index, prize))
+        except Exception:
+            for sort_index, prize in added:
+                sort_index.remove(prize)
+            raise
+
+        self.catalogs[catalog_id].extend(prizes)
+        self.indexes[catalog_id].update((prize.id, prize) for prize in prizes)
+        if prizes:
+            self.sequences[catalog_id].advance(prizes[-1].id)
+        for prize, grams in zip(prizes, description_grams):
+            description_index.add_grams(prize.id, grams)
+
+    def allocate_prize_id(self, catalog_id):
+        """Return a new prize ID from the sequence of the specified catalog, which must exist."""
+        self._materialize(catalog_id)
+        return self.sequences[catalog_id].allocate()
+
+    def next_prize_id(self, catalog_id):
+        """Return the next prize ID of the specified catalog without allocating it, or None if the catalog doesn't exist."""
+        self._materialize(catalog_id)
+        sequence = self.sequences.get(catalog_id)
+        return None if sequence is None else sequence.next_id
 
     def get_catalog(self, catalog_id):
-        """Retrieve the prizes for the specified catalog."""
-        return self.catalogs.get(catalog_id, [])
+        """Retrieve the live prizes for the specified catalog: its list, or a LiveView of it while it holds tombstones."""
+        self._materialize(catalog_id)
+        prizes = self.catalogs.get(catalog_id)
+        if prizes is None:
+            return []
+        tombstones = self.tombstones[catalog_id]
+        return LiveView(prizes, tombstones) if tombstones else prizes
+
+    def find_prize(self, catalog_id, prize_id):
+        """Look up a prize by ID in the specified catalog using the catalog index."""
+        self._materialize(catalog_id)
+        index = self.indexes.get(catalog_id)
+        if index is None:
+            return None
+        return index.get(prize_id)
+
+    def remove_prize(self, catalog_id, prize_id):
+        """Remove a prize by ID from the specified catalog."""
+        return self.remove_prizes(catalog_id, [prize_id]) == 1
+
+    def remove_prizes(self, catalog_id, prize_ids):
+        """Remove a batch of prizes by ID from the specified catalog, returning how many were removed."""
+        self._materialize(catalog_id)
+        index = self.indexes.get(catalog_id)
+        if index is None:
+            return 0
+
+        removed = [index.pop(prize_id) for prize_id in set(prize_ids) if prize_id in index]
+        if not removed:
+            return 0
+
+        description_index = self.description_indexes[catalog_id]
+        if description_index is not None:
+            for prize in removed:
+                description_index.remove(prize.id, prize.description)
+        for sort_index in self.sort_indexes[catalog_id].values():
+            for prize in removed:
+                sort_index.remove(prize)
+
+        # Replace the removed prizes with tombstones instead of shifting the rest of the list
+        prizes = self.catalogs[catalog_id]
+        tombstones = self.tombstones[catalog_id]
+        for prize in removed:
+            position = bisect_left(prizes, prize.id, key=lambda item: item.id)
+            if not (position < len(prizes) and prizes[position] is prize):
+                position = prizes.index(prize)  # Fall back to a scan if the ID order was not respected
+            prizes[position] = Tombstone(prize.id)
+            insort(tombstones, position)
+        self.bump_version(catalog_id)
+
+        if len(tombstones) > COMPACTION_THRESHOLD * len(prizes) and catalog_id not in self.compaction_pending:
+            if self.compactor is None:
+                self.compact(catalog_id)
+            else:
+                self.compaction_pending.add(catalog_id)
+                self.compactor.schedule(self, catalog_id)
+        return len(removed)
+
+    def compact(self, catalog_id):
+        """Remove the tombstones of a catalog list. Contents, indexes and version are unchanged, so pages stay the same."""
+        self.compaction_pending.discard(catalog_id)
+        tombstones = self.tombstones.get(catalog_id)
+        if tombstones:
+            prizes = self.catalogs[catalog_id]
+            prizes[:] = filter(None, prizes)
+            tombstones.clear()
+
+    def update_prize(self, catalog_id, prize, title, description, image):
+        """
+        Replace a prize with a copy holding the new details, keeping the description index and the catalog version in sync.
+        The index changes are worked out first, so a failure leaves the catalog unchanged. Returns the new prize.
+        """
+        updated = PrizeDetails(prize.id, title, description, image)
+        description_index = self.description_indexes[catalog_id]
+        reindex = description_index is not None and description != prize.description
+        if reindex:
+            old_grams, new_grams = description_index.grams(prize.description), description_index.grams(description)
+
+        moved = []  # Sort indexes already holding the new key, moved back if a later one fails
+        try:
+            for sort_index in self.sort_indexes[catalog_id].values():
+                if getattr(updated, sort_index.field) != getattr(prize, sort_index.field):
+                    sort_index.replace(prize, updated)
+                    moved.append(sort_index)
+        except Exception:
+            for sort_index in moved:
+                sort_index.replace(updated, prize)
+            raise
+
+        if reindex:
+            description_index.remove_grams(prize.id, old_grams)
+            description_index.add_grams(prize.id, new_grams)
+        prizes = self.catalogs[catalog_id]
+        position = bisect_left(prizes, prize.id, key=lambda item: item.id)
+        if position < len(prizes) and prizes[position] is prize:
+            prizes[position] = updated
+        else:
+            prizes[prizes.index(prize)] = updated  # Fall back to a scan if the ID order was not respected
+        self.indexes[catalog_id][prize.id] = updated
+        self.bump_version(catalog_id)
+        return updated
+
+    def description_index(self, catalog_id):
+        """Return the description n-gram index of a catalog, building it on first use."""
+        description_index = self.description_indexes[catalog_id]
+        if description_index is None:
+            with self.build_lock(catalog_id):
+                description_index = self.description_indexes[catalog_id]
+                if description_index is None:  # Not built by another reader in the meantime
+                    description_index = NgramIndex()
+                    for prize in self.get_catalog(catalog_id):
+                        description_index.add(prize.id, prize.description)
+                    self.description_indexes[catalog_id] = description_index
+        return description_index
+
+    def sort_index(self, catalog_id, field):
+        """Return the sorted index of a catalog by a field, building it on first use."""
+        sort_index = self.sort_indexes[catalog_id].get(field)
+        if sort_index is None:
+            with self.build_lock(catalog_id):
+                sort_index = self.sort_indexes[catalog_id].get(field)
+                if sort_index is None:  # Not built by another reader in the meantime
+                    sort_index = self.sort_indexes[catalog_id][field] = SortedIndex(field, self.get_catalog(catalog_id))
+        return sort_index
+
+    def sorted_prizes(self, catalog_id, field, descending=False):
+        """Return a sliceable view of the live prizes of a catalog ordered by a field, ties ordered by ID."""
+        if field == "id":
+            return OrderedView(self.get_catalog(catalog_id), descending)
+        return OrderedView(self.sort_index(catalog_id, field).keys, descending, lambda key: self.indexes[catalog_id][key[1]])
+
+    def iter_prizes(self, catalog_id, after_id=None):
+        """Iterate over the prizes of a catalog in ID order, resuming after after_id if given."""
+        if after_id is None:
+            return iter(self.get_catalog(catalog_id))
+
+        prizes = self.catalogs.get(catalog_id, [])  # Searched with its tombstones, which keep their IDs
+        position = bisect_right(prizes, after_id, key=lambda item: item.id)
+        return filter(None, map(prizes.__getitem__, range(position, len(prizes))))
+
+    def description_candidates(self, catalog_id, text, after_id=None):
+        """
+        Lazily yield the prizes whose description may contain text according to the n-gram index, in catalog order,
+        resuming after after_id if given. The caller verifies them; text must be at least NGRAM_SIZE characters long.
+        """
+        self._materialize(catalog_id)
+        if catalog_id not in self.catalogs:
+            return iter(())
+
+        candidate_ids = self.description_index(catalog_id).candidates(text)
+        if after_id is not None:
+            candidate_ids = candidate_ids[bisect_right(candidate_ids, after_id):]
+        return map(self.indexes[catalog_id].__getitem__, candidate_ids)
 
     def print_catalogs(self, is_debug=False):
         """Print all catalogs and associated prizes."""
         if is_debug:
-            for catalog_id, prizes in self.catalogs.items():
+            for catalog_id in self.catalog_ids():
                 print(f"Catalog {catalog_id}:")
-                for prize in prizes:
+                for prize in self.get_catalog(catalog_id):
                     print(f"  Prize ID: {prize.id}, Title: {prize.title}, Description: {prize.description}, Image: {prize.image}")
                     
     def create_catalog(self, catalog_id):
         """Create a new catalog."""
-        if catalog_id in self.catalogs:
+        if self.has_catalog(catalog_id):
             return False  # Catalog already exists
-        self.catalogs[catalog_id] = []
-        self.offsets[catalog_id] = (catalog_id - 1) * 10  # Calculate offset
+        self._init_catalog(catalog_id)
         return True
 
     def delete_catalog(self, catalog_id):
         """Delete a catalog."""
+        if self.loaders.pop(catalog_id, None) is not None:
+            del self.loaded_prize_ids[catalog_id]
+            del self.versions[catalog_id]
+            self.catalog_id_allocator.release(catalog_id)
+            return True  # Catalog was never materialized
         if catalog_id not in self.catalogs:
             return False  # Catalog doesn't exist
+        del self.versions[catalog_id]
         del self.catalogs[catalog_id]
         del self.offsets[catalog_id]
+        del self.indexes[catalog_id]
+        del self.description_indexes[catalog_id]
+        del self.sort_indexes[catalog_id]
+        del self.sequences[catalog_id]
+        del self.tombstones[catalog_id]
+        self.catalog_id_allocator.release(catalog_id)
         return True
 
-class Prize:
-    """Represents prizes and provides methods for retrieving, creating, updating, and deleting prizes from the catalog."""
-    def __init__(self):
-        self.catalog = self.InitializeMockData(5, 10)  # Generate 5 catalogs with 10 prizes each
+class Prize(PrizeStore):
+    """Represents prizes and provides methods for retrieving, creating, updating, and deleting prizes from the in-memory catalog."""
+    def __init__(self, num_catalogs=5, prizes_per_catalog=10, lazy=False, snapshot_path=None):
+        started = time.perf_counter()
+        if snapshot_path:
+            self.catalog = self.LoadSnapshot(snapshot_path)
+        else:
+            self.catalog = self.InitializeMockData(num_catalogs, prizes_per_catalog, lazy)  # Generate 5 catalogs with 10 prizes each by default
+        self.startup_seconds = time.perf_counter() - started
         is_debug = False  # True
         self.catalog.print_catalogs(is_debug)
 
-    def get_prizes(self, catalog_id, filter=None, pagination=None):
-        """Retrieve prizes from the specified catalog, applying filters and pagination if provided."""
-        # Simulated database query
-        prizes_data = self.catalog.get_catalog(catalog_id)
-        if not prizes_data:
-            return None
-        
-        # Apply filters if provided
-        if filter:
-            filter_id = None
-            filter_description = None
-            logical_operator = filter.get('logical_operator', 'OR')
-            
-            if 'id' in filter:
-                filter_id = int(filter['id']) if filter['id'].isdigit() else None
-
-            if 'description' in filter:
-                filter_description = filter['description']
-
-            if filter_id is not None or filter_description is not None:
-                if logical_operator.upper() == 'AND':
-                    if filter_id is not None and filter_description is not None:
-                        prizes_data = [prize for prize in prizes_data if prize.id == filter_id and filter_description in prize.description]
-                    elif filter_id is not None:
-                        prizes_data = [prize for prize in prizes_data if prize.id == filter_id]
-                    elif filter_description is not None:
-                        prizes_data = [prize for prize in prizes_data if filter_description in prize.description]
-                else:
-                    if filter_id is not None and filter_description is not None:
-                        prizes_data = [prize for prize in prizes_data if prize.id == filter_id or filter_description in prize.description]
-                    elif filter_id is not None:
-                        prizes_data = [prize for prize in prizes_data if prize.id == filter_id]
-                    elif filter_description is not None:
-                        prizes_data = [prize for prize in prizes_data if filter_description in prize.description]
-            else:
-                prizes_data = []
-        
-        # Apply pagination if provided
+    def catalog_ids(self):
+        """Return the IDs of all catalogs."""
+        return self.catalog.catalog_ids()
+
+    def has_catalog(self, catalog_id):
+        """Check whether the specified catalog exists."""
+        return self.catalog.has_catalog(catalog_id)
+
+    def create_catalog(self, catalog_id):
+        """Create a new catalog."""
+        with self.catalog.catalogs_lock, self.catalog.lock(catalog_id).write():
+            return self.catalog.create_catalog(catalog_id)
+
+    def allocate_catalog(self):
+        """Create a new catalog with the lowest free ID and return that ID."""
+        with self.catalog.catalogs_lock:
+            catalog_id = self.catalog.catalog_id_allocator.allocate()
+            with self.catalog.lock(catalog_id).write():
+                self.catalog.create_catalog(catalog_id)
+            return catalog_id
+
+    def delete_catalog(self, catalog_id):
+        """Delete a catalog."""
+        with self.catalog.catalogs_lock, self.catalog.lock(catalog_id).write():
+            return self.catalog.delete_catalog(catalog_id)
+
+    def catalog_version(self, catalog_id):
+        """Return the current version of the specified catalog."""
+        return self.catalog.version(catalog_id)
+
+    def next_prize_id(self, catalog_id):
+        """Return the next prize ID of the specified catalog."""
+        with self.catalog.lock(catalog_id).read():
+            return self.catalog.next_prize_id(catalog_id)
+
+    def find_prizes(self, catalog_id, filter=None, pagination=None, with_total=True, sort=None):
+        """
+        Retrieve one page of prizes from the specified catalog together with the total number of matches.
+        The prizes flow through a lazy filter stage, an order stage if sort is given as a (field, descending) tuple,
+        a page stage and, only if with_total is set, a count stage.
+        Returns a (prizes, total) tuple, with total set to None when it was not requested.
+        """
+        with self.catalog.lock(catalog_id).read():
+            # Simulated database query
+            prizes_data = self.catalog.get_catalog(catalog_id)
+            if not prizes_data:
+                return None
+
+            if sort is not None:
+                return self.paginate(self.sort_matches(catalog_id, plan_filter(filter, self.index_for), sort), pagination, with_total)
+            if not filter:
+                return self.paginate(prizes_data, pagination, with_total)
+            return self.paginate(self.match_prizes(catalog_id, filter), pagination, with_total)
+
+    def explain_prizes(self, catalog_id, filter=None, pagination=None, with_total=True, sort=None):
+        """
+        Run find_prizes and describe how the filter was answered.
+        Returns a (prizes, total, plan) tuple, with plan a dictionary, or None if the catalog has no prizes.
+        """
+        with self.catalog.lock(catalog_id).read():
+            prizes_data = self.catalog.get_catalog(catalog_id)
+            if not prizes_data:
+                return None
+
+            plan = plan_filter(filter, self.index_for)
+            plan.counting = True
+            if sort is None:
+                prizes, total = self.paginate(self.execute_plan(catalog_id, plan), pagination, with_total)
+                return prizes, total, plan.explain()
+
+            prizes, total = self.paginate(self.sort_matches(catalog_id, plan, sort), pagination, with_total)
+            explanation = plan.explain()
+            explanation["sort"] = {"field": sort[0], "descending": sort[1],
+                                   "method": "sorted_index" if plan.access_path == "scan" else "sorted_matches"}
+            return prizes, total, explanation
+
+    def find_prizes_after(self, catalog_id, filter=None, after_id=None, per_page=10):
+        """
+        Retrieve the page of matching prizes that follows the prize after_id (keyset pagination).
+        Returns a (prizes, next_after_id) tuple, with next_after_id set to None on the last page.
+        """
+        with self.catalog.lock(catalog_id).read():
+            prizes_data = self.catalog.get_catalog(catalog_id)
+            if not prizes_data:
+                return None
+
+            matches = self.match_prizes(catalog_id, filter, after_id)
+            page = list(islice(matches, per_page + 1))  # One extra prize tells whether another page follows
+        if len(page) <= per_page:
+            return page, None
+        return page[:per_page], page[per_page - 1].id
+
+    def iter_prizes(self, catalog_id, filter=None):
+        """
+        Return a lazy iterator over every prize of the catalog matching the filter.
+        Prizes are read in keyset chunks, so the catalog lock is only held while a chunk is read
+        and writers can proceed while the consumer is busy with the previous chunk.
+        """
+        with self.catalog.lock(catalog_id).read():
+            if not self.catalog.get_catalog(catalog_id):
+                return None
+
+        def generate():
+            after_id = None
+            while True:
+                result = self.find_prizes_after(catalog_id, filter, after_id, ITER_CHUNK_SIZE)
+                if result is None:
+                    return  # The catalog was emptied or deleted meanwhile
+                chunk, after_id = result
+                yield from chunk
+                if after_id is None:
+                    return
+
+        return generate()
+
+    def match_prizes(self, catalog_id, filter, after_id=None):
+        """Filter stage: return a lazy iterator over the prizes matching the filter, resuming after after_id if given."""
+        return self.execute_plan(catalog_id, plan_filter(filter, self.index_for), after_id)
+
+    def sort_matches(self, catalog_id, plan, sort):
+        """
+        Order stage: return the matches of a plan ordered by a (field, descending) sort.
+        A scan walks the sorted index of the field, so a page is read without sorting the catalog;
+        the matches of an index lookup are few, so they are sorted instead.
+        """
+        field, descending = sort
+        if plan.access_path == "scan":
+            ordered = self.catalog.sorted_prizes(catalog_id, field, descending)
+            if not plan.residual and not plan.counting:
+                return ordered  # Sliceable, so the page stage reads only the page
+            return plan.execute(None, lambda: iter(ordered))
+        return sorted(self.execute_plan(catalog_id, plan), key=lambda prize: (getattr(prize, field), prize.id), reverse=descending)
+
+    @staticmethod
+    def index_for(condition):
+        """Tell the planner how the catalog indexes answer a condition: IDs exactly, long enough descriptions by candidates."""
+        if condition.field == "id":
+            return EXACT
+        if condition.field == "description" and len(condition.value) >= NGRAM_SIZE:
+            return CANDIDATES
+        return None
+
+    def execute_plan(self, catalog_id, plan, after_id=None):
+        """Run a plan over the catalog indexes, resuming after after_id if given."""
+        def lookup(condition):
+            if condition.field == "id":
+                prize = self.catalog.find_prize(catalog_id, condition.value)
+                return [prize] if prize is not None and (after_id is None or prize.id > after_id) else []
+            return self.catalog.description_candidates(catalog_id, condition.value, after_id)
+
+        return plan.execute(lookup, lambda: self.catalog.iter_prizes(catalog_id, after_id), key=attrgetter("id"))
+
+    @staticmethod
+    def paginate(matches, pagination, with_total):
+        """Page and count stages: slice the requested page out of the matches without copying them."""
+        start, per_page = 0, None
         if pagination:
-            page = pagination.get('page', 1)
-            per_page = pagination.get('per_page', len(prizes_data))
-            start_index = (page - 1) * per_page
-            end_index = start_index + per_page
-            prizes_data = prizes_data[start_index:end_index]
+            per_page = int(pagination['per_page']) if pagination.get('per_page') else None
+            start = (int(pagination.get('page', 1)) - 1) * per_page if per_page else 0
+
+        # Materialized matches (lists, live and ordered views or ranges of positions) can be sliced and counted directly
+        if isinstance(matches, (list, LiveView, OrderedView, range)):
+            end = start + per_page if per_page else None
+            return matches[start:end], len(matches) if with_total else None
 
-        return prizes_data
+        matches = iter(matches)
+        skipped = sum(1 for _ in islice(matches, start))
+        page = list(islice(matches, per_page)) if per_page else list(matches)
+        if not with_total:
+            return page, None
 
-    def InitializeMockData(self, num_catalogs, prizes_per_catalog):
-        """Generate mock data and add it to the catalog."""
+        return page, skipped + len(page) + sum(1 for _ in matches)
+
+    def InitializeMockData(self, num_catalogs, prizes_per_catalog, lazy=False):
+        """Generate mock data and add it to the catalog, or register it to be generated on first access if lazy."""
         catalog = Catalog()
 
         for catalog_id in range(1, num_catalogs + 1):
-            for prize_id in range(1, prizes_per_catalog + 1):
-                # Add offset to prize_id based on catalog
-                adjusted_prize_id = prize_id + (catalog_id - 1) * prizes_per_catalog
-                prize = PrizeDetails(
-                    adjusted_prize_id,  # Use adjusted prize_id
-                    f"Prize {adjusted_prize_id}",
-                    f"Description of prize {adjusted_prize_id} in catalog {catalog_id}",
-                    f"https://example.com/image{adjusted_prize_id}.png"
-                )
-                catalog.add_prize(catalog_id, prize)
+            loader = partial(self.generate_mock_batches, catalog_id, prizes_per_catalog)
+            if lazy:
+                catalog.register_loader(catalog_id, loader)
+            else:
+                for batch in loader():
+                    catalog.add_prizes(catalog_id, batch)
         
         return catalog
 
+    def LoadSnapshot(self, path):
+        """Map a snapshot file and register each of its catalogs to be decoded on first access."""
+        catalog = Catalog()
+        snapshot = Snapshot.open(path)
+
+        for catalog_id in snapshot.catalog_ids():
+            catalog.register_loader(catalog_id, partial(snapshot.iter_batches, catalog_id, PrizeDetails, MOCK_BATCH_SIZE),
+                                    snapshot.next_prize_id(catalog_id))
+
+        return catalog
+
+    @staticmethod
+    def generate_mock_batches(catalog_id, prizes_per_catalog, batch_size=MOCK_BATCH_SIZE):
+        """Yield the mock prizes of a catalog in lists of at most batch_size prizes."""
+        # Add offset to prize_id based on catalog
+        first_id = (catalog_id - 1) * prizes_per_catalog + 1
+        end_id = first_id + prizes_per_catalog
+        description_suffix = f" in catalog {catalog_id}"
+
+        for batch_start in range(first_id, end_id, batch_size):
+            yield [
+                PrizeDetails(
+                    prize_id,
+                    f"Prize {prize_id}",
+                    f"Description of prize {prize_id}{description_suffix}",
+                    f"https://example.com/image{prize_id}.png"
+                )
+                for prize_id in range(batch_start, min(batch_start + batch_size, end_id))
+            ]
+
     def create_prize(self, catalog_id, prize_data):
-        """Create a new prize in the specified catalog."""
-        catalog = self.catalog.get_catalog(catalog_id)
-        if catalog is None:
-            return None
+        """Create a new prize in the specified catalog. Returns None if the catalog doesn't exist."""
+        with self.catalog.lock(catalog_id).write():
+            if not self.catalog.has_catalog(catalog_id):
+                return None  # Catalogs are only created through create_catalog, under catalogs_lock
+            new_id = self.catalog.allocate_prize_id(catalog_id)
+            new_prize = PrizeDetails(new_id, prize_data['title'], prize_data['description'], prize_data['image'])
+            self.catalog.add_prize(catalog_id, new_prize)
+            return new_prize
 
-        new_id = max(prize.id for prize in catalog) + 1 if catalog else 1
-        new_prize = PrizeDetails(new_id, prize_data['title'], prize_data['description'], prize_data['image'])
-        self.catalog.add_prize(catalog_id, new_prize)
-        return new_prize
+    def apply_batch(self, catalog_id, operations):
+        """
+        Apply a batch of create, update and delete operations to the specified catalog, in order.
+        Each operation is a dictionary with an 'op' key ('create', 'update' or 'delete'), the prize 'id'
+        for updates and deletes, and the prize fields under 'prize' for creates and updates.
+        New IDs come from the catalog's ID sequence and the catalog list is updated once for the whole batch.
+        Returns one outcome per operation: the created or updated prize, True for a deletion,
+        or None when the prize to update or delete doesn't exist; returns None if the catalog doesn't exist.
+        """
+        with self.catalog.lock(catalog_id).write():
+            if not self.catalog.has_catalog(catalog_id):
+                return None
+
+            created = {}  # Prizes created by this batch, added to the catalog at the end
+            deleted = set()  # IDs deleted by this batch, removed from the catalog at the end
+            outcomes = []
+
+            for operation in operations:
+                op = operation['op']
+                if op == 'create':
+                    fields = operation['prize']
+                    new_prize = PrizeDetails(self.catalog.allocate_prize_id(catalog_id), fields['title'], fields['description'], fields['image'])
+                    created[new_prize.id] = new_prize
+                    outcomes.append(new_prize)
+                    continue
+
+                prize_id = operation['id']
+                target = created.get(prize_id)
+                if target is None and prize_id not in deleted:
+                    target = self.catalog.find_prize(catalog_id, prize_id)
+
+                if target is None:
+                    outcomes.append(None)
+                elif op == 'delete':
+                    if prize_id in created:
+                        del created[prize_id]
+                    else:
+                        deleted.add(prize_id)
+                    outcomes.append(True)
+                else:
+                    fields = operation['prize']
+                    title = fields.get('title', target.title)
+                    description = fields.get('description', target.description)
+                    image = fields.get('image', target.image)
+                    if prize_id in created:
+                        created[prize_id] = target = PrizeDetails(prize_id, title, description, image)
+                    else:
+                        target = self.catalog.update_prize(catalog_id, target, title, description, image)
+                    outcomes.append(target)
+
+            if deleted:
+                self.catalog.remove_prizes(catalog_id, deleted)
+            if created:
+                self.catalog.add_prizes(catalog_id, list(created.values()))
+            return outcomes
 
     def update_prize(self, catalog_id, prize_id, existing_prize):
         """Update an existing prize in the specified catalog."""
-        catalog = self.catalog.get_catalog(catalog_id)
-        if catalog is None:
-            return None
+        with self.catalog.lock(catalog_id).write():
+            prize = self.catalog.find_prize(catalog_id, prize_id)
+            if prize is None:
+                return None
 
-        for prize in catalog:
-            if prize.id == prize_id:
-                prize.title = existing_prize.title
-                prize.description = existing_prize.description
-                prize.image = existing_prize.image
-                return prize
-
-        return None
+            return self.catalog.update_prize(catalog_id, prize, existing_prize.title, existing_prize.description, existing_prize.image)
 
     def delete_prize(self, catalog_id, prize_id):
         """Delete a prize from the specified catalog."""
-        catalog = self.catalog.get_catalog(catalog_id)
-        if catalog is None:
-            return False
-
-        for i, prize in enumerate(catalog):
-            if prize.id == prize_id:
-                del catalog[i]
-                return True
-
-        return False
+        with self.catalog.lock(catalog_id).write():
+            return self.catalog.remove_prize(catalog_id, prize_id)
 
     def get_prize(self, catalog_id, prize_id):
         """Get a specific prize from the specified catalog."""
-        catalog = self.catalog.get_catalog(catalog_id)
-        if catalog is None:
-            return False
-
-        for prize in catalog:
-            if prize.id == prize_id:
-                return prize
-
-        return None
+        with self.catalog.lock(catalog_id).read():
+            return self.catalog.find_prize(catalog_id, prize_id)
 
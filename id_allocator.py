@@ -0,0 +1,65 @@
+# id_allocator.py - ID allocation for catalogs and prizes
+# This module hands out new catalog and prize IDs without scanning the existing ones:
+# catalog IDs reuse the lowest freed ID first, prize IDs come from a per-catalog sequence.
+
+# Authors: Edoardo Sabatini - Data Worker and ChatGPT 3.5 Python Programmer
+# Date: May 22, 2024
+
+from heapq import heappop, heappush
+
+class CatalogIdAllocator:
+    """
+    Allocates the lowest catalog ID not in use, in O(log n).
+    IDs above the high-water mark have never been used; freed IDs below it wait in a min-heap.
+    Callers serialize access, as catalog creation and deletion already are.
+    """
+    def __init__(self, used_ids=()):
+        self.high_water = 0  # Highest ID ever reserved
+        self.free_heap = []  # Freed IDs below the high-water mark, possibly with stale entries
+        self.free = set()  # The IDs of the heap that are really free
+        for catalog_id in used_ids:
+            self.reserve(catalog_id)
+
+    def allocate(self):
+        """Reserve and return the lowest free ID."""
+        while self.free_heap:
+            catalog_id = heappop(self.free_heap)
+            if catalog_id in self.free:  # Skip IDs reserved explicitly since they were freed
+                self.free.remove(catalog_id)
+                return catalog_id
+        self.high_water += 1
+        return self.high_water
+
+    def reserve(self, catalog_id):
+        """Mark an ID chosen by the caller as used. The IDs it skips above the high-water mark become free."""
+        if catalog_id > self.high_water:
+            for skipped_id in range(self.high_water + 1, catalog_id):
+                self.release(skipped_id)
+            self.high_water = catalog_id
+        else:
+            self.free.discard(catalog_id)
+
+    def release(self, catalog_id):
+        """Return an ID to the pool once its catalog is deleted."""
+        if catalog_id not in self.free:
+            self.free.add(catalog_id)
+            heappush(self.free_heap, catalog_id)
+
+class PrizeIdSequence:
+    """
+    Monotonic prize ID sequence of one catalog, so a new prize never needs a scan for the highest ID.
+    IDs are not reused after a deletion, so a deleted prize's ID never refers to another prize.
+    """
+    def __init__(self, next_id=1):
+        self.next_id = next_id
+
+    def allocate(self):
+        """Return a new prize ID."""
+        prize_id = self.next_id
+        self.next_id += 1
+        return prize_id
+
+    def advance(self, used_id):
+        """Make sure an ID added by the caller, such as a loaded prize, is never allocated."""
+        if used_id >= self.next_id:
+            self.next_id = used_id + 1
@@ -0,0 +1,237 @@
+# load_test.py
+# This script replays the scenarios of the curl test scripts against a running server with many concurrent clients.
+# It reports the throughput and the p50/p95/p99 latencies of each endpoint.
+
+# Authors: Edoardo Sabatini - Data Worker and ChatGPT 3.5 Python Programmer
+# Date: May 22, 2024
+
+import argparse
+import http.client
+import json
+import queue
+import random
+import socket
+import subprocess
+import sys
+import threading
+import time
+from collections import defaultdict
+from metrics import percentile
+
+# Read scenarios of my_test.sh / my_test_improved.sh (list_prizes) and of catalog_test.sh / prize_test.sh
+READ_SCENARIOS = [
+    ("list_prizes", "/api/catalogs/1/prizes"),
+    ("list_prizes", '/api/catalogs/2/prizes?filter={"description":"prize"}&pagination={"page":1,"per_page":1}'),
+    ("list_prizes", '/api/catalogs/3/prizes?filter={"description":"prize"}&pagination={"page":1,"per_page":4}'),
+    ("list_prizes", '/api/catalogs/3/prizes?filter={"description":"prize"}&pagination={"page":2,"per_page":4}'),
+    ("list_prizes", '/api/catalogs/3/prizes?filter={"description":"prize"}&pagination={"page":3,"per_page":4}'),
+    ("list_prizes", '/api/catalogs/1/prizes?filter={"description":"hello"}&pagination={"page":1,"per_page":5}'),
+    ("list_prizes", '/api/catalogs/1/prizes?filter={"description":"script"}&pagination={"page":1,"per_page":5}'),
+    ("list_prizes", '/api/catalogs/1/prizes?filter={"id":"1"}&pagination={"page":1,"per_page":5}'),
+    ("list_prizes", '/api/catalogs/1/prizes?filter={"id":"2","description":"script"}&pagination={"page":1,"per_page":5}'),
+    ("list_prizes", '/api/catalogs/1/prizes?filter={"id":"2","description":"hello"}&pagination={"page":1,"per_page":5}'),
+    ("list_prizes", '/api/catalogs/1/prizes?filter={"id":"2","description":"hello","logical_operator":"AND"}&pagination={"page":1,"per_page":5}'),
+    ("list_prizes", '/api/catalogs/1/prizes?filter={"id":"2","description":"script","logical_operator":"AND"}&pagination={"page":1,"per_page":5}'),
+    ("list_prizes", '/api/catalogs/1/prizes?filter={"id":"2","description":"hello","logical_operator":"OR"}&pagination={"page":1,"per_page":5}'),
+    ("list_catalogs", "/api/catalogs"),
+    ("get_catalog", "/api/catalog/1"),
+    ("get_prize", "/api/catalogs/1/prize/1"),
+]
+
+# Catalogs no read scenario uses, which the catalog_test.sh flow deletes and recreates
+CATALOG_FLOW_IDS = (4, 5)
+
+NEW_PRIZE = {"title": "New Prize", "description": "Description of the new prize", "image": "new_image_url"}
+
+class Client:
+    """One persistent HTTP connection, reopened if the server closes it."""
+    def __init__(self, host, port, timeout=10):
+        self.connection = http.client.HTTPConnection(host, port, timeout=timeout)
+
+    def request(self, method, path, body=None):
+        """
+        Send a request and return its status code and body. Retries once on a dropped keep-alive connection,
+        except for a POST: the server may have applied it already, so it fails instead of creating twice.
+        """
+        headers = {"Content-Type": "application/json"} if body is not None else {}
+        payload = json.dumps(body) if body is not None else None
+        for attempt in (1, 2):
+            try:
+                self.connection.request(method, path.replace('"', "%22").replace(" ", "%20"), payload, headers)
+                response = self.connection.getresponse()
+                return response.status, response.read()
+            except (ConnectionError, http.client.HTTPException):
+                self.connection.close()
+                if attempt == 2 or method == "POST":
+                    raise
+
+    def close(self):
+        self.connection.close()
+
+class LoadTest:
+    """Runs the scenarios from concurrent workers, each with its own connection, and collects latencies per endpoint."""
+    def __init__(self, host, port, concurrency=16, duration=10.0, write_ratio=0.1, seed=None):
+        self.host = host
+        self.port = port
+        self.concurrency = concurrency
+        self.duration = duration
+        self.write_ratio = write_ratio
+        self.seed = seed
+        self.latencies = defaultdict(list)  # Endpoint -> latencies in seconds
+        self.errors = defaultdict(int)  # Endpoint -> failed requests
+        self.lock = threading.Lock()
+        self.catalog_flow_ids = queue.SimpleQueue()  # Catalogs free for a catalog flow, so two flows never delete the same one
+        for catalog_id in CATALOG_FLOW_IDS:
+            self.catalog_flow_ids.put(catalog_id)
+
+    def record(self, endpoint, started, status, expected):
+        """Record the latency of a request, and an error if it did not get the expected status."""
+        elapsed = time.perf_counter() - started
+        with self.lock:
+            self.latencies[endpoint].append(elapsed)
+            if status != expected:
+                self.errors[endpoint] += 1
+
+    def call(self, client, endpoint, expected, method, path, body=None):
+        """Send one request and record it. Returns the response body, or None if the request failed."""
+        started = time.perf_counter()
+        try:
+            status, response_body = client.request(method, path, body)
+        except (OSError, http.client.HTTPException):
+            self.record(endpoint, started, None, expected)
+            return None
+        self.record(endpoint, started, status, expected)
+        return response_body if status == expected else None
+
+    def prize_flow(self, client):
+        """The prize_test.sh flow: create a prize in catalog 1, update it, read it back and delete it."""
+        created = self.call(client, "create_prize", 201, "POST", "/api/catalogs/1/prize", NEW_PRIZE)
+        if created is None:
+            return
+        path = f"/api/catalogs/1/prize/{json.loads(created)['id']}"
+        self.call(client, "update_prize", 200, "PUT", path, {"title": "Updated Prize Name"})
+        self.call(client, "get_prize", 200, "GET", path)
+        self.call(client, "delete_prize", 200, "DELETE", path)
+
+    def catalog_flow(self, client):
+        """
+        The catalog_test.sh flow: delete a catalog, recreate it and read it back. The new catalog gets the lowest free ID,
+        which is one of CATALOG_FLOW_IDS, though not always the one this flow deleted. Runs the prize flow if no catalog is free.
+        """
+        try:
+            catalog_id = self.catalog_flow_ids.get_nowait()
+        except queue.Empty:
+            self.prize_flow(client)
+            return
+        try:
+            if self.call(client, "delete_catalog", 200, "DELETE", f"/api/catalog/{catalog_id}") is None:
+                return
+            created = self.call(client, "create_catalog", 201, "POST", "/api/catalog", {})
+            if created is not None:
+                catalog_id = json.loads(created)["catalog_id"]
+                self.call(client, "get_catalog", 200, "GET", f"/api/catalog/{catalog_id}")
+        finally:
+            self.catalog_flow_ids.put(catalog_id)
+
+    def worker(self, number, deadline):
+        """Send requests until the deadline, choosing one of the write flows with probability write_ratio."""
+        generator = random.Random(None if self.seed is None else self.seed + number)
+        client = Client(self.host, self.port)
+        try:
+            while time.perf_counter() < deadline:
+                if generator.random() < self.write_ratio:
+                    generator.choice((self.prize_flow, self.catalog_flow))(client)
+                else:
+                    endpoint, path = generator.choice(READ_SCENARIOS)
+                    self.call(client, endpoint, 200, "GET", path)
+        finally:
+            client.close()
+
+    def run(self):
+        """Run the workers for the configured duration and return the elapsed time."""
+        started = time.perf_counter()
+        deadline = started + self.duration
+        threads = [threading.Thread(target=self.worker, args=(number, deadline)) for number in range(self.concurrency)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return time.perf_counter() - started
+
+    def summary(self, elapsed):
+        """Return the statistics of each endpoint, and of all requests under 'total'."""
+        summary = {}
+        everything = []
+        for endpoint in sorted(self.latencies):
+            latencies = sorted(self.latencies[endpoint])
+            everything.extend(latencies)
+            summary[endpoint] = self.statistics(latencies, self.errors[endpoint], elapsed)
+        summary["total"] = self.statistics(sorted(everything), sum(self.errors.values()), elapsed)
+        return summary
+
+    @staticmethod
+    def statistics(latencies, errors, elapsed):
+        """Summarize the sorted latencies of a set of requests."""
+        if not latencies:
+            return {"requests": 0, "errors": errors, "requests_per_sec": 0.0, "p50_ms": None, "p95_ms": None, "p99_ms": None}
+        return {
+            "requests": len(latencies),
+            "errors": errors,
+            "requests_per_sec": round(len(latencies) / elapsed, 1),
+            "p50_ms": round(percentile(latencies, 0.50) * 1000, 3),
+            "p95_ms": round(percentile(latencies, 0.95) * 1000, 3),
+            "p99_ms": round(percentile(latencies, 0.99) * 1000, 3),
+        }
+
+def report(summary):
+    """Print the statistics as a table."""
+    print(f"{'Endpoint':<16} {'requests':>9} {'errors':>7} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for endpoint, stats in summary.items():
+        if stats["requests"]:
+            print(f"{endpoint:<16} {stats['requests']:>9} {stats['errors']:>7} {stats['requests_per_sec']:>9.1f} "
+                  f"{stats['p50_ms']:>9.3f} {stats['p95_ms']:>9.3f} {stats['p99_ms']:>9.3f}")
+
+def start_server(port):
+    """Start the API on a local port, with a threaded server and without the debug reloader, and wait until it accepts connections."""
+    server = subprocess.Popen([sys.executable, "-m", "flask", "--app", "app", "run", "--port", str(port), "--no-reload"],
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(("localhost", port), timeout=1).close()
+            return server
+        except OSError:
+            if server.poll() is not None:
+                break
+            time.sleep(0.1)
+    server.terminate()
+    raise RuntimeError(f"The API server did not start on port {port}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay the curl test scenarios against the API with concurrent clients.")
+    parser.add_argument("--host", default="localhost", help="Server host (default: localhost)")
+    parser.add_argument("--port", type=int, default=5000, help="Server port (default: 5000)")
+    parser.add_argument("--concurrency", type=int, default=16, help="Concurrent clients, each with its own connection (default: 16)")
+    parser.add_argument("--duration", type=float, default=10.0, help="Test duration in seconds (default: 10)")
+    parser.add_argument("--write-ratio", type=float, default=0.1, help="Fraction of iterations running the prize or the catalog write flow (default: 0.1)")
+    parser.add_argument("--seed", type=int, help="Random seed, for reproducible request sequences")
+    parser.add_argument("--start-server", action="store_true", help="Start the API locally for the duration of the test")
+    args = parser.parse_args()
+
+    server = start_server(args.port) if args.start_server else None
+    try:
+        load_test = LoadTest(args.host, args.port, args.concurrency, args.duration, args.write_ratio, args.seed)
+        elapsed = load_test.run()
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+    summary = load_test.summary(elapsed)
+    print(f"{args.concurrency} clients for {elapsed:.1f}s, write ratio {args.write_ratio:.0%}")
+    report(summary)
+    if summary["total"]["errors"]:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
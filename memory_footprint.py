@@ -0,0 +1,68 @@
+# memory_footprint.py
+# This script measures the memory used per prize by the catalog storage.
+# It compares the original dict-based prize objects with the slotted PrizeDetails records.
+
+# Authors: Edoardo Sabatini - Data Worker and ChatGPT 3.5 Python Programmer
+# Date: May 22, 2024
+
+import argparse
+import gc
+import tracemalloc
+from data_simulation import Catalog, PrizeDetails
+
+class DictPrizeDetails:
+    """The original prize representation, with a per-instance __dict__."""
+    def __init__(self, id, title, description, image):
+        self.id = id
+        self.title = title
+        self.description = description
+        self.image = image
+
+def make_prizes(prize_class, num_prizes, catalog_id=1):
+    """Yield num_prizes mock prizes built with the given class."""
+    for prize_id in range(1, num_prizes + 1):
+        yield prize_class(
+            prize_id,
+            f"Prize {prize_id}",
+            f"Description of prize {prize_id} in catalog {catalog_id}",
+            f"https://example.com/image{prize_id}.png"
+        )
+
+def measure(load, num_prizes):
+    """Return the number of bytes per prize still allocated by the object returned from load()."""
+    gc.collect()
+    tracemalloc.start()
+    loaded = load()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del loaded
+    return current / num_prizes
+
+def measure_records(prize_class, num_prizes):
+    """Bytes per prize for the prize records alone (object plus strings)."""
+    return measure(lambda: list(make_prizes(prize_class, num_prizes)), num_prizes)
+
+def measure_catalog(prize_class, num_prizes, catalog_id=1):
+    """Bytes per prize for a whole catalog, including its ID and description indexes."""
+    def load():
+        catalog = Catalog()
+        for prize in make_prizes(prize_class, num_prizes, catalog_id):
+            catalog.add_prize(catalog_id, prize)
+        return catalog
+    return measure(load, num_prizes)
+
+def report(label, before, after):
+    """Print a before/after line."""
+    print(f"{label:<10} before (__dict__): {before:6.0f} B/prize   after (__slots__): {after:6.0f} B/prize   saved: {before - after:.0f} B ({(before - after) / before:.0%})")
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure bytes per prize for the catalog storage.")
+    parser.add_argument("--prizes", type=int, default=100000, help="Number of prizes to load (default: 100000)")
+    args = parser.parse_args()
+
+    print(f"Prizes loaded: {args.prizes}")
+    report("Records", measure_records(DictPrizeDetails, args.prizes), measure_records(PrizeDetails, args.prizes))
+    report("Catalog", measure_catalog(DictPrizeDetails, args.prizes), measure_catalog(PrizeDetails, args.prizes))
+
+if __name__ == "__main__":
+    main()
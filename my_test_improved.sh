@@ -32,14 +32,14 @@ perform_curl() {
 
 # Test cases
 perform_curl "/1/prizes" 10 10
-perform_curl "/2/prizes?filter={\"description\":\"prize\"}&pagination={\"page\":1,\"per_page\":1}" 1 1
-perform_curl "/3/prizes?filter={\"description\":\"prize\"}&pagination={\"page\":1,\"per_page\":4}" 4 4
-perform_curl "/3/prizes?filter={\"description\":\"prize\"}&pagination={\"page\":2,\"per_page\":4}" 4 4
-perform_curl "/3/prizes?filter={\"description\":\"prize\"}&pagination={\"page\":3,\"per_page\":4}" 2 2
+perform_curl "/2/prizes?filter={\"description\":\"prize\"}&pagination={\"page\":1,\"per_page\":1}" 10 1
+perform_curl "/3/prizes?filter={\"description\":\"prize\"}&pagination={\"page\":1,\"per_page\":4}" 10 4
+perform_curl "/3/prizes?filter={\"description\":\"prize\"}&pagination={\"page\":2,\"per_page\":4}" 10 4
+perform_curl "/3/prizes?filter={\"description\":\"prize\"}&pagination={\"page\":3,\"per_page\":4}" 10 2
 perform_curl "/1/prizes?filter={\"description\":\"hello\"}&pagination={\"page\":1,\"per_page\":5}" 0 0
-perform_curl "/1/prizes?filter={\"description\":\"script\"}&pagination={\"page\":1,\"per_page\":5}" 5 5
+perform_curl "/1/prizes?filter={\"description\":\"script\"}&pagination={\"page\":1,\"per_page\":5}" 10 5
 perform_curl "/1/prizes?filter={\"id\":\"1\"}&pagination={\"page\":1,\"per_page\":5}" 1 1
-perform_curl "/1/prizes?filter={\"id\":\"2\",\"description\":\"script\"}&pagination={\"page\":1,\"per_page\":5}" 5 5
+perform_curl "/1/prizes?filter={\"id\":\"2\",\"description\":\"script\"}&pagination={\"page\":1,\"per_page\":5}" 10 5
 perform_curl "/1/prizes?filter={\"id\":\"2\",\"description\":\"hello\"}&pagination={\"page\":1,\"per_page\":5}" 1 1
 perform_curl "/1/prizes?filter={\"id\":\"2\",\"description\":\"hello\",\"logical_operator\":\"AND\"}&pagination={\"page\":1,\"per_page\":5}" 0 0
 perform_curl "/1/prizes?filter={\"id\":\"2\",\"description\":\"script\",\"logical_operator\":\"AND\"}&pagination={\"page\":1,\"per_page\":5}" 1 1
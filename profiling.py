@@ -0,0 +1,73 @@
+# profiling.py - Opt-in request profiling for the prize API
+# This module runs selected requests under cProfile and writes one .pstats file per profiled request,
+# keeping only the most recent files so profiling can be left enabled without filling the disk.
+
+# Authors: Edoardo Sabatini - Data Worker and ChatGPT 3.5 Python Programmer
+# Date: May 22, 2024
+
+import cProfile
+import os
+import re
+import threading
+import time
+from itertools import count
+
+PROFILE_HEADER = "X-Profile"  # Request header asking for a profile, set to the configured token
+
+class RequestProfiler:
+    """
+    Decides which requests to profile and stores their profiles.
+    A request is profiled if its endpoint is in the allow-list, if it carries the profile header
+    with the configured token, or if it is one of every sample_every requests to a sampled endpoint.
+    """
+    def __init__(self, directory, max_files=100, endpoints=(), token=None, sample_every=0, sampled_endpoints=("list_prizes",)):
+        self.directory = directory
+        self.max_files = max_files
+        self.endpoints = frozenset(endpoints)
+        self.token = token
+        self.sample_every = sample_every
+        self.sampled_endpoints = frozenset(sampled_endpoints)
+        self.samples = count(1)
+        self.lock = threading.Lock()  # Serializes the pruning of old profiles
+
+    def reason(self, endpoint, headers, debug=False):
+        """Return why a request should be profiled ('allowlist', 'header' or 'sample'), or None."""
+        if endpoint in self.endpoints:
+            return "allowlist"
+        requested = headers.get(PROFILE_HEADER)
+        # Without a token, the header is only honoured by a debug server
+        if requested is not None and (requested == self.token if self.token else debug):
+            return "header"
+        if self.sample_every and endpoint in self.sampled_endpoints and next(self.samples) % self.sample_every == 0:
+            return "sample"
+        return None
+
+    @staticmethod
+    def start():
+        """Start profiling the calling thread. Returns None if another profiler is already active."""
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            return None
+        return profile
+
+    def finish(self, profile, endpoint, reason):
+        """Stop a profile, write it to a .pstats file and remove the oldest files beyond max_files. Returns the file name."""
+        profile.disable()
+        os.makedirs(self.directory, exist_ok=True)
+        file_name = f"{time.time_ns()}-{threading.get_ident()}-{re.sub(r'[^A-Za-z0-9_]', '_', endpoint)}-{reason}.pstats"
+        profile.dump_stats(os.path.join(self.directory, file_name))
+        self.prune()
+        return file_name
+
+    def prune(self):
+        """Remove the oldest profiles so that at most max_files remain."""
+        with self.lock:
+            # File names start with their creation time, so sorting them sorts by age
+            profiles = sorted(name for name in os.listdir(self.directory) if name.endswith(".pstats"))
+            for name in profiles[:max(len(profiles) - self.max_files, 0)]:
+                try:
+                    os.remove(os.path.join(self.directory, name))
+                except FileNotFoundError:
+                    pass  # Already removed by another process
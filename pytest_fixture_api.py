@@ -28,7 +28,7 @@ class TestPrizeAPI:
         response = client.get('/api/catalogs/2/prizes?filter={"description":"prize"}&pagination={"page":1,"per_page":1}')
         assert response.status_code == 200
         data = response.get_json()
-        assert data["total"] == 1
+        assert data["total"] == 10
         assert len(data["prizes"]) == 1
 
     def test_prizes_filtered_by_description_pagination_4_results(self, client):
@@ -39,7 +39,7 @@ class TestPrizeAPI:
         response = client.get('/api/catalogs/3/prizes?filter={"description":"prize"}&pagination={"page":1,"per_page":4}')
         assert response.status_code == 200
         data = response.get_json()
-        assert data["total"] == 4
+        assert data["total"] == 10
         assert len(data["prizes"]) <= 4
 
     def test_prizes_filtered_by_description_pagination_page_2(self, client):
@@ -50,7 +50,7 @@ class TestPrizeAPI:
         response = client.get('/api/catalogs/3/prizes?filter={"description":"prize"}&pagination={"page":2,"per_page":4}')
         assert response.status_code == 200
         data = response.get_json()
-        assert data["total"] == 4
+        assert data["total"] == 10
         assert len(data["prizes"]) <= 4
 
     def test_prizes_filtered_by_description_pagination_page_3(self, client):
@@ -61,7 +61,7 @@ class TestPrizeAPI:
         response = client.get('/api/catalogs/3/prizes?filter={"description":"prize"}&pagination={"page":3,"per_page":4}')
         assert response.status_code == 200
         data = response.get_json()
-        assert data["total"] == 2
+        assert data["total"] == 10
         assert len(data["prizes"]) <= 2
 
     def test_prizes_filtered_by_description_hello(self, client):
@@ -83,7 +83,7 @@ class TestPrizeAPI:
         response = client.get('/api/catalogs/1/prizes?filter={"description":"script"}&pagination={"page":1,"per_page":5}')
         assert response.status_code == 200
         data = response.get_json()
-        assert data["total"] == 5
+        assert data["total"] == 10
         assert len(data["prizes"]) == 5
 
     def test_prizes_filtered_by_id_1(self, client):
@@ -105,7 +105,7 @@ class TestPrizeAPI:
         response = client.get('/api/catalogs/1/prizes?filter={"id":"2","description":"script"}&pagination={"page":1,"per_page":5}')
         assert response.status_code == 200
         data = response.get_json()
-        assert data["total"] == 5
+        assert data["total"] == 10
         assert len(data["prizes"]) == 5
 
     def test_prizes_filtered_by_id_2_and_description_hello(self, client):
@@ -152,3 +152,14 @@ class TestPrizeAPI:
         assert data["total"] == 1
         assert len(data["prizes"]) == 1
 
+
+    def test_prizes_without_total(self, client):
+        """
+        Test: Retrieve prizes from catalog 3 filtered by description 'prize' with pagination (up to 4 results per page) without the total.
+        Expectation: A full page of 4 prizes and no total, since counting the matches was skipped.
+        """
+        response = client.get('/api/catalogs/3/prizes?filter={"description":"prize"}&pagination={"page":1,"per_page":4}&total=false')
+        assert response.status_code == 200
+        data = response.get_json()
+        assert data["total"] is None
+        assert len(data["prizes"]) == 4
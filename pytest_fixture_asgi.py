@@ -0,0 +1,125 @@
+# pytest_fixture_asgi.py
+# This script contains Pytest test cases for the ASGI entry point of the prize API.
+# It drives the ASGI application directly on an event loop, without a server.
+
+# Authors: Edoardo Sabatini - Data Worker and ChatGPT 3.5 Python Programmer
+# Date: May 22, 2024
+
+import asyncio
+import json
+import threading
+import time
+import pytest
+from app import app
+from asgi_app import AsgiAdapter
+
+async def call(application, method, path, query=b"", body=b"", headers=()):
+    """Send one request to an ASGI application and return the status, headers and body messages of the response."""
+    scope = {"type": "http", "method": method, "path": path, "query_string": query,
+             "headers": [(name.encode(), value.encode()) for name, value in headers]}
+    requests = [{"type": "http.request", "body": body, "more_body": False}]
+    messages = []
+
+    async def receive():
+        return requests.pop(0) if requests else {"type": "http.disconnect"}
+
+    async def send(message):
+        messages.append(message)
+
+    await application(scope, receive, send)
+    start, bodies = messages[0], messages[1:]
+    return start["status"], dict(start["headers"]), bodies
+
+@pytest.fixture
+def asgi():
+    """Fixture to provide an ASGI adapter around the Flask app with a small worker pool."""
+    adapter = AsgiAdapter(app, max_workers=4)
+    yield adapter
+    adapter.executor.shutdown()
+
+@pytest.mark.usefixtures("prize_store")
+class TestAsgiAPI:
+    def test_list_prizes(self, asgi):
+        """
+        Test: List catalog 1 filtered by description 'script' with 5 prizes per page through the ASGI application.
+        Expectation: The same response as the WSGI application.
+        """
+        status, headers, bodies = asyncio.run(call(asgi, "GET", "/api/catalogs/1/prizes",
+                                                   b'filter={"description":"script"}&pagination={"page":1,"per_page":5}'))
+        assert status == 200
+        assert headers[b"content-type"] == b"application/json"
+        data = json.loads(b"".join(message["body"] for message in bodies))
+        assert data["total"] == 10
+        assert [prize["id"] for prize in data["prizes"]] == [1, 2, 3, 4, 5]
+
+    def test_create_prize(self, asgi, prize_store):
+        """
+        Test: Create a prize with a JSON body through the ASGI application.
+        Expectation: 201 Created and the prize is stored.
+        """
+        body = json.dumps({"title": "Async", "description": "Created over ASGI", "image": "url"}).encode()
+        status, _, _ = asyncio.run(call(asgi, "POST", "/api/catalogs/2/prize", body=body,
+                                        headers=[("content-type", "application/json")]))
+        assert status == 201
+        assert prize_store.get_prize(2, 21).title == "Async"
+
+    def test_export_is_streamed(self, asgi):
+        """
+        Test: Export catalog 3 as NDJSON with one prize per chunk through the ASGI application.
+        Expectation: One body message per chunk followed by a final empty message.
+        """
+        app.config["EXPORT_CHUNK_SIZE"], chunk_size = 1, app.config["EXPORT_CHUNK_SIZE"]
+        try:
+            status, _, bodies = asyncio.run(call(asgi, "GET", "/api/catalogs/3/prizes/export"))
+        finally:
+            app.config["EXPORT_CHUNK_SIZE"] = chunk_size
+        assert status == 200
+        assert len(bodies) == 11 and bodies[-1] == {"type": "http.response.body", "body": b"", "more_body": False}
+        assert [json.loads(message["body"])["id"] for message in bodies[:-1]] == list(range(21, 31))
+
+    def test_blocking_calls_use_bounded_pool(self, asgi, prize_store, monkeypatch):
+        """
+        Test: Send 40 concurrent requests whose storage call blocks for a while.
+        Expectation: Every request succeeds and no more than 4 storage calls run at the same time.
+        """
+        running = []
+        peak = []
+        lock = threading.Lock()
+        get_prize = prize_store.get_prize
+
+        def slow_get_prize(catalog_id, prize_id):
+            with lock:
+                running.append(1)
+                peak.append(len(running))
+            time.sleep(0.01)
+            with lock:
+                running.pop()
+            return get_prize(catalog_id, prize_id)
+
+        monkeypatch.setattr(prize_store, "get_prize", slow_get_prize)
+
+        async def many():
+            return await asyncio.gather(*[call(asgi, "GET", "/api/catalogs/1/prize/1") for _ in range(40)])
+
+        responses = asyncio.run(many())
+        assert [status for status, _, _ in responses] == [200] * 40
+        assert max(peak) <= 4
+
+    def test_lifespan(self, asgi):
+        """
+        Test: Run the ASGI lifespan startup and shutdown events.
+        Expectation: Both are acknowledged and the worker pool is shut down.
+        """
+        events = [{"type": "lifespan.startup"}, {"type": "lifespan.shutdown"}]
+        sent = []
+
+        async def receive():
+            return events.pop(0)
+
+        async def send(message):
+            sent.append(message["type"])
+
+        asyncio.run(asgi({"type": "lifespan"}, receive, send))
+        assert sent == ["lifespan.startup.complete", "lifespan.shutdown.complete"]
+        with pytest.raises(RuntimeError):
+            asgi.executor.submit(print)
@@ -0,0 +1,81 @@
+# pytest_fixture_batch.py
+# This script contains Pytest test cases for the bulk prize endpoint.
+# It tests batches mixing creations, updates and deletions, per-item results and validation.
+
+# Authors: Edoardo Sabatini - Data Worker and ChatGPT 3.5 Python Programmer
+# Date: May 22, 2024
+
+import pytest
+
+NEW_PRIZE = {"title": "Batch Prize", "description": "Created in a batch", "image": "batch_image_url"}
+
+@pytest.mark.usefixtures("client", "prize_store")
+class TestBatchAPI:
+    def test_mixed_batch(self, client):
+        """
+        Test: Create two prizes, update prize 2 and delete prize 3 of catalog 1 in one batch.
+        Expectation: One result per operation, new IDs 11 and 12, and the catalog reflects every change.
+        """
+        response = client.post('/api/catalogs/1/prizes:batch', json={"operations": [
+            {"op": "create", "prize": NEW_PRIZE},
+            {"op": "create", "prize": NEW_PRIZE},
+            {"op": "update", "id": 2, "prize": {"title": "Updated in batch"}},
+            {"op": "delete", "id": 3},
+        ]})
+        assert response.status_code == 200
+        results = response.get_json()["results"]
+        assert [result["status"] for result in results] == [201, 201, 200, 200]
+        assert [results[0]["prize"]["id"], results[1]["prize"]["id"]] == [11, 12]
+        assert results[2]["prize"]["title"] == "Updated in batch"
+
+        prizes = client.get('/api/catalogs/1/prizes').get_json()["prizes"]
+        assert [prize["id"] for prize in prizes] == [1, 2, 4, 5, 6, 7, 8, 9, 10, 11, 12]
+        assert prizes[1]["title"] == "Updated in batch"
+
+    def test_per_item_errors(self, client):
+        """
+        Test: Send a batch with a malformed operation, a missing prize and a valid deletion.
+        Expectation: The malformed operation gets 400, the missing prize 404, and the deletion still applies.
+        """
+        response = client.post('/api/catalogs/2/prizes:batch', json={"operations": [
+            {"op": "rename", "id": 11},
+            {"op": "delete", "id": 99},
+            {"op": "delete", "id": 11},
+        ]})
+        results = response.get_json()["results"]
+        assert [result["status"] for result in results] == [400, 404, 200]
+        assert client.get('/api/catalogs/2/prize/11').status_code == 404
+
+    def test_operations_apply_in_order(self, client):
+        """
+        Test: Delete prize 21 of catalog 3, then try to update it in the same batch.
+        Expectation: The update sees the deletion and fails with 404.
+        """
+        response = client.post('/api/catalogs/3/prizes:batch', json={"operations": [
+            {"op": "delete", "id": 21},
+            {"op": "update", "id": 21, "prize": {"title": "Too late"}},
+        ]})
+        results = response.get_json()["results"]
+        assert [result["status"] for result in results] == [200, 404]
+
+    def test_bulk_delete(self, client, prize_store):
+        """
+        Test: Delete all 10 prizes of catalog 4 and create one in the same batch, above the compaction threshold.
+        Expectation: Only the new prize remains, with the next ID after the deleted ones, and the tombstones are compacted away.
+        """
+        prize_store.catalog.compactor = None  # Compact right away instead of on the background thread
+        operations = [{"op": "delete", "id": prize_id} for prize_id in range(31, 41)]
+        operations.append({"op": "create", "prize": NEW_PRIZE})
+        response = client.post('/api/catalogs/4/prizes:batch', json={"operations": operations})
+        assert response.status_code == 200
+        prizes = client.get('/api/catalogs/4/prizes').get_json()["prizes"]
+        assert [prize["id"] for prize in prizes] == [41]
+        assert prize_store.catalog.catalogs[4] == prize_store.catalog.get_catalog(4) and not prize_store.catalog.tombstones[4]
+
+    def test_empty_batch(self, client):
+        """
+        Test: Send a batch without operations.
+        Expectation: The request is rejected with 400.
+        """
+        response = client.post('/api/catalogs/1/prizes:batch', json={"operations": []})
+        assert response.status_code == 400
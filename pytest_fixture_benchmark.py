@@ -0,0 +1,42 @@
+# pytest_fixture_benchmark.py
+# This script contains Pytest test cases for the API benchmark suite.
+# It runs the benchmark on small catalogs and tests the regression check against a baseline.
+
+# Authors: Edoardo Sabatini - Data Worker and ChatGPT 3.5 Python Programmer
+# Date: May 22, 2024
+
+import pytest
+import app as api_module
+from benchmark_api import compare, run, scenarios
+
+@pytest.mark.usefixtures("client", "prize_store")
+class TestBenchmark:
+    def test_every_scenario_runs(self, prize_store):
+        """
+        Test: Run every benchmark scenario a few times on catalogs of 10 and 100 prizes.
+        Expectation: Each scenario gets the expected status code and reports its speed; the API store is restored afterwards.
+        """
+        results = run([10, 100], iterations=3, warmup=1)
+        names = [name for name, _, _ in scenarios(10)]
+        assert list(results) == [f"{size}/{name}" for size in (10, 100) for name in names]
+        assert all(result["ops_per_sec"] > 0 and result["p50_ms"] <= result["p99_ms"] for result in results.values())
+        assert api_module.prize is prize_store
+
+    def test_regressions_beyond_threshold(self):
+        """
+        Test: Compare results against a baseline with a 20% threshold.
+        Expectation: Only throughput drops and p95 increases beyond 20% are reported; unknown benchmarks are ignored.
+        """
+        baseline = {
+            "10/get_prize": {"ops_per_sec": 1000.0, "p95_ms": 1.0},
+            "10/list_first_page": {"ops_per_sec": 1000.0, "p95_ms": 1.0},
+        }
+        results = {
+            "10/get_prize": {"ops_per_sec": 850.0, "p95_ms": 1.1},
+            "10/list_first_page": {"ops_per_sec": 700.0, "p95_ms": 1.5},
+            "10/new_scenario": {"ops_per_sec": 1.0, "p95_ms": 100.0},
+        }
+        assert compare(results, baseline, 0.2) == [
+            "10/list_first_page: 700.0 ops/s, baseline 1000.0 ops/s",
+            "10/list_first_page: p95 1.5 ms, baseline 1.0 ms",
+        ]
@@ -0,0 +1,84 @@
+# pytest_fixture_compaction.py
+# This script contains Pytest test cases for tombstone deletion and catalog compaction.
+# It tests that pages, cursors, filters and versions are the same before and after compaction.
+
+# Authors: Edoardo Sabatini - Data Worker and ChatGPT 3.5 Python Programmer
+# Date: May 22, 2024
+
+import json
+import pytest
+import app as api_module
+from data_simulation import COMPACTOR, Compactor, LiveView, Prize, Tombstone
+
+def listing(client, query):
+    """Return the IDs and total of a list_prizes request on catalog 1."""
+    data = client.get(f'/api/catalogs/1/prizes?{query}').get_json()
+    return [prize["id"] for prize in data["prizes"]], data["total"]
+
+def cursor_walk(client, per_page):
+    """Return the IDs of catalog 1 walked with cursors of per_page prizes."""
+    seen = []
+    cursor = None
+    while True:
+        pagination = json.dumps({"after": cursor, "per_page": per_page})
+        data = client.get(f'/api/catalogs/1/prizes?pagination={pagination}').get_json()
+        seen.extend(prize["id"] for prize in data["prizes"])
+        cursor = data["next_cursor"]
+        if cursor is None:
+            return seen
+
+@pytest.mark.usefixtures("client", "prize_store")
+class TestCompaction:
+    def test_live_view_positions(self):
+        """
+        Test: Index and slice a live view of a list with tombstones at its start, middle and end.
+        Expectation: Positions count live prizes only.
+        """
+        prizes = [Tombstone(1), 2, 3, Tombstone(4), Tombstone(5), 6, Tombstone(7)]
+        view = LiveView(prizes, [0, 3, 4, 6])
+        assert len(view) == 3 and list(view) == [2, 3, 6]
+        assert [view[0], view[1], view[2], view[-1]] == [2, 3, 6, 6]
+        assert view[1:] == [3, 6] and view[0:2] == [2, 3] and view[5:9] == []
+        with pytest.raises(IndexError):
+            view[3]
+
+    def test_tombstones_below_threshold(self, client, prize_store):
+        """
+        Test: Delete prizes 3 and 5 of catalog 1, below the compaction threshold, and list the catalog.
+        Expectation: The deleted prizes stay as tombstones but are skipped by pages, totals, cursors and filters.
+        """
+        for prize_id in (3, 5):
+            assert client.delete(f'/api/catalogs/1/prize/{prize_id}').status_code == 200
+        COMPACTOR.wait()
+        assert prize_store.catalog.tombstones[1] == [2, 4]
+
+        assert listing(client, 'pagination={"page":1,"per_page":4}') == ([1, 2, 4, 6], 8)
+        assert listing(client, 'pagination={"page":2,"per_page":4}') == ([7, 8, 9, 10], 8)
+        assert listing(client, 'filter={"description":"script"}&pagination={"page":1,"per_page":3}') == ([1, 2, 4], 8)
+        assert listing(client, 'filter={"id":"3"}') == ([], 0)
+        assert cursor_walk(client, 3) == [1, 2, 4, 6, 7, 8, 9, 10]
+        assert client.get('/api/catalogs/1/prize/5').status_code == 404
+
+    def test_compaction_keeps_pages_and_version(self, client, monkeypatch):
+        """
+        Test: Delete every third prize of a 300 prize catalog, above the compaction threshold, and wait for the compactor.
+        Expectation: The tombstones are gone, and pages, cursors and the catalog version are the same as before compaction.
+        """
+        store = Prize(num_catalogs=1, prizes_per_catalog=300)
+        monkeypatch.setattr(api_module, "prize", store)
+        api_module.response_cache.clear()
+        store.catalog.compactor = compactor = Compactor(autostart=False)  # Held back until the pages are read
+        for prize_id in range(3, 301, 3):
+            assert store.delete_prize(1, prize_id)
+        assert 1 in store.catalog.compaction_pending and store.catalog.tombstones[1]
+
+        before = [listing(client, f'pagination={{"page":{page},"per_page":7}}') for page in (1, 15, 29)]
+        walk = cursor_walk(client, 9)
+        version = store.catalog_version(1)
+        compactor.start()
+        compactor.wait()
+
+        assert not store.catalog.tombstones[1] and len(store.catalog.catalogs[1]) == 200
+        assert [listing(client, f'pagination={{"page":{page},"per_page":7}}') for page in (1, 15, 29)] == before
+        assert cursor_walk(client, 9) == walk == [prize_id for prize_id in range(1, 301) if prize_id % 3]
+        assert store.catalog_version(1) == version
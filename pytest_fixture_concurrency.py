@@ -0,0 +1,173 @@
+# pytest_fixture_concurrency.py
+# This script contains Pytest stress tests for the thread safety of the in-memory prize database.
+# It runs concurrent readers and writers and checks for lost updates and torn reads.
+
+# Authors: Edoardo Sabatini - Data Worker and ChatGPT 3.5 Python Programmer
+# Date: May 22, 2024
+
+import sys
+import threading
+import pytest
+from app import app
+from data_simulation import Prize
+from rwlock import ReadWriteLock
+
+WRITERS = 8
+READERS = 4
+ROUNDS = 200
+
+@pytest.fixture(autouse=True)
+def frequent_thread_switches():
+    """Fixture to make the interpreter switch threads as often as possible, so races show up quickly."""
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    yield
+    sys.setswitchinterval(interval)
+
+def run_threads(*targets):
+    """Start one thread per target, wait for all of them and re-raise the first failure."""
+    errors = []
+
+    def guarded(target):
+        try:
+            target()
+        except BaseException as error:
+            errors.append(error)
+
+    threads = [threading.Thread(target=guarded, args=(target,)) for target in targets]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    if errors:
+        raise errors[0]
+
+@pytest.mark.usefixtures("client", "prize_store")
+class TestConcurrency:
+    def test_no_lost_creations(self, prize_store):
+        """
+        Test: Create prizes in catalog 1 from several threads at once.
+        Expectation: Every creation gets its own ID and the catalog holds all of them.
+        """
+        created = []
+
+        def writer():
+            for _ in range(ROUNDS):
+                created.append(prize_store.create_prize(1, {"title": "T", "description": "D", "image": "I"}).id)
+
+        run_threads(*[writer] * WRITERS)
+        assert len(set(created)) == WRITERS * ROUNDS
+        assert prize_store.find_prizes(1)[1] == 10 + WRITERS * ROUNDS
+
+    def test_no_torn_reads(self, prize_store):
+        """
+        Test: Let writers apply batches that rename prizes 1 and 2 together and create prizes in pairs,
+        while readers list catalog 1.
+        Expectation: Readers always see both prizes with the same title and an even number of prizes.
+        """
+        def writer(name):
+            def write():
+                for round_number in range(ROUNDS):
+                    title = f"{name} {round_number}"
+                    fields = {"title": title, "description": "Pair", "image": "I"}
+                    prize_store.apply_batch(1, [
+                        {"op": "update", "id": 1, "prize": {"title": title}},
+                        {"op": "update", "id": 2, "prize": {"title": title}},
+                        {"op": "create", "prize": fields},
+                        {"op": "create", "prize": fields},
+                    ])
+            return write
+
+        def reader():
+            for _ in range(ROUNDS * 2):
+                prizes, total = prize_store.find_prizes(1)
+                assert prizes[0].title == prizes[1].title or prizes[0].title == "Prize 1"
+                assert total % 2 == 0 and len(prizes) == total
+
+        run_threads(*[writer(f"writer {number}") for number in range(WRITERS)], *[reader] * READERS)
+        prizes, total = prize_store.find_prizes(1)
+        assert prizes[0].title == prizes[1].title
+        assert total == 10 + 2 * WRITERS * ROUNDS
+
+    def test_concurrent_partial_updates(self, prize_store):
+        """
+        Test: Update the title and the image of prize 3 from different threads through the API.
+        Expectation: Neither field's last update is lost.
+        """
+        def updater(field):
+            def update():
+                client = app.test_client()
+                for round_number in range(ROUNDS):
+                    response = client.put('/api/catalogs/1/prize/3', json={field: f"{field} {round_number}"})
+                    assert response.status_code == 200
+            return update
+
+        run_threads(updater("title"), updater("image"))
+        stored = prize_store.get_prize(1, 3)
+        assert stored.title == f"title {ROUNDS - 1}"
+        assert stored.image == f"image {ROUNDS - 1}"
+
+    def test_lazy_catalog_materialized_once(self, monkeypatch):
+        """
+        Test: Read a lazily generated catalog from several threads at once.
+        Expectation: Every thread sees the complete catalog and it is generated only once.
+        """
+        store = Prize(lazy=True)
+        loader = store.catalog.loaders[2]
+        calls = []
+
+        def counting_loader():
+            calls.append(1)
+            return loader()
+
+        store.catalog.loaders[2] = counting_loader
+
+        def reader():
+            assert store.find_prizes(2)[1] == 10
+
+        run_threads(*[reader] * READERS * 2)
+        assert calls == [1]
+
+    def test_list_catalogs_during_materialization(self):
+        """
+        Test: List the catalogs of a store of 2000 lazily generated catalogs while other threads materialize them.
+        Expectation: Every listing holds all 2000 catalogs, each once, and none fails while the catalogs move.
+        """
+        store = Prize(2000, 1, lazy=True)
+
+        def materializer(first):
+            for catalog_id in range(first, 2001, READERS):
+                store.get_prize(catalog_id, catalog_id)
+
+        def lister():
+            while store.catalog.loaders:
+                assert sorted(store.catalog_ids()) == list(range(1, 2001))
+
+        run_threads(*[lambda first=first: materializer(first) for first in range(1, READERS + 1)], lister, lister)
+
+    def test_writer_excludes_readers(self):
+        """
+        Test: Hold a reader/writer lock for writing while other threads try to read and write.
+        Expectation: Nobody enters until the writer releases the lock, then readers share it.
+        """
+        lock = ReadWriteLock()
+        inside = []
+        released = threading.Event()
+
+        def reader():
+            with lock.read():
+                inside.append("reader")
+
+        def writer():
+            with lock.write():
+                inside.append("writer")
+
+        with lock.write():
+            threads = [threading.Thread(target=target) for target in (reader, reader, writer)]
+            for thread in threads:
+                thread.start()
+            released.wait(0.05)
+            assert inside == []
+        for thread in threads:
+            thread.join()
+        assert sorted(inside) == ["reader", "reader", "writer"]
@@ -0,0 +1,70 @@
+# pytest_fixture_cursor.py
+# This script contains Pytest test cases for cursor (keyset) pagination of list_prizes.
+# It tests walking a catalog page by page, filters, stability under deletions and invalid cursors.
+
+# Authors: Edoardo Sabatini - Data Worker and ChatGPT 3.5 Python Programmer
+# Date: May 22, 2024
+
+import json
+import pytest
+
+def list_page(client, catalog_id, after=None, per_page=4, filters=None):
+    """Helper function to request one cursor page and return the decoded JSON."""
+    params = {"pagination": json.dumps({"after": after, "per_page": per_page})}
+    if filters:
+        params["filter"] = json.dumps(filters)
+    response = client.get(f'/api/catalogs/{catalog_id}/prizes', query_string=params)
+    assert response.status_code == 200
+    return response.get_json()
+
+@pytest.mark.usefixtures("client", "prize_store")
+class TestCursorPagination:
+    def test_walk_catalog(self, client):
+        """
+        Test: Walk catalog 2 with cursor pages of 4 prizes.
+        Expectation: Pages of 4, 4 and 2 prizes covering IDs 11 to 20, the last one without next_cursor.
+        """
+        ids, cursor, pages = [], None, 0
+        while True:
+            data = list_page(client, 2, cursor)
+            assert data["total"] is None
+            ids += [prize["id"] for prize in data["prizes"]]
+            pages += 1
+            cursor = data["next_cursor"]
+            if cursor is None:
+                break
+        assert ids == list(range(11, 21))
+        assert pages == 3
+
+    def test_walk_with_filter(self, client):
+        """
+        Test: Walk catalog 1 filtered by ID 1 OR description 'prize 1' with cursor pages of 1 prize.
+        Expectation: Prizes 1 and 10 are returned in order, one per page.
+        """
+        filters = {"id": "1", "description": "prize 1", "logical_operator": "OR"}
+        first = list_page(client, 1, per_page=1, filters=filters)
+        assert [prize["id"] for prize in first["prizes"]] == [1]
+        second = list_page(client, 1, first["next_cursor"], per_page=1, filters=filters)
+        assert [prize["id"] for prize in second["prizes"]] == [10]
+        assert second["next_cursor"] is None
+
+    def test_stable_under_deletion(self, client):
+        """
+        Test: Read the first cursor page of catalog 1, delete a prize from it, then read the next page.
+        Expectation: The next page still starts right after the last prize seen, with no skipped prizes.
+        """
+        first = list_page(client, 1)
+        assert [prize["id"] for prize in first["prizes"]] == [1, 2, 3, 4]
+        client.delete('/api/catalogs/1/prize/2')
+        second = list_page(client, 1, first["next_cursor"])
+        assert [prize["id"] for prize in second["prizes"]] == [5, 6, 7, 8]
+
+    def test_invalid_cursor(self, client):
+        """
+        Test: Request a page with a malformed cursor and with a cursor issued for another catalog.
+        Expectation: Both requests are rejected with 400.
+        """
+        next_cursor = list_page(client, 1)["next_cursor"]
+        for catalog_id, cursor in ((1, "not-a-cursor"), (2, next_cursor)):
+            response = client.get(f'/api/catalogs/{catalog_id}/prizes', query_string={"pagination": json.dumps({"after": cursor, "per_page": 4})})
+            assert response.status_code == 400
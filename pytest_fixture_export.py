@@ -0,0 +1,54 @@
+# pytest_fixture_export.py
+# This script contains Pytest test cases for the streaming NDJSON catalog export.
+# It tests exporting whole catalogs, filtered exports and error handling.
+
+# Authors: Edoardo Sabatini - Data Worker and ChatGPT 3.5 Python Programmer
+# Date: May 22, 2024
+
+import json
+import pytest
+
+def read_ndjson(response):
+    """Helper function to decode a newline-delimited JSON response body."""
+    return [json.loads(line) for line in response.get_data().splitlines()]
+
+@pytest.mark.usefixtures("client", "prize_store")
+class TestExportAPI:
+    def test_export_catalog(self, client):
+        """
+        Test: Export catalog 2 without a filter.
+        Expectation: A streamed NDJSON response with one line per prize, IDs 11 to 20 in order.
+        """
+        response = client.get('/api/catalogs/2/prizes/export')
+        assert response.status_code == 200
+        assert response.mimetype == "application/x-ndjson"
+        assert response.is_streamed
+        prizes = read_ndjson(response)
+        assert [prize["id"] for prize in prizes] == list(range(11, 21))
+        assert prizes[0]["title"] == "Prize 11"
+
+    def test_export_with_filter(self, client):
+        """
+        Test: Export catalog 1 filtered by ID '2' OR description 'prize 1'.
+        Expectation: Prizes 1, 2 and 10 are exported, ignoring the 10-item page limit of list_prizes.
+        """
+        response = client.get('/api/catalogs/1/prizes/export?filter={"id":"2","description":"prize 1"}')
+        assert response.status_code == 200
+        assert [prize["id"] for prize in read_ndjson(response)] == [1, 2, 10]
+
+    def test_export_spans_chunks(self, client, monkeypatch):
+        """
+        Test: Export catalog 3 with chunks of 3 lines.
+        Expectation: All 10 prizes are exported across chunks.
+        """
+        monkeypatch.setitem(client.application.config, "EXPORT_CHUNK_SIZE", 3)
+        response = client.get('/api/catalogs/3/prizes/export')
+        assert len(read_ndjson(response)) == 10
+
+    def test_export_invalid_filter(self, client):
+        """
+        Test: Export catalog 1 with a description filter longer than 80 characters.
+        Expectation: The request is rejected with 400 like list_prizes.
+        """
+        response = client.get('/api/catalogs/1/prizes/export?filter={"description":"%s"}' % ("x" * 81))
+        assert response.status_code == 400
@@ -0,0 +1,83 @@
+# pytest_fixture_field_validation.py
+# This script contains Pytest test cases for the validation of prize fields on creation and update.
+# It tests that non-string fields are rejected and that a failed mutation leaves the catalog and its indexes unchanged.
+
+# Authors: Edoardo Sabatini - Data Worker and ChatGPT 3.5 Python Programmer
+# Date: May 22, 2024
+
+import pytest
+from data_simulation import PrizeDetails
+
+def snapshot(client):
+    """Return the ETag and the results of an unfiltered and a description-filtered listing of catalog 1."""
+    listing = client.get('/api/catalogs/1/prizes')
+    search = client.get('/api/catalogs/1/prizes?filter={"description":"prize 3 "}')
+    return listing.headers["ETag"], listing.get_json(), search.get_json()
+
+@pytest.mark.usefixtures("client", "prize_store")
+class TestFieldValidationAPI:
+    @pytest.mark.parametrize("method, path, body", [
+        ("post", "/api/catalogs/1/prize", {"title": "t", "description": 5, "image": "i"}),
+        ("post", "/api/catalogs/1/prize", {"title": "t", "description": "d"}),
+        ("put", "/api/catalogs/1/prize/3", {"description": 7}),
+        ("put", "/api/catalogs/1/prize/3", {"title": None}),
+    ])
+    def test_rejected_mutations_change_nothing(self, client, store, method, path, body):
+        """
+        Test: Create or update a prize with a non-string or missing field, after listing and searching catalog 1.
+        Expectation: The API returns 400 Bad Request, and the listing, the search results and the ETag are unchanged.
+        """
+        before = snapshot(client)
+        assert getattr(client, method)(path, json=body).status_code == 400
+        assert snapshot(client) == before
+        assert client.get('/api/catalogs/1/prize/11').status_code == 404
+
+class TestAtomicCatalogChanges:
+    def test_failed_update_leaves_indexes_unchanged(self, prize_store):
+        """
+        Test: Update a prize of an indexed catalog directly with a description that can't be indexed.
+        Expectation: The update raises, and the list, the ID index, the description index and the version are unchanged.
+        """
+        catalog = prize_store.catalog
+        catalog.description_index(1)
+        prize, version = catalog.find_prize(1, 3), catalog.version(1)
+        with pytest.raises(TypeError):
+            catalog.update_prize(1, prize, prize.title, 7, prize.image)
+        assert catalog.find_prize(1, 3) is prize and catalog.get_catalog(1)[2] is prize
+        assert catalog.description_index(1).candidates("prize 3 ") == [3]
+        assert catalog.version(1) == version
+
+    def test_failed_append_leaves_catalog_unchanged(self, prize_store):
+        """
+        Test: Add a prize whose description can't be indexed to an indexed catalog.
+        Expectation: The addition raises and the catalog keeps its 10 prizes, without the new one in its ID index.
+        """
+        catalog = prize_store.catalog
+        catalog.description_index(1)
+        with pytest.raises(TypeError):
+            catalog.add_prize(1, PrizeDetails(11, "t", 5, "i"))
+        assert len(catalog.get_catalog(1)) == 10
+        assert catalog.find_prize(1, 11) is None
+
+@pytest.mark.usefixtures("client", "prize_store")
+class TestBatchFieldValidation:
+    @pytest.mark.parametrize("operation", [
+        {"op": "create", "prize": {"title": None, "description": "d", "image": "i"}},
+        {"op": "create", "prize": {"title": "t", "description": 5, "image": "i"}},
+        {"op": "update", "id": 3, "prize": {"image": ["i"]}},
+    ])
+    def test_non_string_field_fails_its_operation(self, client, store, operation):
+        """
+        Test: Send a batch with a valid deletion followed by an operation with a non-string field.
+        Expectation: The deletion is applied, the other operation gets its own 400 result and changes nothing,
+        and the sorted listing holds the 9 remaining prizes.
+        """
+        operations = [{"op": "delete", "id": 2}, operation]
+        response = client.post('/api/catalogs/1/prizes:batch', json={"operations": operations})
+        assert response.status_code == 200
+        results = response.get_json()["results"]
+        assert [result["status"] for result in results] == [200, 400]
+        assert results[1]["error"].startswith("Prize ")
+        listing = client.get('/api/catalogs/1/prizes?sort=title').get_json()
+        assert listing["total"] == 9 and 11 not in [prize["id"] for prize in listing["prizes"]]
+        assert client.get('/api/catalogs/1/prize/3').get_json()["image"] == "https://example.com/image3.png"
@@ -0,0 +1,125 @@
+# pytest_fixture_id_allocator.py
+# This script contains Pytest test cases for the catalog and prize ID allocation.
+# It tests the allocator itself and the IDs handed out by every storage engine through the API.
+
+# Authors: Edoardo Sabatini - Data Worker and ChatGPT 3.5 Python Programmer
+# Date: May 22, 2024
+
+import sqlite3
+import pytest
+from id_allocator import CatalogIdAllocator, PrizeIdSequence
+from sqlite_storage import SQLitePrizeStore
+
+NEW_PRIZE = {"title": "New Prize", "description": "Description of the new prize", "image": "new_image_url"}
+
+class TestIdAllocator:
+    def test_lowest_free_catalog_id(self):
+        """
+        Test: Allocate catalog IDs after reserving 1, 2 and 5 and releasing 2.
+        Expectation: The IDs skipped or freed are handed out lowest first, then IDs above the high-water mark.
+        """
+        allocator = CatalogIdAllocator([1, 2, 5])
+        allocator.release(2)
+        allocator.reserve(3)  # Taken explicitly while free
+        assert [allocator.allocate() for _ in range(4)] == [2, 4, 6, 7]
+
+    def test_prize_sequence_is_monotonic(self):
+        """
+        Test: Advance a prize ID sequence past loaded IDs and allocate from it.
+        Expectation: IDs only grow, even when an older ID is passed to advance.
+        """
+        sequence = PrizeIdSequence()
+        sequence.advance(10)
+        sequence.advance(3)
+        assert [sequence.allocate(), sequence.allocate()] == [11, 12]
+
+@pytest.mark.usefixtures("client")
+class TestStoreIdAllocation:
+    def test_prize_ids_are_not_reused(self, client, store):
+        """
+        Test: Delete the last prize of catalog 1, then create prizes one by one and in a batch.
+        Expectation: New prizes get IDs after every ID ever used, so the deleted ID 10 is not handed out again.
+        """
+        assert client.delete('/api/catalogs/1/prize/10').status_code == 200
+        assert client.post('/api/catalogs/1/prize', json=NEW_PRIZE).get_json()["id"] == 11
+        assert client.delete('/api/catalogs/1/prize/11').status_code == 200
+
+        operations = [{"op": "create", "prize": NEW_PRIZE}, {"op": "create", "prize": NEW_PRIZE}]
+        results = client.post('/api/catalogs/1/prizes:batch', json={"operations": operations}).get_json()["results"]
+        assert [result["prize"]["id"] for result in results] == [12, 13]
+
+    def test_lowest_free_catalog_id(self, client, store):
+        """
+        Test: Delete catalogs 4 and 2, then create three catalogs.
+        Expectation: The freed IDs are reused lowest first, then a new ID above the highest catalog.
+        """
+        assert client.delete('/api/catalog/4').status_code == 200
+        assert client.delete('/api/catalog/2').status_code == 200
+        created = [client.post('/api/catalog', json={}).get_json()["catalog_id"] for _ in range(3)]
+        assert created == [2, 4, 6]
+        assert sorted(store.catalog_ids()) == [1, 2, 3, 4, 5, 6]
+
+    def test_prizes_do_not_recreate_deleted_catalogs(self, client, store):
+        """
+        Test: Delete catalog 2, create a prize in it, then create a catalog.
+        Expectation: The prize is rejected with 404 Not Found and catalog 2 stays deleted, so the new catalog reuses its ID
+        and then accepts prizes.
+        """
+        assert client.delete('/api/catalog/2').status_code == 200
+        assert client.post('/api/catalogs/2/prize', json=NEW_PRIZE).status_code == 404
+        assert 2 not in store.catalog_ids()
+        assert client.post('/api/catalog', json={}).get_json()["catalog_id"] == 2
+        assert client.post('/api/catalogs/2/prize', json=NEW_PRIZE).status_code == 201
+
+@pytest.mark.usefixtures("client")
+class TestSQLiteIdAllocation:
+    def test_allocation_survives_reopening(self, tmp_path):
+        """
+        Test: Free catalog 3 and the last prize of catalog 1, close the database and open it again.
+        Expectation: The reopened store hands out catalog 3 and prize ID 11.
+        """
+        path = str(tmp_path / "prizes.db")
+        store = SQLitePrizeStore(path)
+        store.delete_catalog(3)
+        store.delete_prize(1, 10)
+        store.close()
+
+        store = SQLitePrizeStore(path)
+        assert store.allocate_catalog() == 3
+        assert store.create_prize(1, NEW_PRIZE).id == 11
+        store.close()
+
+    def test_stale_free_ids_are_skipped(self, tmp_path):
+        """
+        Test: Mark the existing catalogs 1 and 2 as free in the database, then allocate two catalogs.
+        Expectation: The stale free IDs are dropped and the store creates and returns catalogs 6 and 7.
+        """
+        path = str(tmp_path / "prizes.db")
+        store = SQLitePrizeStore(path)
+        store.pool.connection().execute("INSERT INTO free_catalog_ids (id) VALUES (1), (2)")
+        assert [store.allocate_catalog(), store.allocate_catalog()] == [6, 7]
+        assert store.catalog_ids() == [1, 2, 3, 4, 5, 6, 7]
+        assert store.pool.connection().execute("SELECT COUNT(*) FROM free_catalog_ids").fetchone()[0] == 0
+        store.close()
+
+    def test_migrates_older_database(self, tmp_path):
+        """
+        Test: Open a database created before the ID allocation state existed, with catalog 2 missing.
+        Expectation: The next prize ID is derived from the stored prizes and the missing catalog ID is free.
+        """
+        path = str(tmp_path / "prizes.db")
+        store = SQLitePrizeStore(path, num_catalogs=3)
+        store.close()
+        connection = sqlite3.connect(path)
+        connection.executescript("""
+            DROP TABLE free_catalog_ids;
+            ALTER TABLE catalogs DROP COLUMN next_prize_id;
+            DELETE FROM catalogs WHERE id = 2;
+        """)
+        connection.close()
+
+        store = SQLitePrizeStore(path)
+        assert store.create_prize(3, NEW_PRIZE).id == 31
+        assert store.allocate_catalog() == 2
+        assert store.allocate_catalog() == 4
+        store.close()
@@ -0,0 +1,64 @@
+# pytest_fixture_load_test.py
+# This script contains Pytest test cases for the concurrent load generator.
+# It runs a short load test against the API served by a local threaded server.
+
+# Authors: Edoardo Sabatini - Data Worker and ChatGPT 3.5 Python Programmer
+# Date: May 22, 2024
+
+import threading
+import pytest
+from werkzeug.serving import make_server
+from app import app
+from load_test import Client, LoadTest
+
+@pytest.fixture
+def server_port(prize_store):
+    """Fixture to serve the API on a free local port from a background thread."""
+    server = make_server("localhost", 0, app, threaded=True)
+    thread = threading.Thread(target=server.serve_forever)
+    thread.start()
+    yield server.server_port
+    server.shutdown()
+    thread.join()
+
+@pytest.mark.usefixtures("client", "prize_store")
+class TestLoadTest:
+    def test_mixed_load(self, server_port, prize_store):
+        """
+        Test: Run 4 concurrent clients for half a second with half of the iterations running the prize or the catalog write flow.
+        Expectation: Every endpoint answers without errors and percentiles are ordered. The created prizes are all deleted again,
+        and the deleted catalogs are all recreated.
+        """
+        load_test = LoadTest("localhost", server_port, concurrency=4, duration=0.5, write_ratio=0.5, seed=1)
+        summary = load_test.summary(load_test.run())
+        assert {"list_prizes", "create_prize", "update_prize", "get_prize", "delete_prize", "total"} <= set(summary)
+        assert {"delete_catalog", "create_catalog", "get_catalog"} <= set(summary)
+        assert summary["total"]["errors"] == 0
+        assert all(stats["p50_ms"] <= stats["p95_ms"] <= stats["p99_ms"] for stats in summary.values())
+        assert [prize_details.id for prize_details in prize_store.get_prizes(1)] == list(range(1, 11))
+        assert sorted(prize_store.catalog_ids()) == [1, 2, 3, 4, 5]
+
+class DroppingConnection:
+    """Stand-in for an HTTP connection that the server drops on every request."""
+    def __init__(self):
+        self.sent = []
+
+    def request(self, method, path, body=None, headers=None):
+        self.sent.append(method)
+        raise ConnectionResetError()
+
+    def close(self):
+        pass
+
+class TestClientRetries:
+    def test_only_idempotent_requests_are_retried(self):
+        """
+        Test: Send a GET, a PUT, a DELETE and a POST over a connection that is dropped every time.
+        Expectation: The GET, PUT and DELETE are sent twice; the POST is sent once, as resending it could create twice.
+        """
+        client = Client("localhost", 1)
+        client.connection = DroppingConnection()
+        for method in ("GET", "PUT", "DELETE", "POST"):
+            with pytest.raises(ConnectionError):
+                client.request(method, "/api/catalogs", {} if method in ("PUT", "POST") else None)
+        assert client.connection.sent == ["GET", "GET", "PUT", "PUT", "DELETE", "DELETE", "POST"]
@@ -0,0 +1,87 @@
+# pytest_fixture_metrics.py
+# This script contains Pytest test cases for the request metrics and the /metrics endpoint.
+# It tests the counters, the per-stage latency histograms and the Prometheus text format.
+
+# Authors: Edoardo Sabatini - Data Worker and ChatGPT 3.5 Python Programmer
+# Date: May 22, 2024
+
+import pytest
+from metrics import Histogram, Registry
+
+def scrape(client):
+    """Fetch /metrics and return its samples as a dictionary from series to value."""
+    response = client.get('/metrics')
+    assert response.status_code == 200
+    assert response.mimetype == "text/plain"
+    samples = {}
+    for line in response.get_data(as_text=True).splitlines():
+        if line and not line.startswith("#"):
+            series, value = line.rsplit(" ", 1)
+            samples[series] = float(value)
+    return samples
+
+@pytest.mark.usefixtures("client", "prize_store")
+class TestMetrics:
+    def test_requests_are_counted(self, client):
+        """
+        Test: Request a prize listing twice, a missing prize and a prize update, then scrape /metrics.
+        Expectation: Each request is counted under its endpoint, method and status code and timed.
+        """
+        before = scrape(client)
+        client.get('/api/catalogs/1/prizes?filter={"description":"script"}')
+        client.get('/api/catalogs/1/prizes?filter={"description":"script"}')
+        client.get('/api/catalogs/1/prize/999')
+        client.put('/api/catalogs/1/prize/1', json={"title": "Measured"})
+        after = scrape(client)
+
+        def delta(series):
+            return after.get(series, 0) - before.get(series, 0)
+
+        assert delta('prize_requests_total{endpoint="list_prizes",method="GET",status="200"}') == 2
+        assert delta('prize_requests_total{endpoint="get_prize",method="GET",status="404"}') == 1
+        assert delta('prize_requests_total{endpoint="update_prize",method="PUT",status="200"}') == 1
+        assert delta('prize_request_duration_seconds_count{endpoint="list_prizes",method="GET"}') == 2
+        assert delta('prize_request_duration_seconds_bucket{endpoint="list_prizes",method="GET",le="+Inf"}') == 2
+
+    def test_list_prizes_stages(self, client):
+        """
+        Test: Request the same prize listing twice, then scrape /metrics.
+        Expectation: Both requests time validation; the first times storage and serialization, the second a cache hit.
+        """
+        before = scrape(client)
+        client.get('/api/catalogs/2/prizes?pagination={"page":1,"per_page":3}')
+        client.get('/api/catalogs/2/prizes?pagination={"page":1,"per_page":3}')
+        after = scrape(client)
+
+        for stage, expected in (("validation", 2), ("storage", 1), ("serialization", 1), ("cache", 1)):
+            series = f'prize_stage_duration_seconds_count{{endpoint="list_prizes",stage="{stage}"}}'
+            assert after[series] - before.get(series, 0) == expected
+
+    def test_histogram_format(self):
+        """
+        Test: Record observations in a labelled histogram and render the registry.
+        Expectation: Buckets are cumulative, end with +Inf, and label values are escaped.
+        """
+        registry = Registry()
+        histogram = registry.histogram("test_seconds", "Test histogram.", ("path",), buckets=(0.1, 1.0))
+        for value in (0.05, 0.5, 0.5, 3.0):
+            histogram.observe(value, 'a"b')
+        lines = registry.render().splitlines()
+
+        assert lines[:2] == ["# HELP test_seconds Test histogram.", "# TYPE test_seconds histogram"]
+        assert lines[2:] == [
+            'test_seconds_bucket{path="a\\"b",le="0.1"} 1',
+            'test_seconds_bucket{path="a\\"b",le="1.0"} 3',
+            'test_seconds_bucket{path="a\\"b",le="+Inf"} 4',
+            'test_seconds_sum{path="a\\"b"} 4.05',
+            'test_seconds_count{path="a\\"b"} 4',
+        ]
+
+    def test_bucket_bounds_are_inclusive(self):
+        """
+        Test: Observe a value equal to a bucket bound.
+        Expectation: The value is counted in that bucket, as Prometheus 'le' buckets require.
+        """
+        histogram = Histogram("bound_seconds", "Test histogram.", buckets=(0.1, 1.0))
+        histogram.observe(0.1)
+        assert histogram.series[()][0] == [1, 0, 0]
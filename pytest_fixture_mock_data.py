@@ -0,0 +1,52 @@
+# pytest_fixture_mock_data.py
+# This script contains Pytest test cases for the mock data generator.
+# It tests configurable sizes, batched generation and lazily materialized catalogs.
+
+# Authors: Edoardo Sabatini - Data Worker and ChatGPT 3.5 Python Programmer
+# Date: May 22, 2024
+
+from data_simulation import Prize
+
+class TestMockData:
+    def test_configurable_size(self):
+        """
+        Test: Generate 3 catalogs with 25 prizes each.
+        Expectation: Each catalog holds 25 prizes with IDs offset by catalog.
+        """
+        store = Prize(3, 25)
+        assert store.catalog.catalog_ids() == [1, 2, 3]
+        prizes = store.catalog.get_catalog(2)
+        assert len(prizes) == 25
+        assert prizes[0].id == 26 and prizes[-1].id == 50
+
+    def test_batches(self):
+        """
+        Test: Generate a catalog of 25 prizes in batches of 10.
+        Expectation: Three batches of 10, 10 and 5 prizes with consecutive IDs.
+        """
+        batches = list(Prize.generate_mock_batches(1, 25, batch_size=10))
+        assert [len(batch) for batch in batches] == [10, 10, 5]
+        assert [prize.id for batch in batches for prize in batch] == list(range(1, 26))
+
+    def test_lazy_catalogs(self):
+        """
+        Test: Register 3 catalogs lazily and access only catalog 2.
+        Expectation: All catalogs are listed, but only catalog 2 is materialized.
+        """
+        store = Prize(3, 10, lazy=True)
+        assert store.catalog.catalog_ids() == [1, 2, 3]
+        assert store.catalog.catalogs == {}
+
+        prizes, total = store.find_prizes(2, {"description": "prize 12 in"})
+        assert total == 1 and prizes[0].id == 12
+        assert list(store.catalog.catalogs) == [2]
+
+    def test_delete_lazy_catalog(self):
+        """
+        Test: Delete a catalog that was never accessed.
+        Expectation: The catalog is removed without being generated.
+        """
+        store = Prize(3, 10, lazy=True)
+        assert store.catalog.delete_catalog(3)
+        assert not store.catalog.has_catalog(3)
+        assert store.catalog.catalogs == {}
@@ -0,0 +1,99 @@
+# pytest_fixture_profiling.py
+# This script contains Pytest test cases for the opt-in request profiling.
+# It tests the profile header, the endpoint allow-list, 1-in-N sampling and the bound on stored profiles.
+
+# Authors: Edoardo Sabatini - Data Worker and ChatGPT 3.5 Python Programmer
+# Date: May 22, 2024
+
+import pstats
+import pytest
+import app as api_module
+from app import app
+from profiling import RequestProfiler
+
+@pytest.fixture
+def profiles(monkeypatch, tmp_path):
+    """Fixture to enable profiling into a temporary directory; returns a function installing a profiler."""
+    monkeypatch.setitem(app.config, "PROFILING", True)
+    directory = tmp_path / "profiles"
+
+    def install(**options):
+        monkeypatch.setattr(api_module, "profiler", RequestProfiler(str(directory), **options))
+        return directory
+
+    return install
+
+def stored(directory):
+    """Return the names of the stored profiles."""
+    return sorted(path.name for path in directory.glob("*.pstats")) if directory.exists() else []
+
+@pytest.mark.usefixtures("client", "prize_store")
+class TestProfiling:
+    def test_header_with_token(self, client, profiles):
+        """
+        Test: Request a prize listing with the profile header set to the configured token.
+        Expectation: One profile of the list_prizes view is written and named in the response.
+        """
+        directory = profiles(token="secret")
+        response = client.get('/api/catalogs/1/prizes?filter={"description":"script"}', headers={"X-Profile": "secret"})
+        assert response.status_code == 200
+        assert stored(directory) == [response.headers["X-Profile-File"]]
+
+        stats = pstats.Stats(str(directory / response.headers["X-Profile-File"]))
+        assert any(function_name == "list_prizes" for _, _, function_name in stats.stats)
+
+    def test_header_with_wrong_token(self, client, profiles):
+        """
+        Test: Request a prize listing with a wrong token, and with no token configured outside debug mode.
+        Expectation: No profile is written.
+        """
+        directory = profiles(token="secret")
+        response = client.get('/api/catalogs/1/prizes', headers={"X-Profile": "guess"})
+        assert "X-Profile-File" not in response.headers
+
+        directory = profiles()
+        client.get('/api/catalogs/1/prizes', headers={"X-Profile": "anything"})
+        assert stored(directory) == []
+
+    def test_allowlist(self, client, profiles):
+        """
+        Test: Allow-list the get_prize endpoint and request a prize and a listing.
+        Expectation: Only the get_prize request is profiled.
+        """
+        directory = profiles(endpoints=["get_prize"])
+        client.get('/api/catalogs/1/prize/1')
+        client.get('/api/catalogs/1/prizes')
+        assert [name.rsplit("-", 2)[1:] for name in stored(directory)] == [["get_prize", "allowlist.pstats"]]
+
+    def test_sampling(self, client, profiles):
+        """
+        Test: Sample 1 in 3 requests and send 9 listings and 3 single prize requests.
+        Expectation: Only list_prizes is sampled, with 3 profiles written.
+        """
+        directory = profiles(sample_every=3)
+        for page in range(1, 10):
+            client.get(f'/api/catalogs/1/prizes?pagination={{"page":{page},"per_page":1}}')
+            if page % 3 == 0:
+                client.get('/api/catalogs/1/prize/1')
+        assert len(stored(directory)) == 3
+        assert all("list_prizes-sample" in name for name in stored(directory))
+
+    def test_disk_usage_is_bounded(self, client, profiles):
+        """
+        Test: Profile 5 requests while keeping at most 2 profiles.
+        Expectation: Only the 2 most recent profiles remain.
+        """
+        directory = profiles(endpoints=["list_prizes"], max_files=2)
+        names = [client.get('/api/catalogs/1/prizes').headers["X-Profile-File"] for _ in range(5)]
+        assert stored(directory) == names[-2:]
+
+    def test_disabled(self, client, profiles, monkeypatch):
+        """
+        Test: Turn profiling off and request an allow-listed endpoint with a valid profile header.
+        Expectation: Nothing is profiled.
+        """
+        directory = profiles(endpoints=["list_prizes"], token="secret")
+        monkeypatch.setitem(app.config, "PROFILING", False)
+        response = client.get('/api/catalogs/1/prizes', headers={"X-Profile": "secret"})
+        assert "X-Profile-File" not in response.headers
+        assert stored(directory) == []
@@ -0,0 +1,83 @@
+# pytest_fixture_query_params.py
+# This script contains Pytest test cases for the memoized parsing of the listing query parameters.
+# It tests that repeated query strings share one immutable, normalized query and that errors are memoized too.
+
+# Authors: Edoardo Sabatini - Data Worker and ChatGPT 3.5 Python Programmer
+# Date: May 22, 2024
+
+import pytest
+from app import encode_cursor, parse_export, parse_listing, parse_query, parse_search
+
+@pytest.mark.usefixtures("client", "prize_store")
+class TestQueryParams:
+    def test_repeated_query_strings_share_one_query(self):
+        """
+        Test: Parse the same raw filter and pagination twice.
+        Expectation: The second parse is a cache hit returning the same query object.
+        """
+        first = parse_query(parse_listing, '{"description":"prize 4"}', '{"page":1,"per_page":5}')
+        hits = parse_query.cache_info().hits
+        assert parse_query(parse_listing, '{"description":"prize 4"}', '{"page":1,"per_page":5}') is first
+        assert parse_query.cache_info().hits == hits + 1
+
+    def test_queries_are_normalized_and_immutable(self):
+        """
+        Test: Parse the same pagination spelled with string numbers and with keys in another order, then modify the filter.
+        Expectation: Both spellings have the same key and integer values; the filter can't be modified.
+        """
+        spelled = parse_query(parse_listing, '{"id":"3"}', '{"page":"2","per_page":"5"}')
+        reordered = parse_query(parse_listing, '{"id":"3"}', '{"per_page":5, "page":2}')
+        assert spelled.key == reordered.key
+        assert dict(spelled.pagination) == {"page": 2, "per_page": 5}
+        with pytest.raises(TypeError):
+            spelled.filter["id"] = "4"
+
+    def test_search_and_export_queries(self):
+        """
+        Test: Parse a search without pagination and with unsorted duplicate catalogs, and an export with an invalid filter.
+        Expectation: The search gets the default page and sorted distinct catalogs; the export gets the filter error.
+        """
+        search = parse_query(parse_search, None, None, '[3,1,3]')
+        assert (dict(search.pagination), search.catalogs) == ({"page": 1, "per_page": 10}, (1, 3))
+        assert parse_query(parse_export, '{"id":"0"}').error == "Filter ID should be a positive integer."
+
+    def test_errors_are_memoized(self, client):
+        """
+        Test: Send the same invalid pagination twice.
+        Expectation: Both requests get the same 400 response, the second from the parse cache.
+        """
+        path = '/api/catalogs/1/prizes?pagination={"page":0,"per_page":5}'
+        first = client.get(path)
+        hits = parse_query.cache_info().hits
+        second = client.get(path)
+        assert first.status_code == second.status_code == 400
+        assert first.get_json() == second.get_json()
+        assert parse_query.cache_info().hits == hits + 1
+
+    def test_cursor_is_checked_against_each_catalog(self, client):
+        """
+        Test: Send the same cursor pagination to the catalog it was issued for and to another catalog.
+        Expectation: The shared parsed query still has its cursor decoded per catalog, so the other catalog rejects it.
+        """
+        pagination = f'{{"after":"{encode_cursor(1, 3)}","per_page":2}}'
+        response = client.get(f'/api/catalogs/1/prizes?pagination={pagination}')
+        assert [prize["id"] for prize in response.get_json()["prizes"]] == [4, 5]
+        assert client.get(f'/api/catalogs/2/prizes?pagination={pagination}').status_code == 400
+
+    @pytest.mark.parametrize("query", [
+        'filter=5',
+        'filter=[1]',
+        'filter="x"',
+        'pagination=[1]',
+        'pagination="x"',
+        'filter={"logical_operator":5}',
+        'filter={"logical_operator":null}',
+    ])
+    def test_parameters_of_the_wrong_type(self, client, query):
+        """
+        Test: List and export catalog 1 with valid JSON of the wrong type as filter, pagination or logical operator.
+        Expectation: Both endpoints reject the request with 400 Bad Request instead of failing.
+        """
+        assert client.get(f'/api/catalogs/1/prizes?{query}').status_code == 400
+        if query.startswith("filter"):
+            assert client.get(f'/api/catalogs/1/prizes/export?{query}').status_code == 400
@@ -0,0 +1,93 @@
+# pytest_fixture_query_planner.py
+# This script contains Pytest test cases for the compiled filter query planner.
+# It tests the access path chosen for a filter, the title and image filters and the explain option of every engine.
+
+# Authors: Edoardo Sabatini - Data Worker and ChatGPT 3.5 Python Programmer
+# Date: May 22, 2024
+
+import pytest
+from query_planner import CANDIDATES, EXACT, plan_filter
+
+def catalog_index(condition):
+    """Index capabilities of the in-memory catalogs, for planning without a store."""
+    if condition.field == "id":
+        return EXACT
+    return CANDIDATES if condition.field == "description" and len(condition.value) >= 3 else None
+
+def listing(client, query):
+    """Return the prize IDs, total and plan of a listing of catalog 1."""
+    data = client.get(f'/api/catalogs/1/prizes?{query}').get_json()
+    return [prize["id"] for prize in data["prizes"]], data["total"], data.get("plan")
+
+class TestPlanChoice:
+    def test_and_is_driven_by_the_id_index(self):
+        """
+        Test: Plan an ID AND description filter.
+        Expectation: The ID index drives the plan and the description is verified on the single row it returns.
+        """
+        plan = plan_filter({"id": "2", "description": "script", "logical_operator": "AND"}, catalog_index).explain()
+        assert plan["access_path"] == "id_index"
+        assert plan["index_conditions"] == ["id = 2"]
+        assert plan["residual"] == "description contains 'script'"
+
+    def test_or_unions_index_lookups(self):
+        """
+        Test: Plan an OR of two indexed conditions, and an OR including a title, which has no index.
+        Expectation: The first is the union of both lookups; the second must scan the catalog.
+        """
+        assert plan_filter({"id": "2", "description": "prize 3 "}, catalog_index).access_path == "union"
+        assert plan_filter({"id": "2", "title": "Prize 3"}, catalog_index).access_path == "scan"
+
+    def test_short_description_and_empty_filters(self):
+        """
+        Test: Plan a description shorter than an n-gram, an empty filter and a filter without a usable condition.
+        Expectation: The first two scan the catalog, the last matches nothing without reading a row.
+        """
+        assert plan_filter({"description": "ip"}, catalog_index).access_path == "scan"
+        assert plan_filter({}, catalog_index).access_path == "scan"
+        assert plan_filter({"logical_operator": "AND"}, catalog_index).access_path == "none"
+
+@pytest.mark.usefixtures("client", "prize_store")
+class TestPlannerAPI:
+    def test_title_and_image_filters(self, client, store):
+        """
+        Test: Filter catalog 1 by title, by image OR ID, and by title AND description.
+        Expectation: Every engine matches the new fields the same way as descriptions.
+        """
+        assert listing(client, 'filter={"title":"Prize 1"}')[:2] == ([1, 10], 2)
+        assert listing(client, 'filter={"image":"image3.","id":"7"}')[:2] == ([3, 7], 2)
+        assert listing(client, 'filter={"title":"Prize 1","description":"prize 10 ","logical_operator":"AND"}')[:2] == ([10], 1)
+
+    def test_explain_reports_the_plan(self, client, store):
+        """
+        Test: List catalog 1 with explain=true and an ID AND description filter.
+        Expectation: The listing is unchanged and carries the plan of the engine.
+        """
+        query = 'filter={"id":"2","description":"script","logical_operator":"AND"}'
+        prizes, total, plan = listing(client, f'{query}&explain=true')
+        assert (prizes, total) == ([2], 1)
+        assert plan["access_path"] in ("id_index", "sqlite")
+        assert listing(client, query) == ([2], 1, None)
+
+    def test_explain_counts_examined_rows(self, client):
+        """
+        Test: Explain an ID AND description filter, a selective description filter and a title filter on the in-memory store.
+        Expectation: The indexes examine only the matching rows; the title filter scans all 10 prizes of the catalog.
+        """
+        assert listing(client, 'filter={"id":"2","description":"script","logical_operator":"AND"}&explain=true')[2]["rows_examined"] == 1
+        plan = listing(client, 'filter={"description":"prize 3 "}&explain=true')[2]
+        assert (plan["access_path"], plan["rows_examined"]) == ("text_index", 1)
+        plan = listing(client, 'filter={"title":"Prize 1"}&explain=true')[2]
+        assert (plan["access_path"], plan["rows_examined"]) == ("scan", 10)
+
+    @pytest.mark.parametrize("query", [
+        'pagination={"after":null,"per_page":5}&explain=true',
+        'filter={"title":"' + "x" * 81 + '"}',
+        'filter={"image":5}',
+    ])
+    def test_invalid_requests(self, client, query):
+        """
+        Test: Explain a cursor page, and filter by an overlong title or a non-string image.
+        Expectation: The API returns 400 Bad Request.
+        """
+        assert client.get(f'/api/catalogs/1/prizes?{query}').status_code == 400
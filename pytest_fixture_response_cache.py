@@ -0,0 +1,81 @@
+# pytest_fixture_response_cache.py
+# This script contains Pytest test cases for the list_prizes response cache.
+# It tests ETag revalidation, cache hits and invalidation after prize mutations.
+
+# Authors: Edoardo Sabatini - Data Worker and ChatGPT 3.5 Python Programmer
+# Date: May 22, 2024
+
+import pytest
+import app as api_module
+from response_cache import ResponseCache
+
+LIST_URL = '/api/catalogs/1/prizes?filter={"description":"prize"}&pagination={"page":1,"per_page":4}'
+
+class TestResponseCache:
+    def test_lru_eviction(self):
+        """
+        Test: Store three entries in a cache bounded to two, after reading the first one.
+        Expectation: The least recently used entry is evicted.
+        """
+        cache = ResponseCache(max_entries=2)
+        cache.put("a", b"1")
+        cache.put("b", b"2")
+        assert cache.get("a") == b"1"
+        cache.put("c", b"3")
+        assert cache.get("b") is None
+        assert cache.get("a") == b"1" and cache.get("c") == b"3"
+
+@pytest.mark.usefixtures("client", "prize_store")
+class TestListPrizesETag:
+    def test_not_modified(self, client):
+        """
+        Test: Repeat a list request with the ETag of the first response.
+        Expectation: The second response is a 304 with the same ETag and no body.
+        """
+        response = client.get(LIST_URL)
+        assert response.status_code == 200
+        etag = response.headers["ETag"]
+
+        response = client.get(LIST_URL, headers={"If-None-Match": etag})
+        assert response.status_code == 304
+        assert response.headers["ETag"] == etag
+        assert response.get_data() == b""
+
+    def test_cache_hit(self, client):
+        """
+        Test: Repeat the same list request with the filter keys in a different order.
+        Expectation: The second request is served from the cache with an identical body.
+        """
+        first = client.get(LIST_URL)
+        hits = api_module.response_cache.hits
+        second = client.get('/api/catalogs/1/prizes?pagination={"per_page":4,"page":1}&filter={"description":"prize"}')
+        assert api_module.response_cache.hits == hits + 1
+        assert second.get_data() == first.get_data()
+
+    def test_invalidated_by_update(self, client):
+        """
+        Test: Update a prize of catalog 1, then revalidate the earlier listing.
+        Expectation: The ETag changes and the new listing shows the updated title.
+        """
+        response = client.get(LIST_URL)
+        etag = response.headers["ETag"]
+
+        client.put('/api/catalogs/1/prize/2', json={"title": "Renamed Prize"})
+
+        response = client.get(LIST_URL, headers={"If-None-Match": etag})
+        assert response.status_code == 200
+        assert response.headers["ETag"] != etag
+        assert response.get_json()["prizes"][1]["title"] == "Renamed Prize"
+
+    def test_other_catalog_unaffected(self, client):
+        """
+        Test: Delete a prize of catalog 2, then revalidate a listing of catalog 1.
+        Expectation: Catalog 1 keeps its ETag and still answers 304.
+        """
+        response = client.get(LIST_URL)
+        etag = response.headers["ETag"]
+
+        client.delete('/api/catalogs/2/prize/15')
+
+        response = client.get(LIST_URL, headers={"If-None-Match": etag})
+        assert response.status_code == 304
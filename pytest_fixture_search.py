@@ -0,0 +1,103 @@
+# pytest_fixture_search.py
+# This script contains Pytest test cases for the cross-catalog search endpoint.
+# It tests the merged order, global pagination across catalog boundaries, catalog selection and the fan-out cap.
+
+# Authors: Edoardo Sabatini - Data Worker and ChatGPT 3.5 Python Programmer
+# Date: May 22, 2024
+
+import pytest
+from app import app
+
+def search(client, query):
+    """Return the (catalog ID, prize ID) pairs and total of a search."""
+    data = client.get(f'/api/prizes/search?{query}').get_json()
+    return [(prize["catalog_id"], prize["id"]) for prize in data["prizes"]], data["total"]
+
+@pytest.mark.usefixtures("client", "prize_store")
+class TestSearchAPI:
+    def test_pages_follow_catalog_order(self, client, store):
+        """
+        Test: Walk every page of a search matching all 50 prizes, 7 per page.
+        Expectation: The pages join into every prize ordered by catalog then ID, pages crossing catalog boundaries included.
+        """
+        seen = []
+        for page in range(1, 9):
+            matches, total = search(client, f'filter={{"description":"script"}}&pagination={{"page":{page},"per_page":7}}')
+            assert total == 50
+            seen.extend(matches)
+        assert seen == [(catalog_id, prize_id) for catalog_id in range(1, 6)
+                        for prize_id in range((catalog_id - 1) * 10 + 1, catalog_id * 10 + 1)]
+
+    def test_selected_catalogs_and_filters(self, client, store):
+        """
+        Test: Search catalogs 4 and 2 only, and search every catalog for one prize ID.
+        Expectation: Only the selected catalogs are searched, in ascending order; the ID filter finds the prize in its catalog.
+        """
+        assert search(client, 'catalogs=[4,2]&pagination={"page":2,"per_page":8}') == ([(2, 19), (2, 20)] + [(4, prize_id) for prize_id in range(31, 37)], 20)
+        assert search(client, 'filter={"id":"25"}') == ([(3, 25)], 1)
+        assert search(client, 'filter={"id":"25","description":"hello","logical_operator":"AND"}') == ([], 0)
+
+    def test_reflects_changes(self, client):
+        """
+        Test: Search, delete catalog 1 and a prize of catalog 2, then search again.
+        Expectation: The second search is not served stale from the response cache.
+        """
+        assert search(client, 'pagination={"page":1,"per_page":2}') == ([(1, 1), (1, 2)], 50)
+        client.delete('/api/catalog/1')
+        client.delete('/api/catalogs/2/prize/11')
+        assert search(client, 'pagination={"page":1,"per_page":2}') == ([(2, 12), (2, 13)], 39)
+
+    @pytest.mark.parametrize("query, status", [
+        ('pagination={"page":1,"per_page":11}', 400),
+        ('pagination={"page":0,"per_page":5}', 400),
+        ('filter={"id":"x"}', 400),
+        ('catalogs=["a"]', 400),
+        ('catalogs=[1,9]', 404),
+        ('filter=not-json', 400),
+        ('filter=[1]', 400),
+        ('pagination=[1]', 400),
+        ('pagination="x"', 400),
+        ('catalogs=[]', 400),
+        ('catalogs={"1":1}', 400),
+    ])
+    def test_invalid_requests(self, client, query, status):
+        """
+        Test: Search with invalid pagination, filters or catalogs.
+        Expectation: The request is rejected with the given status code.
+        """
+        assert client.get(f'/api/prizes/search?{query}').status_code == status
+
+    def test_fan_out_cap(self, client, monkeypatch):
+        """
+        Test: Search with the counted fan-out capped at 3 catalogs, with and without selecting catalogs or counting the total.
+        Expectation: Counting all 5 catalogs is rejected; searching 3 selected catalogs, or all 5 without a total, is served.
+        """
+        monkeypatch.setitem(app.config, "SEARCH_MAX_CATALOGS", 3)
+        assert client.get('/api/prizes/search').status_code == 400
+        assert search(client, 'catalogs=[1,3,5]&pagination={"page":3,"per_page":10}') == ([(5, prize_id) for prize_id in range(41, 51)], 30)
+        assert search(client, 'total=false&pagination={"page":5,"per_page":10}') == ([(5, prize_id) for prize_id in range(41, 51)], None)
+
+    def test_uncounted_search_stops_once_the_page_is_filled(self, client, store, monkeypatch):
+        """
+        Test: Search every catalog without a total for a page crossing from catalog 2 into catalog 3, recording the catalogs read.
+        Expectation: The page matches the counted search, the total is null, and catalogs 4 and 5 are never read.
+        """
+        query = 'pagination={"page":3,"per_page":8}'
+        counted = search(client, query)
+        read = []
+        find_prizes = store.find_prizes
+        def recording_find_prizes(catalog_id, *args, **kwargs):
+            read.append((catalog_id, args[1]["per_page"]))
+            return find_prizes(catalog_id, *args, **kwargs)
+        monkeypatch.setattr(store, "find_prizes", recording_find_prizes)
+        assert search(client, f'{query}&total=false') == (counted[0], None)
+        assert read == [(1, 24), (2, 14), (3, 4)]
+
+    def test_depth_cap(self, client, monkeypatch):
+        """
+        Test: Search with the depth capped at 20 matches, for the page ending at the 20th match and the next one.
+        Expectation: The first page is served, the next one is rejected with 400 Bad Request.
+        """
+        monkeypatch.setitem(app.config, "SEARCH_MAX_DEPTH", 20)
+        assert search(client, 'total=false&pagination={"page":2,"per_page":10}')[0][-1] == (2, 20)
+        assert client.get('/api/prizes/search?total=false&pagination={"page":3,"per_page":10}').status_code == 400
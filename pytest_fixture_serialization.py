@@ -0,0 +1,43 @@
+# pytest_fixture_serialization.py
+# This script contains Pytest test cases for the pre-serialized prize JSON fragments.
+# It tests that responses assembled from fragments match the prize data and follow updates.
+
+# Authors: Edoardo Sabatini - Data Worker and ChatGPT 3.5 Python Programmer
+# Date: May 22, 2024
+
+import json
+import pytest
+from data_simulation import PrizeDetails
+
+class TestPrizeFragment:
+    def test_fragment_matches_prize(self):
+        """
+        Test: Serialize a prize with a non-ASCII title.
+        Expectation: The cached fragment decodes to the prize data and is reused on the next call.
+        """
+        prize = PrizeDetails(7, "Caffè", "Espresso machine", "https://example.com/image7.png")
+        fragment = prize.to_json()
+        assert json.loads(fragment) == prize.to_dict()
+        assert prize.to_json() is fragment
+
+@pytest.mark.usefixtures("client", "prize_store")
+class TestFragmentResponses:
+    def test_list_and_get_agree(self, client):
+        """
+        Test: Retrieve prize 3 of catalog 1 from the listing and on its own.
+        Expectation: Both responses carry the same prize data.
+        """
+        listing = client.get('/api/catalogs/1/prizes?filter={"id":"3"}').get_json()
+        single = client.get('/api/catalogs/1/prize/3').get_json()
+        assert listing == {"total": 1, "prizes": [single]}
+        assert single["title"] == "Prize 3"
+
+    def test_fragment_follows_update(self, client):
+        """
+        Test: Serve prize 3 of catalog 1, update its image, then serve it again.
+        Expectation: The second response shows the new image.
+        """
+        client.get('/api/catalogs/1/prize/3')
+        client.put('/api/catalogs/1/prize/3', json={"image": "https://example.com/new.png"})
+        data = client.get('/api/catalogs/1/prize/3').get_json()
+        assert data["image"] == "https://example.com/new.png"
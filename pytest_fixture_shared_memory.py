@@ -0,0 +1,105 @@
+# pytest_fixture_shared_memory.py
+# This script contains Pytest test cases for the shared memory storage engine.
+# It tests the API served from shared segments and changes made by other processes.
+
+# Authors: Edoardo Sabatini - Data Worker and ChatGPT 3.5 Python Programmer
+# Date: May 22, 2024
+
+import multiprocessing
+import pytest
+from shared_storage import SharedMemoryPrizeStore
+
+def create_prize_in_other_process(name, lock_path):
+    """Attach to an existing shared memory store and create a prize in catalog 2."""
+    store = SharedMemoryPrizeStore(name, lock_path=lock_path)
+    store.create_prize(2, {"title": "From another worker", "description": "Shared prize", "image": "url"})
+    store.close()
+
+@pytest.mark.usefixtures("client", "shared_store")
+class TestSharedMemoryStorage:
+    @pytest.mark.parametrize("query, expected_total, expected_ids", [
+        ('', 10, list(range(1, 11))),
+        ('?filter={"description":"script"}&pagination={"page":2,"per_page":4}', 10, [5, 6, 7, 8]),
+        ('?filter={"description":"prize 1"}', 2, [1, 10]),
+        ('?filter={"description":"Prize"}', 0, []),
+        ('?filter={"id":"2","description":"hello"}', 1, [2]),
+        ('?filter={"id":"2","description":"hello","logical_operator":"AND"}', 0, []),
+        ('?filter={"id":"2","description":"script","logical_operator":"AND"}', 1, [2]),
+    ])
+    def test_filters_on_shared_segments(self, client, query, expected_total, expected_ids):
+        """
+        Test: List catalog 1 of the shared memory store with ID and description filters and pagination.
+        Expectation: The same totals and prizes as the in-memory storage; text found only in titles does not match.
+        """
+        data = client.get(f'/api/catalogs/1/prizes{query}').get_json()
+        assert data["total"] == expected_total
+        assert [prize["id"] for prize in data["prizes"]] == expected_ids
+
+    def test_cursor_pagination(self, client):
+        """
+        Test: Walk catalog 3 of the shared memory store with cursors of 4 prizes.
+        Expectation: Every prize is returned once, in ID order.
+        """
+        seen = []
+        cursor = None
+        while True:
+            data = client.get(f'/api/catalogs/3/prizes?pagination={{"after":{"null" if cursor is None else chr(34) + cursor + chr(34)},"per_page":4}}').get_json()
+            seen.extend(prize["id"] for prize in data["prizes"])
+            cursor = data["next_cursor"]
+            if cursor is None:
+                break
+        assert seen == list(range(21, 31))
+
+    def test_changes_visible_to_other_instances(self, client, shared_store, tmp_path):
+        """
+        Test: Attach a second store instance to the same segments, as another worker would, and change data through the API.
+        Expectation: The second instance sees every change and reports the same catalog versions.
+        """
+        other = SharedMemoryPrizeStore(shared_store.name, lock_path=str(tmp_path / "prizes.lock"))
+        try:
+            client.put('/api/catalogs/4/prize/31', json={"title": "Renamed by worker one"})
+            client.delete('/api/catalogs/4/prize/32')
+            assert other.get_prize(4, 31).title == "Renamed by worker one"
+            assert other.get_prize(4, 32) is None
+            assert other.catalog_version(4) == shared_store.catalog_version(4)
+
+            assert other.delete_catalog(5)
+            assert client.get('/api/catalog/5').status_code == 404
+        finally:
+            other.close()
+
+    def test_changes_from_another_process(self, shared_store, tmp_path):
+        """
+        Test: Create a prize from a separate process attached to the same shared memory.
+        Expectation: This process sees the new prize after the other process exits.
+        """
+        process = multiprocessing.get_context("fork").Process(
+            target=create_prize_in_other_process, args=(shared_store.name, str(tmp_path / "prizes.lock"))
+        )
+        process.start()
+        process.join()
+        assert process.exitcode == 0
+        assert shared_store.get_prize(2, 21).title == "From another worker"
+
+    def test_batch_without_changes_is_not_published(self, shared_store):
+        """
+        Test: Apply a batch to catalog 1 whose operations all target missing prizes, then one that deletes a prize.
+        Expectation: The first batch reports its failures without publishing a new catalog version; the second publishes one.
+        """
+        version = shared_store.catalog_version(1)
+        outcomes = shared_store.apply_batch(1, [{"op": "delete", "id": 99}, {"op": "update", "id": 98, "prize": {"title": "x"}}])
+        assert outcomes == [None, None]
+        assert shared_store.catalog_version(1) == version
+        assert shared_store.apply_batch(1, [{"op": "delete", "id": 2}]) == [True]
+        assert shared_store.catalog_version(1) != version
+
+    def test_readers_keep_a_consistent_copy(self, shared_store):
+        """
+        Test: Start iterating over catalog 1, then delete its prizes before the iteration ends.
+        Expectation: The iteration still returns the catalog as it was when it started.
+        """
+        prizes = shared_store.iter_prizes(1)
+        first = next(prizes)
+        shared_store.apply_batch(1, [{"op": "delete", "id": prize_id} for prize_id in range(2, 11)])
+        assert [first.id] + [prize.id for prize in prizes] == list(range(1, 11))
+        assert shared_store.find_prizes(1)[1] == 1
@@ -0,0 +1,86 @@
+# pytest_fixture_snapshot.py
+# This script contains Pytest test cases for the binary catalog snapshot.
+# It tests writing a snapshot, mapping it back lazily and serving the API from it.
+
+# Authors: Edoardo Sabatini - Data Worker and ChatGPT 3.5 Python Programmer
+# Date: May 22, 2024
+
+import pytest
+import app as api_module
+from app import app
+from data_simulation import Prize
+from snapshot import write_snapshot
+
+@pytest.mark.usefixtures("client", "prize_store")
+class TestSnapshot:
+    def test_round_trip(self, prize_store, tmp_path):
+        """
+        Test: Write the prize store to a snapshot, including an edited prize with non-ASCII text, and load it back.
+        Expectation: Every catalog holds the same prizes in the same order.
+        """
+        prize_store.catalog.update_prize(1, prize_store.get_prize(1, 3), "Prémio", "Viagem a São Paulo ✈", "image")
+        path = tmp_path / "prizes.snap"
+        assert write_snapshot(prize_store, path) == 50
+
+        loaded = Prize(snapshot_path=path)
+        assert loaded.catalog_ids() == prize_store.catalog_ids()
+        for catalog_id in prize_store.catalog_ids():
+            expected = [prize.to_dict() for prize in prize_store.catalog.get_catalog(catalog_id)]
+            assert [prize.to_dict() for prize in loaded.catalog.get_catalog(catalog_id)] == expected
+
+    def test_catalogs_decoded_on_first_access(self, prize_store, tmp_path):
+        """
+        Test: Load a snapshot and read a prize from catalog 2 only.
+        Expectation: Catalog 2 is decoded while the other catalogs stay mapped but not decoded.
+        """
+        path = tmp_path / "prizes.snap"
+        write_snapshot(prize_store, path)
+
+        loaded = Prize(snapshot_path=path)
+        assert sorted(loaded.catalog.loaders) == [1, 2, 3, 4, 5]
+        assert loaded.get_prize(2, 15).title == "Prize 15"
+        assert sorted(loaded.catalog.loaders) == [1, 3, 4, 5]
+
+    def test_serve_from_snapshot(self, client, prize_store, tmp_path, monkeypatch):
+        """
+        Test: Delete a prize, snapshot the store and serve the API from the loaded snapshot.
+        Expectation: Listings and filters reflect the snapshot contents.
+        """
+        prize_store.delete_prize(3, 25)
+        path = tmp_path / "prizes.snap"
+        write_snapshot(prize_store, path)
+        monkeypatch.setattr(api_module, "prize", Prize(snapshot_path=path))
+        api_module.response_cache.clear()
+
+        data = client.get('/api/catalogs/3/prizes?filter={"description":"catalog 3"}').get_json()
+        assert data["total"] == 9
+        assert 25 not in [prize["id"] for prize in data["prizes"]]
+
+    @pytest.mark.parametrize("engine", ["prize_store", "sqlite_store"])
+    def test_deleted_prize_ids_stay_retired(self, request, engine, tmp_path):
+        """
+        Test: Create and delete a prize in catalog 1, delete its last mock prize, snapshot the store and load the snapshot.
+        Expectation: The loaded catalog records the next prize ID 12, so a new prize gets ID 12 and not a deleted ID.
+        """
+        store = request.getfixturevalue(engine)
+        created = store.create_prize(1, {"title": "t", "description": "d", "image": "i"})
+        assert store.delete_prize(1, created.id) and store.delete_prize(1, 10)
+        path = tmp_path / "prizes.snap"
+        write_snapshot(store, path)
+
+        loaded = Prize(snapshot_path=path)
+        assert loaded.next_prize_id(1) == 12
+        assert loaded.create_prize(1, {"title": "t", "description": "d", "image": "i"}).id == 12
+        assert Prize(snapshot_path=path).next_prize_id(2) == 21
+
+    def test_save_snapshot_command(self, prize_store, tmp_path):
+        """
+        Test: Run the save-snapshot CLI command.
+        Expectation: The snapshot file is written and holds every prize.
+        """
+        path = tmp_path / "cli.snap"
+        result = app.test_cli_runner().invoke(args=["save-snapshot", str(path)])
+        assert result.exit_code == 0
+        assert "Wrote 50 prizes" in result.output
+        assert sum(len(batch) for catalog_id in range(1, 6)
+                   for batch in Prize(snapshot_path=path).catalog.loaders[catalog_id]()) == 50
@@ -0,0 +1,169 @@
+# pytest_fixture_sort.py
+# This script contains Pytest test cases for the sort parameter of list_prizes.
+# It tests the sorted indexes, their maintenance and lazy build, and the sorted listings of every storage engine.
+
+# Authors: Edoardo Sabatini - Data Worker and ChatGPT 3.5 Python Programmer
+# Date: May 22, 2024
+
+import threading
+import time
+import pytest
+import data_simulation
+from data_simulation import PrizeDetails
+from sort_index import OrderedView, SortedIndex, parse_sort
+
+def sorted_ids(client, query):
+    """Return the prize IDs and total of a listing of catalog 1."""
+    data = client.get(f'/api/catalogs/1/prizes?{query}').get_json()
+    return [prize["id"] for prize in data["prizes"]], data["total"]
+
+class TestSortedIndex:
+    def test_parse_sort(self):
+        """
+        Test: Parse ascending, descending, default and unknown sorts.
+        Expectation: Fields become (field, descending) tuples, the ID order None and unknown fields False.
+        """
+        assert parse_sort("title") == ("title", False)
+        assert parse_sort("-id") == ("id", True)
+        assert parse_sort("id") is None and parse_sort(None) is None
+        assert parse_sort("price") is False
+
+    def test_index_stays_sorted(self):
+        """
+        Test: Build an index by title, add a prize and remove another.
+        Expectation: The keys stay sorted by title, then ID, and the removed prize is gone.
+        """
+        prizes = [PrizeDetails(prize_id, title, "", "") for prize_id, title in [(1, "b"), (2, "a"), (3, "b")]]
+        index = SortedIndex("title", prizes)
+        index.add(PrizeDetails(4, "a", "", ""))
+        index.remove(prizes[0])
+        assert index.keys == [("a", 2), ("a", 4), ("b", 3)]
+
+    def test_ordered_view_slices(self):
+        """
+        Test: Slice pages out of an ascending and a descending view.
+        Expectation: Pages follow the order of the view and stop at its end.
+        """
+        assert OrderedView(range(10))[2:5] == [2, 3, 4]
+        assert OrderedView(range(10), descending=True)[0:3] == [9, 8, 7]
+        assert OrderedView(range(10), descending=True)[8:12] == [1, 0]
+        assert list(OrderedView([1, 2], True, resolve=str)) == ["2", "1"]
+
+@pytest.mark.usefixtures("client", "prize_store")
+class TestSortAPI:
+    @pytest.mark.parametrize("query, expected", [
+        ('sort=title&pagination={"page":1,"per_page":3}', ([1, 10, 2], 10)),
+        ('sort=-title&pagination={"page":1,"per_page":3}', ([9, 8, 7], 10)),
+        ('sort=-id&pagination={"page":2,"per_page":4}', ([6, 5, 4, 3], 10)),
+        ('sort=id&pagination={"page":1,"per_page":2}', ([1, 2], 10)),
+        ('sort=-title&filter={"description":"prize 1"}', ([10, 1], 2)),
+        ('sort=-image&filter={"id":"3","title":"Prize 1","logical_operator":"OR"}', ([3, 10, 1], 3)),
+    ])
+    def test_sorted_listings(self, client, store, query, expected):
+        """
+        Test: List catalog 1 sorted by title, ID and image, with and without filters.
+        Expectation: Every engine returns the same prizes in the same order, ties ordered by ID.
+        """
+        assert sorted_ids(client, query) == expected
+
+    def test_sorted_listing_follows_changes(self, client, store):
+        """
+        Test: List catalog 1 sorted by title, then create a prize, rename another and delete a third, listing again each time.
+        Expectation: Each listing reflects the change, the in-memory sorted index being updated in place.
+        """
+        query = 'sort=title&pagination={"page":1,"per_page":3}'
+        assert sorted_ids(client, query) == ([1, 10, 2], 10)
+        client.post('/api/catalogs/1/prize', json={"title": "A prize", "description": "New", "image": "new.png"})
+        assert sorted_ids(client, query) == ([11, 1, 10], 11)
+        client.put('/api/catalogs/1/prize/1', json={"title": "Zebra"})
+        client.delete('/api/catalogs/1/prize/10')
+        assert sorted_ids(client, query) == ([11, 2, 3], 10)
+        assert sorted_ids(client, 'sort=-title&pagination={"page":1,"per_page":2}') == ([1, 9], 10)
+
+    def test_rejected_update_keeps_the_sorted_listing(self, client, store):
+        """
+        Test: List catalog 1 sorted by title, then update a prize with a null title.
+        Expectation: The update returns 400 Bad Request and the sorted listing is unchanged.
+        """
+        query = 'sort=title&pagination={"page":1,"per_page":3}'
+        assert sorted_ids(client, query) == ([1, 10, 2], 10)
+        assert client.put('/api/catalogs/1/prize/10', json={"title": None}).status_code == 400
+        assert sorted_ids(client, query) == ([1, 10, 2], 10)
+
+    def test_explain_reports_the_sort(self, client):
+        """
+        Test: Explain a sorted listing without a filter and one with an ID filter.
+        Expectation: The first walks the sorted index, the second sorts the matches of the ID index.
+        """
+        data = client.get('/api/catalogs/1/prizes?sort=-title&explain=true').get_json()
+        assert data["plan"]["sort"] == {"field": "title", "descending": True, "method": "sorted_index"}
+        data = client.get('/api/catalogs/1/prizes?sort=-title&filter={"id":"4"}&explain=true').get_json()
+        assert (data["plan"]["access_path"], data["plan"]["sort"]["method"]) == ("id_index", "sorted_matches")
+
+    @pytest.mark.parametrize("query", ['sort=price', 'sort=title&pagination={"after":null,"per_page":5}'])
+    def test_invalid_sorts(self, client, query):
+        """
+        Test: Sort by an unknown field, and sort a cursor page.
+        Expectation: The API returns 400 Bad Request.
+        """
+        assert client.get(f'/api/catalogs/1/prizes?{query}').status_code == 400
+
+class TestAtomicSortIndexes:
+    def test_replace_moves_a_key_in_one_step(self):
+        """
+        Test: Move keys up and down an index, then move one to a title that can't be compared.
+        Expectation: Moved keys land in order, and the failed move raises with the index unchanged.
+        """
+        prizes = [PrizeDetails(prize_id, title, "", "") for prize_id, title in [(1, "a"), (2, "c"), (3, "e")]]
+        index = SortedIndex("title", prizes)
+        index.replace(prizes[0], PrizeDetails(1, "d", "", ""))
+        index.replace(prizes[2], PrizeDetails(3, "b", "", ""))
+        assert index.keys == [("b", 3), ("c", 2), ("d", 1)]
+        with pytest.raises(TypeError):
+            index.replace(prizes[1], PrizeDetails(2, None, "", ""))
+        assert index.keys == [("b", 3), ("c", 2), ("d", 1)]
+
+    def test_failed_changes_leave_sorted_listings_unchanged(self, prize_store):
+        """
+        Test: Sort catalog 1 by image, then title, and update a prize with a new image and a title that can't be compared.
+        Then add a prize with such a title.
+        Expectation: Both changes raise, the image index moved back, and the sorted listings hold the 10 prizes in the same order.
+        """
+        catalog = prize_store.catalog
+        before = [list(catalog.sorted_prizes(1, field)) for field in ("image", "title")]
+        prize = catalog.find_prize(1, 3)
+        with pytest.raises(TypeError):
+            catalog.update_prize(1, prize, None, prize.description, "changed.png")
+        with pytest.raises(TypeError):
+            catalog.add_prize(1, PrizeDetails(11, None, "d", "a.png"))
+        assert [list(catalog.sorted_prizes(1, field)) for field in ("image", "title")] == before
+        assert catalog.find_prize(1, 3) is prize and catalog.find_prize(1, 11) is None
+
+class TestLazyIndexBuild:
+    def test_concurrent_first_readers_build_once(self, prize_store, monkeypatch):
+        """
+        Test: Let 8 readers of catalog 1 ask for its title index at once, with a slow index construction.
+        Expectation: The index is built once and every reader gets the same index.
+        """
+        built = []
+        class SlowSortedIndex(SortedIndex):
+            def __init__(self, field, prizes=()):
+                built.append(self)
+                time.sleep(0.05)
+                super().__init__(field, prizes)
+        monkeypatch.setattr(data_simulation, "SortedIndex", SlowSortedIndex)
+
+        catalog = prize_store.catalog
+        barrier = threading.Barrier(8)
+        indexes = []
+        def read():
+            barrier.wait()
+            with catalog.lock(1).read():
+                indexes.append(catalog.sort_index(1, "title"))
+        threads = [threading.Thread(target=read) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert len(built) == 1
+        assert all(index is built[0] for index in indexes) and len(indexes) == 8
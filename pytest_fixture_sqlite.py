@@ -0,0 +1,123 @@
+# pytest_fixture_sqlite.py
+# This script contains Pytest test cases for the SQLite storage engine.
+# It runs the listing, cursor, batch and export scenarios against a temporary database.
+
+# Authors: Edoardo Sabatini - Data Worker and ChatGPT 3.5 Python Programmer
+# Date: May 22, 2024
+
+import json
+import threading
+import pytest
+from sqlite_storage import SQLitePrizeStore
+
+@pytest.mark.usefixtures("client", "sqlite_store")
+class TestSQLiteStorage:
+    @pytest.mark.parametrize("query, expected_total, expected_ids", [
+        ('', 10, list(range(1, 11))),
+        ('?filter={"description":"script"}&pagination={"page":2,"per_page":4}', 10, [5, 6, 7, 8]),
+        ('?filter={"id":"2","description":"hello"}', 1, [2]),
+        ('?filter={"id":"2","description":"hello","logical_operator":"AND"}', 0, []),
+        ('?filter={"id":"2","description":"script","logical_operator":"AND"}', 1, [2]),
+    ])
+    def test_filters_run_in_sqlite(self, client, query, expected_total, expected_ids):
+        """
+        Test: List catalog 1 of the SQLite store with ID and description filters and pagination.
+        Expectation: The same totals and prizes as the in-memory storage.
+        """
+        data = client.get(f'/api/catalogs/1/prizes{query}').get_json()
+        assert data["total"] == expected_total
+        assert [prize["id"] for prize in data["prizes"]] == expected_ids
+
+    def test_cursor_pagination(self, client):
+        """
+        Test: Walk catalog 3 of the SQLite store with cursors of 4 prizes.
+        Expectation: Every prize is returned once, in ID order, and the last page has no cursor.
+        """
+        seen = []
+        cursor = None
+        while True:
+            pagination = json.dumps({"after": cursor, "per_page": 4})
+            data = client.get(f'/api/catalogs/3/prizes?pagination={pagination}').get_json()
+            seen.extend(prize["id"] for prize in data["prizes"])
+            cursor = data["next_cursor"]
+            if cursor is None:
+                break
+        assert seen == list(range(21, 31))
+
+    def test_batch_and_version(self, client, sqlite_store):
+        """
+        Test: Apply a batch creating, updating and deleting prizes in catalog 1.
+        Expectation: Every change is persisted and the catalog version changes.
+        """
+        version = sqlite_store.catalog_version(1)
+        response = client.post('/api/catalogs/1/prizes:batch', json={"operations": [
+            {"op": "create", "prize": {"title": "New", "description": "Stored in SQLite", "image": "url"}},
+            {"op": "update", "id": 2, "prize": {"title": "Renamed"}},
+            {"op": "delete", "id": 3},
+        ]})
+        assert [result["status"] for result in response.get_json()["results"]] == [201, 200, 200]
+        assert sqlite_store.catalog_version(1) != version
+
+        prizes = client.get('/api/catalogs/1/prizes').get_json()["prizes"]
+        assert [prize["id"] for prize in prizes] == [1, 2, 4, 5, 6, 7, 8, 9, 10, 11]
+        assert prizes[1]["title"] == "Renamed"
+
+    def test_export(self, client):
+        """
+        Test: Export catalog 4 of the SQLite store as NDJSON.
+        Expectation: One line per prize, in ID order.
+        """
+        response = client.get('/api/catalogs/4/prizes/export')
+        lines = response.get_data(as_text=True).splitlines()
+        assert [json.loads(line)["id"] for line in lines] == list(range(31, 41))
+
+    def test_data_survives_reopening(self, sqlite_store, tmp_path):
+        """
+        Test: Delete a prize, close the store and open the same database file again.
+        Expectation: The deletion is still there and no mock data is seeded twice.
+        """
+        assert sqlite_store.delete_prize(5, 50)
+        sqlite_store.close()
+
+        reopened = SQLitePrizeStore(str(tmp_path / "prizes.db"))
+        try:
+            assert reopened.get_prize(5, 50) is None
+            assert reopened.find_prizes(5)[1] == 9
+            assert reopened.catalog_ids() == [1, 2, 3, 4, 5]
+        finally:
+            reopened.close()
+
+    def test_deleted_catalogs_stay_deleted(self, sqlite_store, tmp_path):
+        """
+        Test: Delete every catalog, close the store and open the same database file again, then create a catalog.
+        Expectation: The mock data is not seeded again, and the new catalog gets ID 1 and is the only one.
+        """
+        for catalog_id in range(1, 6):
+            assert sqlite_store.delete_catalog(catalog_id)
+        sqlite_store.close()
+
+        reopened = SQLitePrizeStore(str(tmp_path / "prizes.db"))
+        try:
+            assert reopened.catalog_ids() == []
+            assert reopened.allocate_catalog() == 1
+            assert reopened.catalog_ids() == [1]
+        finally:
+            reopened.close()
+
+    def test_connection_per_thread(self, sqlite_store):
+        """
+        Test: Query the store from several threads.
+        Expectation: Each thread gets its own pooled connection and sees the same data.
+        """
+        totals = []
+
+        def query():
+            totals.append(sqlite_store.find_prizes(2)[1])
+
+        threads = [threading.Thread(target=query) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert totals == [10] * 4
+        assert len(sqlite_store.pool.connections) == 5
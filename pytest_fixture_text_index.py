@@ -0,0 +1,114 @@
+# pytest_fixture_text_index.py
+# This script contains Pytest test cases for the description n-gram index.
+# It tests substring candidates, index maintenance on updates and deletes,
+# and description filtering through the API.
+
+# Authors: Edoardo Sabatini - Data Worker and ChatGPT 3.5 Python Programmer
+# Date: May 22, 2024
+
+import threading
+import time
+import pytest
+import data_simulation
+from text_index import NgramIndex
+
+class TestNgramIndex:
+    def test_candidates_for_substring(self):
+        """
+        Test: Look up a substring in an index of three documents.
+        Expectation: Only the documents sharing every trigram of the query are returned, sorted by ID.
+        """
+        index = NgramIndex()
+        index.add(3, "Golden ticket")
+        index.add(1, "Silver ticket")
+        index.add(2, "Bronze medal")
+        assert index.candidates("ticket") == [1, 3]
+        assert index.candidates("hello") == []
+
+    def test_short_query_falls_back(self):
+        """
+        Test: Look up a query shorter than the n-gram size.
+        Expectation: No candidates are computed, signalling a scan.
+        """
+        index = NgramIndex()
+        index.add(1, "Silver ticket")
+        assert index.candidates("ti") is None
+
+    def test_remove_document(self):
+        """
+        Test: Remove a document from the index.
+        Expectation: The document is no longer a candidate and empty posting lists are dropped.
+        """
+        index = NgramIndex()
+        index.add(1, "Silver ticket")
+        index.remove(1, "Silver ticket")
+        assert index.candidates("ticket") == []
+        assert index.postings == {}
+
+@pytest.mark.usefixtures("client", "prize_store")
+class TestDescriptionFilterAPI:
+    def test_filter_after_update(self, client):
+        """
+        Test: Update the description of prize 3 in catalog 1 and filter by the new text.
+        Expectation: Only the updated prize matches the new description, and the old one no longer matches it.
+        """
+        response = client.put('/api/catalogs/1/prize/3', json={"description": "Weekend in Rome"})
+        assert response.status_code == 200
+
+        response = client.get('/api/catalogs/1/prizes?filter={"description":"in Rome"}')
+        data = response.get_json()
+        assert [prize["id"] for prize in data["prizes"]] == [3]
+
+        response = client.get('/api/catalogs/1/prizes?filter={"description":"prize 3 in"}')
+        data = response.get_json()
+        assert data["prizes"] == []
+
+    def test_filter_after_delete(self, client):
+        """
+        Test: Delete prize 4 in catalog 1 and filter by its description.
+        Expectation: The deleted prize is not returned.
+        """
+        response = client.delete('/api/catalogs/1/prize/4')
+        assert response.status_code == 200
+
+        response = client.get('/api/catalogs/1/prizes?filter={"description":"prize 4 in"}')
+        data = response.get_json()
+        assert data["prizes"] == []
+
+    def test_filter_by_id_or_description(self, client):
+        """
+        Test: Filter catalog 1 by ID 7 OR a description only prize 2 contains.
+        Expectation: Both prizes are returned in catalog order.
+        """
+        response = client.get('/api/catalogs/1/prizes?filter={"id":"7","description":"prize 2 in","logical_operator":"OR"}')
+        data = response.get_json()
+        assert [prize["id"] for prize in data["prizes"]] == [2, 7]
+
+class TestLazyIndexBuild:
+    def test_concurrent_first_readers_build_once(self, prize_store, monkeypatch):
+        """
+        Test: Let 8 readers of catalog 1 ask for its description index at once, with a slow index construction.
+        Expectation: The index is built once and every reader gets the same index.
+        """
+        built = []
+        class SlowNgramIndex(NgramIndex):
+            def __init__(self):
+                built.append(self)
+                time.sleep(0.05)
+                super().__init__()
+        monkeypatch.setattr(data_simulation, "NgramIndex", SlowNgramIndex)
+
+        catalog = prize_store.catalog
+        barrier = threading.Barrier(8)
+        indexes = []
+        def read():
+            barrier.wait()
+            with catalog.lock(1).read():
+                indexes.append(catalog.description_index(1))
+        threads = [threading.Thread(target=read) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert len(built) == 1
+        assert all(index is built[0] for index in indexes) and len(indexes) == 8
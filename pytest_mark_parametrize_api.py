@@ -47,19 +47,19 @@ def assert_response(response, expected_total, expected_len):
     # Test case 1: Retrieve all prizes from catalog 1
     (1, {}, {}, 10, 10),
     # Test case 2: Retrieve prizes from catalog 2 filtered by description 'prize' with pagination (1 result per page)
-    (2, {"description": "prize"}, {"page": 1, "per_page": 1}, 1, 1),
+    (2, {"description": "prize"}, {"page": 1, "per_page": 1}, 10, 1),
     # Test cases 3-5: Retrieve prizes from catalog 3 filtered by description 'prize' with pagination (up to 4 results per page)
-    (3, {"description": "prize"}, {"page": 1, "per_page": 4}, 4, 4),
-    (3, {"description": "prize"}, {"page": 2, "per_page": 4}, 4, 4),
-    (3, {"description": "prize"}, {"page": 3, "per_page": 4}, 2, 2),
+    (3, {"description": "prize"}, {"page": 1, "per_page": 4}, 10, 4),
+    (3, {"description": "prize"}, {"page": 2, "per_page": 4}, 10, 4),
+    (3, {"description": "prize"}, {"page": 3, "per_page": 4}, 10, 2),
     # Test case 6: Retrieve prizes from catalog 1 filtered by description 'hello' with pagination (up to 5 results per page)
     (1, {"description": "hello"}, {"page": 1, "per_page": 5}, 0, 0),
     # Test case 7: Retrieve prizes from catalog 1 filtered by description 'script' with pagination (up to 5 results per page)
-    (1, {"description": "script"}, {"page": 1, "per_page": 5}, 5, 5),
+    (1, {"description": "script"}, {"page": 1, "per_page": 5}, 10, 5),
     # Test case 8: Retrieve prizes from catalog 1 filtered by ID '1' with pagination (up to 5 results per page)
     (1, {"id": "1"}, {"page": 1, "per_page": 5}, 1, 1),
     # Test case 9: Retrieve prizes from catalog 1 filtered by ID '2' and description 'script' with pagination (up to 5 results per page)
-    (1, {"id": "2", "description": "script"}, {"page": 1, "per_page": 5}, 5, 5),
+    (1, {"id": "2", "description": "script"}, {"page": 1, "per_page": 5}, 10, 5),
     # Test case 10: Retrieve prizes from catalog 1 filtered by ID '2' and description 'hello' with pagination (up to 5 results per page)
     (1, {"id": "2", "description": "hello"}, {"page": 1, "per_page": 5}, 1, 1),
     # Test case 11: Retrieve prizes from catalog 1 filtered by ID '2' and description 'hello' with logical operator 'AND' and pagination (up to 5 results per page)
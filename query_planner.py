@@ -0,0 +1,156 @@
+# query_planner.py - Compiled filter plans for the prize storage engines
+# This module compiles a filter dictionary into conditions, picks the cheapest access path the store offers
+# for them, and runs the plan while counting the rows it examines, so the plan can be explained.
+
+# Authors: Edoardo Sabatini - Data Worker and ChatGPT 3.5 Python Programmer
+# Date: May 22, 2024
+
+from heapq import merge
+from operator import attrgetter
+
+TEXT_FIELDS = ("title", "description", "image")  # Fields a filter can match by substring
+
+# How exactly a store's index answers a condition
+EXACT = "exact"  # The index returns exactly the matching rows
+CANDIDATES = "candidates"  # The index returns a superset of the matching rows, to be verified
+
+class Condition:
+    """One term of a filter: an ID equality, or a substring of a text field."""
+    __slots__ = ("field", "value", "test", "likelihood")
+
+    def __init__(self, field, value):
+        self.field = field
+        self.value = value
+        if field == "id":
+            self.test = lambda prize: prize.id == value
+            self.likelihood = 0.0  # At most one prize matches
+        else:
+            get = attrgetter(field)
+            self.test = lambda prize: value in get(prize)
+            self.likelihood = 1 / (1 + len(value))  # Longer substrings match fewer prizes
+
+    def describe(self):
+        return f"id = {self.value}" if self.field == "id" else f"{self.field} contains {self.value!r}"
+
+class Query:
+    """The conditions of a filter, combined with AND (match_all) or OR."""
+    def __init__(self, conditions, match_all):
+        self.conditions = conditions
+        self.match_all = match_all
+
+def compile_filter(filter):
+    """Compile a filter dictionary into a Query. Returns None if the filter has no usable condition and can't match anything."""
+    conditions = []
+    if 'id' in filter and str(filter['id']).isdigit():
+        conditions.append(Condition("id", int(filter['id'])))
+    conditions.extend(Condition(field, filter[field]) for field in TEXT_FIELDS if field in filter)
+    if not conditions:
+        return None
+    return Query(conditions, filter.get('logical_operator', 'OR').upper() == 'AND')
+
+def combine(conditions, match_all):
+    """
+    Compile conditions into one predicate. AND tests the least likely condition first and OR the most likely,
+    so both stop at the first condition that decides the outcome.
+    """
+    tests = [condition.test for condition in sorted(conditions, key=attrgetter("likelihood"), reverse=not match_all)]
+    if not tests:
+        return None
+    if len(tests) == 1:
+        return tests[0]
+    if match_all:
+        return lambda prize: all(test(prize) for test in tests)
+    return lambda prize: any(test(prize) for test in tests)
+
+class Plan:
+    """An access path, the conditions it is driven by, and the residual predicate checked on every row it yields."""
+    def __init__(self, access_path, driving, residual, match_all):
+        self.access_path = access_path  # "id_index", "text_index", "union", "scan" or "none"
+        self.driving = driving  # List of (condition, exactness) served by the access path
+        self.residual = residual  # Conditions verified on the rows of the access path
+        self.match_all = match_all
+        self.counting = False  # Rows are only counted for plans that will be explained
+        self.rows_examined = 0
+
+    def examine(self, rows):
+        """Count the rows pulled from an access path."""
+        for row in rows:
+            self.rows_examined += 1
+            yield row
+
+    def execute(self, lookup, scan, load=None, key=None):
+        """
+        Run the plan and return a lazy iterator over the matching rows, in order.
+        lookup(condition) returns the rows an index holds for a condition and scan() every row, both in order;
+        load(row) returns the prize of a row (the row itself by default) and key(row) its sort key for unions.
+        """
+        if self.access_path == "none":
+            return iter(())
+        load = load or (lambda row: row)
+        examine = self.examine if self.counting else iter
+        if self.access_path == "union":
+            branches = []
+            for condition, exactness in self.driving:
+                branch = examine(lookup(condition))
+                if exactness == CANDIDATES:
+                    branch = (row for row in branch if condition.test(load(row)))
+                branches.append(branch)
+            return unique(merge(*branches, key=key), key)
+
+        rows = examine(scan() if self.access_path == "scan" else lookup(self.driving[0][0]))
+        predicate = combine(self.residual, self.match_all)
+        if predicate is None:
+            return rows
+        return (row for row in rows if predicate(load(row)))
+
+    def explain(self):
+        """Describe the plan and the number of rows examined so far."""
+        joiner = " AND " if self.match_all else " OR "
+        return {
+            "access_path": self.access_path,
+            "index_conditions": [condition.describe() for condition, _ in self.driving],
+            "residual": joiner.join(condition.describe() for condition in self.residual) or None,
+            "rows_examined": self.rows_examined,
+        }
+
+def unique(rows, key=None):
+    """Drop consecutive duplicates from sorted rows."""
+    key = key or (lambda row: row)
+    previous = object()
+    for row in rows:
+        current = key(row)
+        if current != previous:
+            previous = current
+            yield row
+
+def plan_query(query, index_for):
+    """
+    Choose how to run a query. index_for(condition) tells how a store's index answers a condition:
+    EXACT, CANDIDATES, or None without an index.
+    AND is driven by the most selective indexed condition and verifies the rest; OR is the union of the
+    index lookups when every condition has an index. Anything else scans the catalog.
+    """
+    conditions = sorted(query.conditions, key=attrgetter("likelihood"))
+    indexed = [(condition, index_for(condition)) for condition in conditions]
+
+    if query.match_all or len(conditions) == 1:
+        for condition, exactness in indexed:
+            if exactness:
+                residual = [other for other in conditions if other is not condition or exactness == CANDIDATES]
+                access_path = "id_index" if condition.field == "id" else "text_index"
+                return Plan(access_path, [(condition, exactness)], residual, True)
+    elif all(exactness for _, exactness in indexed):
+        return Plan("union", indexed, [], False)
+    return Plan("scan", [], conditions, query.match_all)
+
+def plan_filter(filter, index_for):
+    """
+    Compile a filter dictionary and plan it. An empty filter scans every row;
+    a filter without a usable condition gets the "none" plan, which matches nothing.
+    """
+    if not filter:
+        return Plan("scan", [], [], True)
+    query = compile_filter(filter)
+    if query is None:
+        return Plan("none", [], [], True)
+    return plan_query(query, index_for)
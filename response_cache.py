@@ -0,0 +1,44 @@
+# response_cache.py - Bounded LRU cache for serialized API responses
+# This module caches response bodies keyed by catalog version and normalized query,
+# so identical list requests are not recomputed until the catalog changes.
+
+# Authors: Edoardo Sabatini - Data Worker and ChatGPT 3.5 Python Programmer
+# Date: May 22, 2024
+
+import threading
+from collections import OrderedDict
+
+class ResponseCache:
+    """Least-recently-used cache of serialized responses with a bounded number of entries."""
+    def __init__(self, max_entries=1024):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        """Return the cached body for key, or None on a miss."""
+        with self.lock:
+            body = self.entries.get(key)
+            if body is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return body
+
+    def put(self, key, body):
+        """Store a body, evicting the least recently used entries beyond the bound."""
+        if self.max_entries <= 0:
+            return
+        with self.lock:
+            self.entries[key] = body
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def clear(self):
+        """Drop every cached entry."""
+        with self.lock:
+            self.entries.clear()
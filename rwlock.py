@@ -0,0 +1,52 @@
+# rwlock.py - Reader/writer lock
+# This module provides a lock that many readers can hold at once while writers get exclusive access,
+# used to guard each catalog of the in-memory prize database.
+
+# Authors: Edoardo Sabatini - Data Worker and ChatGPT 3.5 Python Programmer
+# Date: May 22, 2024
+
+import threading
+from contextlib import contextmanager
+
+class ReadWriteLock:
+    """
+    Lock held either by any number of readers or by a single writer.
+    A waiting writer stops new readers from entering, so a steady flow of reads can't starve writes.
+    The lock is not reentrant: a thread must not acquire it again while holding it.
+    """
+    def __init__(self):
+        self.condition = threading.Condition(threading.Lock())
+        self.readers = 0  # Number of threads holding the lock for reading
+        self.writer = False  # Whether a thread holds the lock for writing
+        self.waiting_writers = 0
+
+    @contextmanager
+    def read(self):
+        """Hold the lock for reading for the duration of the with block."""
+        with self.condition:
+            while self.writer or self.waiting_writers:
+                self.condition.wait()
+            self.readers += 1
+        try:
+            yield
+        finally:
+            with self.condition:
+                self.readers -= 1
+                if not self.readers:
+                    self.condition.notify_all()
+
+    @contextmanager
+    def write(self):
+        """Hold the lock exclusively for the duration of the with block."""
+        with self.condition:
+            self.waiting_writers += 1
+            while self.writer or self.readers:
+                self.condition.wait()
+            self.waiting_writers -= 1
+            self.writer = True
+        try:
+            yield
+        finally:
+            with self.condition:
+                self.writer = False
+                self.condition.notify_all()
@@ -0,0 +1,396 @@
+# shared_storage.py - Shared memory storage engine for the prize database
+# This module keeps the catalogs in multiprocessing.shared_memory segments, so the worker processes
+# of a pre-fork server share one copy of the prizes and see each other's changes.
+# It relies on fcntl file locks and is only available on POSIX systems.
+
+# Authors: Edoardo Sabatini - Data Worker and ChatGPT 3.5 Python Programmer
+# Date: May 22, 2024
+
+import fcntl
+import io
+import os
+import struct
+import tempfile
+import threading
+import time
+import weakref
+from contextlib import contextmanager
+from itertools import islice
+from multiprocessing import resource_tracker, shared_memory
+from data_simulation import Prize, PrizeDetails
+from id_allocator import CatalogIdAllocator
+from query_planner import EXACT, plan_filter
+from snapshot import Snapshot, dump_catalogs
+from sort_index import OrderedView
+from storage import PrizeStore
+
+# The control segment holds a clock, bumped by every change, and a directory of catalog slots.
+# Each catalog lives in its own segment in snapshot format, named after the catalog and its generation.
+# Segments are never modified: a change publishes a new segment and points the catalog slot at it,
+# so readers work on a consistent copy without taking any lock.
+CONTROL_MAGIC = b"PRZSHM02"
+CONTROL_HEADER = struct.Struct("<8sQI")  # Magic, clock, number of slots
+CONTROL_SLOT = struct.Struct("<QQQ")  # Catalog ID, generation of its segment (0 for a free slot), next prize ID
+
+def open_segment(name, create=False, size=0):
+    """Open or create a shared memory segment that outlives the process that created it."""
+    segment = shared_memory.SharedMemory(name, create=create, size=size)
+    # Segments belong to the store, not to a process: keep the resource tracker from unlinking them at exit
+    resource_tracker.unregister(segment._name, "shared_memory")
+    return segment
+
+def unlink_segment(segment):
+    """Remove a shared memory segment. Processes that still have it open keep their mapping."""
+    resource_tracker.register(segment._name, "shared_memory")  # Balances the unregister done by unlink()
+    segment.unlink()
+    segment.close()
+
+class SharedMemoryPrizeStore(PrizeStore):
+    """
+    Prize storage engine shared by several processes through shared memory segments, seeded with mock data when created.
+    Reads decode prizes straight from the segments. Writes are serialized across processes by an
+    exclusive lock file, applied to a private copy of the catalog and published as a new segment,
+    which suits read-mostly workloads: every write decodes and re-encodes its whole catalog under the lock,
+    so it costs O(catalog size) and blocks the writes of every process meanwhile (about 0.4 s at 100k prizes).
+    """
+    def __init__(self, name="prizes", num_catalogs=5, prizes_per_catalog=10, slots=1024, lock_path=None):
+        started = time.perf_counter()
+        self.name = name
+        self.lock_file = open(lock_path or os.path.join(tempfile.gettempdir(), f"{name}.lock"), "a+b")
+        self.local_lock = threading.Lock()  # Serializes refreshes and writes between the threads of this process
+        self.catalogs = {}  # Catalog ID -> (generation, segment, snapshot) as last seen by this process
+        self.retired = []  # Replaced segments, closed once no reader of this process uses their snapshot
+        self.seen_clock = None
+
+        with self.exclusive():
+            try:
+                self.control = open_segment(f"{name}-control")
+                if CONTROL_HEADER.unpack_from(self.control.buf, 0)[0] != CONTROL_MAGIC:
+                    self.control.close()
+                    raise RuntimeError(f"Shared memory store {name!r} has an older layout; remove it with 'flask destroy-shared-memory'")
+            except FileNotFoundError:
+                self.control = open_segment(f"{name}-control", create=True, size=CONTROL_HEADER.size + CONTROL_SLOT.size * slots)
+                CONTROL_HEADER.pack_into(self.control.buf, 0, CONTROL_MAGIC, time.time_ns() // 1000, slots)
+                for catalog_id in range(1, num_catalogs + 1):
+                    self.publish(catalog_id, [prize for batch in Prize.generate_mock_batches(catalog_id, prizes_per_catalog) for prize in batch])
+        self.startup_seconds = time.perf_counter() - started
+
+    # Locking and synchronization
+
+    @contextmanager
+    def exclusive(self):
+        """Hold the store's write lock, shared by every process using the store."""
+        with self.local_lock:
+            fcntl.flock(self.lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(self.lock_file, fcntl.LOCK_UN)
+
+    def clock(self):
+        """Read the clock of the control segment."""
+        return CONTROL_HEADER.unpack_from(self.control.buf, 0)[1]
+
+    def slots(self):
+        """Return the slot number, catalog ID, generation and next prize ID of every used catalog slot."""
+        slot_count = CONTROL_HEADER.unpack_from(self.control.buf, 0)[2]
+        slots = CONTROL_SLOT.iter_unpack(self.control.buf[CONTROL_HEADER.size:CONTROL_HEADER.size + CONTROL_SLOT.size * slot_count])
+        return [(slot, catalog_id, generation, next_prize_id) for slot, (catalog_id, generation, next_prize_id) in enumerate(slots) if generation]
+
+    def refresh(self):
+        """Attach to the segments published by other processes since the last refresh."""
+        if self.clock() == self.seen_clock:
+            return
+        with self.local_lock:
+            fcntl.flock(self.lock_file, fcntl.LOCK_SH)
+            try:
+                self._sync()
+            finally:
+                fcntl.flock(self.lock_file, fcntl.LOCK_UN)
+
+    def _sync(self):
+        """Bring the catalogs seen by this process up to date with the control segment. Requires the lock file."""
+        self.seen_clock = self.clock()
+        current = {catalog_id: generation for _, catalog_id, generation, _ in self.slots()}
+        for catalog_id in list(self.catalogs):
+            if current.get(catalog_id) != self.catalogs[catalog_id][0]:
+                self.retire(self.catalogs.pop(catalog_id))
+        for catalog_id, generation in current.items():
+            if catalog_id not in self.catalogs:
+                segment = open_segment(f"{self.name}-{catalog_id}-{generation}")
+                self.catalogs[catalog_id] = (generation, segment, Snapshot(segment.buf))
+
+        # Close the replaced segments whose snapshot is no longer referenced by a reader
+        still_used = []
+        for segment, snapshot_ref in self.retired:
+            if snapshot_ref() is None:
+                segment.close()
+            else:
+                still_used.append((segment, snapshot_ref))
+        self.retired = still_used
+
+    def retire(self, entry):
+        """Schedule the segment of a replaced catalog to be closed once its snapshot is no longer in use."""
+        _, segment, snapshot = entry
+        self.retired.append((segment, weakref.ref(snapshot)))
+
+    def publish(self, catalog_id, prizes, next_prize_id=None):
+        """
+        Write the prizes of a catalog to a new segment and point the catalog slot at it. Requires the write lock.
+        next_prize_id defaults to the ID following the last prize.
+        """
+        if next_prize_id is None:
+            next_prize_id = prizes[-1].id + 1 if prizes else 1
+        buffer = io.BytesIO()
+        dump_catalogs(buffer, [(catalog_id, prizes, next_prize_id)])
+        data = buffer.getbuffer()
+
+        clock = self.clock() + 1
+        segment = open_segment(f"{self.name}-{catalog_id}-{clock}", create=True, size=len(data))
+        segment.buf[:len(data)] = data
+        self.set_slot(catalog_id, clock, next_prize_id)
+        segment.close()
+
+    def set_slot(self, catalog_id, generation, next_prize_id=0):
+        """Point a catalog slot at a generation, or free it if generation is 0, and unlink the segment it replaces."""
+        slots = {slot_catalog_id: (slot, slot_generation) for slot, slot_catalog_id, slot_generation, _ in self.slots()}
+        if catalog_id in slots:
+            slot, previous = slots[catalog_id]
+            unlink_segment(open_segment(f"{self.name}-{catalog_id}-{previous}"))
+        elif generation:
+            used = {slot for slot, _ in slots.values()}
+            slot = next((slot for slot in range(CONTROL_HEADER.unpack_from(self.control.buf, 0)[2]) if slot not in used), None)
+            if slot is None:
+                raise RuntimeError("No free catalog slot left in the shared memory store")
+        else:
+            return
+
+        CONTROL_SLOT.pack_into(self.control.buf, CONTROL_HEADER.size + slot * CONTROL_SLOT.size,
+                               catalog_id if generation else 0, generation, next_prize_id if generation else 0)
+        magic, clock, slot_count = CONTROL_HEADER.unpack_from(self.control.buf, 0)
+        CONTROL_HEADER.pack_into(self.control.buf, 0, magic, max(clock + 1, generation), slot_count)
+
+    def snapshot(self, catalog_id):
+        """Return the up-to-date snapshot holding a catalog, or None if it doesn't exist."""
+        self.refresh()
+        entry = self.catalogs.get(catalog_id)
+        return None if entry is None else entry[2]
+
+    def mutate(self, catalog_id, change, changed=bool):
+        """
+        Apply change(store) to a private in-memory copy of a catalog and publish the copy if changed(result) is true,
+        which by default means the result is truthy. Returns the result of change, or None if the catalog doesn't exist.
+        """
+        with self.exclusive():
+            self._sync()
+            entry = self.catalogs.get(catalog_id)
+            if entry is None:
+                return None
+
+            working = Prize(num_catalogs=0)
+            working.catalog.compactor = None  # The copy is published right away, so compact it in place
+            working.catalog.create_catalog(catalog_id)
+            sequence = working.catalog.sequences[catalog_id]
+            for batch in entry[2].iter_batches(catalog_id, PrizeDetails):
+                working.catalog.add_prizes(catalog_id, batch)
+            sequence.advance(self.next_prize_id(catalog_id) - 1)  # Keep the IDs of deleted prizes retired
+
+            result = change(working)
+            if changed(result):
+                self.publish(catalog_id, working.catalog.get_catalog(catalog_id), sequence.next_id)
+                self._sync()
+            return result
+
+    def next_prize_id(self, catalog_id):
+        """Return the next prize ID of a catalog, as recorded in its slot, or None if it doesn't exist."""
+        return next((next_prize_id for _, slot_catalog_id, _, next_prize_id in self.slots() if slot_catalog_id == catalog_id), None)
+
+    def close(self):
+        """Detach this process from the shared memory segments."""
+        with self.local_lock:
+            for entry in self.catalogs.values():
+                self.retire(entry)
+            self.catalogs.clear()
+            for segment, snapshot_ref in self.retired:
+                if snapshot_ref() is None:
+                    segment.close()  # Segments still in use are closed when garbage collected
+            self.retired.clear()
+            self.control.close()
+            self.lock_file.close()
+
+    def destroy(self):
+        """Remove every segment of the store, for every process, and detach from them."""
+        with self.exclusive():
+            for _, catalog_id, generation, _ in self.slots():
+                unlink_segment(open_segment(f"{self.name}-{catalog_id}-{generation}"))
+            unlink_segment(self.control)
+        self.close()
+
+    # Catalogs
+
+    def catalog_ids(self):
+        """Return the IDs of all catalogs."""
+        self.refresh()
+        return sorted(self.catalogs)
+
+    def has_catalog(self, catalog_id):
+        """Check whether the specified catalog exists."""
+        return self.snapshot(catalog_id) is not None
+
+    def create_catalog(self, catalog_id):
+        """Create a new catalog."""
+        with self.exclusive():
+            self._sync()
+            if catalog_id in self.catalogs:
+                return False
+            self.publish(catalog_id, [])
+            self._sync()
+            return True
+
+    def allocate_catalog(self):
+        """Create a new catalog with the lowest ID not in use by any process."""
+        with self.exclusive():
+            self._sync()
+            # The slot directory is small and shared by every process, so the free IDs are derived from it
+            catalog_id = CatalogIdAllocator(self.catalogs).allocate()
+            self.publish(catalog_id, [])
+            self._sync()
+            return catalog_id
+
+    def delete_catalog(self, catalog_id):
+        """Delete a catalog and its prizes."""
+        with self.exclusive():
+            self._sync()
+            if catalog_id not in self.catalogs:
+                return False
+            self.set_slot(catalog_id, 0)
+            self._sync()
+            return True
+
+    def catalog_version(self, catalog_id):
+        """Return the current version of the specified catalog, the generation of its segment."""
+        self.refresh()
+        entry = self.catalogs.get(catalog_id)
+        return None if entry is None else entry[0]
+
+    # Queries
+
+    @staticmethod
+    def index_for(condition):
+        """Tell the planner how the snapshot answers a condition: IDs by bisecting the ID table, text by searching the string heap."""
+        return EXACT
+
+    def execute_plan(self, snapshot, catalog_id, plan, start=0):
+        """Run a plan over the positions of a catalog from position start on, in ID order."""
+        def lookup(condition):
+            if condition.field == "id":
+                position = snapshot.position(catalog_id, condition.value)
+                found = start <= position < snapshot.prize_count(catalog_id) and snapshot.prize_id_at(catalog_id, position) == condition.value
+                return [position] if found else []
+            return snapshot.search_field(catalog_id, condition.field, condition.value, start)
+
+        scan = lambda: range(start, snapshot.prize_count(catalog_id))
+        return plan.execute(lookup, scan, load=lambda position: snapshot.prize_at(catalog_id, position, PrizeDetails))
+
+    def match_positions(self, snapshot, catalog_id, filter, start=0):
+        """Filter stage: return the positions of the matching prizes from position start on, in ID order."""
+        if not filter:
+            return range(start, snapshot.prize_count(catalog_id))
+        return self.execute_plan(snapshot, catalog_id, plan_filter(filter, self.index_for), start)
+
+    def sort_positions(self, snapshot, catalog_id, plan, sort):
+        """
+        Order stage: return the positions matching a plan ordered by a (field, descending) sort.
+        A scan walks the sort order of the snapshot; the matches of an index lookup are few, so they are sorted instead.
+        """
+        field, descending = sort
+        load = lambda position: snapshot.prize_at(catalog_id, position, PrizeDetails)
+        if plan.access_path == "scan":
+            order = range(snapshot.prize_count(catalog_id)) if field == "id" else snapshot.sorted_positions(catalog_id, field)
+            ordered = OrderedView(order, descending)
+            if not plan.residual and not plan.counting:
+                return ordered  # Sliceable, so the page stage reads only the page
+            return plan.execute(None, lambda: iter(ordered), load=load)
+
+        def sort_key(position):
+            prize = load(position)
+            return getattr(prize, field), prize.id
+        return sorted(self.execute_plan(snapshot, catalog_id, plan), key=sort_key, reverse=descending)
+
+    def find_prizes(self, catalog_id, filter=None, pagination=None, with_total=True, sort=None):
+        """Retrieve one page of matching prizes, decoding only the prizes of the page."""
+        snapshot = self.snapshot(catalog_id)
+        if snapshot is None or not snapshot.prize_count(catalog_id):
+            return None
+
+        if sort is None:
+            matches = self.match_positions(snapshot, catalog_id, filter)
+        else:
+            matches = self.sort_positions(snapshot, catalog_id, plan_filter(filter, self.index_for), sort)
+        positions, total = Prize.paginate(matches, pagination, with_total)
+        return [snapshot.prize_at(catalog_id, position, PrizeDetails) for position in positions], total
+
+    def explain_prizes(self, catalog_id, filter=None, pagination=None, with_total=True, sort=None):
+        """Run find_prizes and describe how the filter was answered."""
+        snapshot = self.snapshot(catalog_id)
+        if snapshot is None or not snapshot.prize_count(catalog_id):
+            return None
+
+        plan = plan_filter(filter, self.index_for)
+        plan.counting = True
+        if sort is None:
+            matches = self.execute_plan(snapshot, catalog_id, plan)
+        else:
+            matches = self.sort_positions(snapshot, catalog_id, plan, sort)
+        positions, total = Prize.paginate(matches, pagination, with_total)
+        explanation = plan.explain()
+        if sort is not None:
+            explanation["sort"] = {"field": sort[0], "descending": sort[1],
+                                   "method": "sorted_index" if plan.access_path == "scan" else "sorted_matches"}
+        return [snapshot.prize_at(catalog_id, position, PrizeDetails) for position in positions], total, explanation
+
+    def find_prizes_after(self, catalog_id, filter=None, after_id=None, per_page=10):
+        """Retrieve the page of matching prizes that follows the prize after_id, seeking in the ID table."""
+        snapshot = self.snapshot(catalog_id)
+        if snapshot is None or not snapshot.prize_count(catalog_id):
+            return None
+
+        start = 0 if after_id is None else snapshot.position(catalog_id, after_id + 1)
+        positions = list(islice(self.match_positions(snapshot, catalog_id, filter, start), per_page + 1))
+        page = [snapshot.prize_at(catalog_id, position, PrizeDetails) for position in positions[:per_page]]
+        return page, page[-1].id if len(positions) > per_page else None
+
+    def iter_prizes(self, catalog_id, filter=None):
+        """Return a lazy iterator over every matching prize of the catalog as it is now."""
+        snapshot = self.snapshot(catalog_id)
+        if snapshot is None or not snapshot.prize_count(catalog_id):
+            return None
+        return (snapshot.prize_at(catalog_id, position, PrizeDetails) for position in self.match_positions(snapshot, catalog_id, filter))
+
+    # Single prizes
+
+    def get_prize(self, catalog_id, prize_id):
+        """Get a specific prize from the specified catalog."""
+        snapshot = self.snapshot(catalog_id)
+        if snapshot is None:
+            return None
+        position = snapshot.position(catalog_id, prize_id)
+        if position == snapshot.prize_count(catalog_id) or snapshot.prize_id_at(catalog_id, position) != prize_id:
+            return None
+        return snapshot.prize_at(catalog_id, position, PrizeDetails)
+
+    def create_prize(self, catalog_id, prize_data):
+        """Create a new prize in the specified catalog. Returns None if the catalog doesn't exist."""
+        return self.mutate(catalog_id, lambda working: working.create_prize(catalog_id, prize_data))
+
+    def update_prize(self, catalog_id, prize_id, existing_prize):
+        """Update an existing prize in the specified catalog."""
+        return self.mutate(catalog_id, lambda working: working.update_prize(catalog_id, prize_id, existing_prize))
+
+    def delete_prize(self, catalog_id, prize_id):
+        """Delete a prize from the specified catalog."""
+        return bool(self.mutate(catalog_id, lambda working: working.delete_prize(catalog_id, prize_id)))
+
+    def apply_batch(self, catalog_id, operations):
+        """Apply a batch of operations to the specified catalog and publish it once, unless no operation changed anything."""
+        return self.mutate(catalog_id, lambda working: working.apply_batch(catalog_id, operations), changed=any)
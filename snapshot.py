@@ -0,0 +1,222 @@
+# snapshot.py - Binary snapshot of the prize catalogs
+# This module writes the catalogs to a compact binary file and maps it back into memory with mmap,
+# so a worker can start serving without rebuilding every prize up front.
+
+# Authors: Edoardo Sabatini - Data Worker and ChatGPT 3.5 Python Programmer
+# Date: May 22, 2024
+
+import mmap
+import os
+import re
+import struct
+from array import array
+from bisect import bisect_left, bisect_right
+
+# File layout (little-endian):
+#   header     magic, number of catalogs
+#   directory  one entry per catalog: catalog ID, number of prizes, heap offset, table offset, next prize ID
+#              (files with the older PRZSNAP1 magic have no next prize ID; it is then the ID after the last prize)
+#   catalogs   for each catalog, a string heap (UTF-8 titles, descriptions and images back to back)
+#              followed by a table of fixed-width records sorted by prize ID
+MAGIC = b"PRZSNAP2"
+HEADER = struct.Struct("<8sI")
+DIRECTORY_ENTRY = struct.Struct("<QQQQQ")
+DIRECTORY_FORMATS = {MAGIC: DIRECTORY_ENTRY, b"PRZSNAP1": struct.Struct("<QQQQ")}  # Directory entry of each readable version
+RECORD = struct.Struct("<QQIII")  # Prize ID, offset in the heap, title length, description length, image length
+STRING_FIELDS = ("title", "description", "image")  # Order of the strings of a prize in the heap and of their lengths in a record
+
+def write_snapshot(store, path):
+    """
+    Write every catalog of a prize store to a snapshot file.
+    Prizes are streamed through store.iter_prizes, so any storage engine can be snapshotted. The next prize ID of each
+    catalog is written too, so the IDs of prizes deleted before the snapshot are not handed out again after loading it.
+    The file is written next to path and renamed into place, so readers never see a partial snapshot.
+    Returns the number of prizes written.
+    """
+    temporary_path = f"{path}.tmp"
+    with open(temporary_path, "wb") as snapshot_file:
+        catalogs = [(catalog_id, store.iter_prizes(catalog_id) or (), store.next_prize_id(catalog_id)) for catalog_id in store.catalog_ids()]
+        written = dump_catalogs(snapshot_file, catalogs)
+    os.replace(temporary_path, path)
+    return written
+
+def dump_catalogs(snapshot_file, catalogs):
+    """
+    Write a list of (catalog ID, prizes, next prize ID) tuples in snapshot format to a seekable binary file.
+    The prizes of each catalog can be any iterable in ID order, consumed once. A next prize ID of None, or one not above
+    the last prize, is replaced by the ID after the last prize. Returns the number of prizes written.
+    """
+    start = snapshot_file.tell()
+    snapshot_file.seek(start + HEADER.size + DIRECTORY_ENTRY.size * len(catalogs))
+    directory = []
+    written = 0
+
+    for catalog_id, prizes, next_prize_id in catalogs:
+        heap_offset = snapshot_file.tell() - start
+        table = bytearray()
+        string_offset = 0
+        prize_count = 0
+        next_prize_id = next_prize_id or 1
+        for prize in prizes:
+            title = prize.title.encode()
+            description = prize.description.encode()
+            image = prize.image.encode()
+            snapshot_file.write(title + description + image)
+            table += RECORD.pack(prize.id, string_offset, len(title), len(description), len(image))
+            string_offset += len(title) + len(description) + len(image)
+            prize_count += 1
+            next_prize_id = max(next_prize_id, prize.id + 1)
+        table_offset = snapshot_file.tell() - start
+        snapshot_file.write(table)
+        directory.append(DIRECTORY_ENTRY.pack(catalog_id, prize_count, heap_offset, table_offset, next_prize_id))
+        written += prize_count
+
+    end = snapshot_file.tell()
+    snapshot_file.seek(start)
+    snapshot_file.write(HEADER.pack(MAGIC, len(catalogs)))
+    snapshot_file.write(b"".join(directory))
+    snapshot_file.seek(end)
+    return written
+
+class Snapshot:
+    """
+    Snapshot data in a buffer, such as a mapped file or a shared memory segment.
+    Only the directory is read when opening; prizes are decoded on demand.
+    """
+    def __init__(self, buffer):
+        self.view = memoryview(buffer)
+
+        magic, catalog_count = HEADER.unpack_from(self.view, 0)
+        entry_format = DIRECTORY_FORMATS.get(magic)
+        if entry_format is None:
+            raise ValueError("Buffer does not hold a prize snapshot")
+
+        self.directory = {}  # Catalog ID -> (number of prizes, heap offset, table offset)
+        self.next_prize_ids = {}  # Catalog ID -> next prize ID, for snapshots that record it
+        self.sort_orders = {}  # (catalog ID, field) -> positions in the order of the field, computed on first use
+        for position in range(catalog_count):
+            catalog_id, prize_count, heap_offset, table_offset, *next_prize_id = entry_format.unpack_from(
+                self.view, HEADER.size + position * entry_format.size
+            )
+            self.directory[catalog_id] = (prize_count, heap_offset, table_offset)
+            if next_prize_id:
+                self.next_prize_ids[catalog_id] = next_prize_id[0]
+
+    @classmethod
+    def open(cls, path):
+        """Map a snapshot file into memory."""
+        with open(path, "rb") as snapshot_file:
+            mapping = mmap.mmap(snapshot_file.fileno(), 0, access=mmap.ACCESS_READ)
+        return cls(mapping)
+
+    def catalog_ids(self):
+        """Return the IDs of the catalogs in the snapshot."""
+        return list(self.directory)
+
+    def next_prize_id(self, catalog_id):
+        """Return the ID the next prize of a catalog gets, which is after the IDs of its prizes deleted before the snapshot."""
+        prize_count = self.prize_count(catalog_id)
+        last_id = self.prize_id_at(catalog_id, prize_count - 1) if prize_count else 0
+        return max(self.next_prize_ids.get(catalog_id, 1), last_id + 1)
+
+    def prize_count(self, catalog_id):
+        """Return the number of prizes of a catalog."""
+        return self.directory[catalog_id][0]
+
+    def _record(self, catalog_id, position):
+        """Unpack the table record of the prize at a position of a catalog."""
+        return RECORD.unpack_from(self.view, self.directory[catalog_id][2] + position * RECORD.size)
+
+    def prize_at(self, catalog_id, position, make_prize):
+        """Decode the prize at a position of a catalog with make_prize."""
+        prize_id, string_offset, title_length, description_length, image_length = self._record(catalog_id, position)
+        start = self.directory[catalog_id][1] + string_offset
+        title_end = start + title_length
+        description_end = title_end + description_length
+        return make_prize(
+            prize_id,
+            str(self.view[start:title_end], "utf-8"),
+            str(self.view[title_end:description_end], "utf-8"),
+            str(self.view[description_end:description_end + image_length], "utf-8"),
+        )
+
+    def position(self, catalog_id, prize_id):
+        """Return the position of the first prize of a catalog with an ID greater than or equal to prize_id."""
+        return bisect_left(range(self.prize_count(catalog_id)), prize_id, key=lambda position: self._record(catalog_id, position)[0])
+
+    def prize_id_at(self, catalog_id, position):
+        """Return the ID of the prize at a position of a catalog."""
+        return self._record(catalog_id, position)[0]
+
+    def search_field(self, catalog_id, field, text, start=0):
+        """
+        Yield the positions, from start on, of the prizes of a catalog whose title, description or image contains text.
+        The string heap is scanned directly in its UTF-8 encoding, where a substring match is the same as on decoded text.
+        """
+        field_index = STRING_FIELDS.index(field)
+        prize_count, heap_offset, table_offset = self.directory[catalog_id]
+        if not text:
+            yield from range(start, prize_count)
+            return
+
+        needle = text.encode()
+        pattern = re.compile(re.escape(needle))
+        string_start = lambda position: self._record(catalog_id, position)[1]
+        position = start
+        scan_from = heap_offset + string_start(start) if start < prize_count else table_offset
+
+        while position < prize_count:
+            match = pattern.search(self.view, scan_from, table_offset)
+            if match is None:
+                return
+            found = match.start() - heap_offset
+            position = bisect_right(range(prize_count), found, lo=position, key=string_start) - 1
+            record = self._record(catalog_id, position)
+            lengths = record[2:]
+            field_start = record[1] + sum(lengths[:field_index])
+            if field_start <= found and found + len(needle) <= field_start + lengths[field_index]:
+                yield position
+                position += 1
+                scan_from = heap_offset + string_start(position) if position < prize_count else table_offset
+            else:
+                scan_from = heap_offset + found + 1  # The match lies in another field: look further on
+
+    def sorted_positions(self, catalog_id, field):
+        """
+        Return the positions of the prizes of a catalog ordered by a title, description or image field, ties ordered by ID.
+        A snapshot never changes, so the order is computed once, from the UTF-8 strings, which sort like the decoded text.
+        """
+        positions = self.sort_orders.get((catalog_id, field))
+        if positions is None:
+            prize_count, heap_offset, table_offset = self.directory[catalog_id]
+            field_index = STRING_FIELDS.index(field)
+            view = self.view
+            keys = []
+            records = RECORD.iter_unpack(view[table_offset:table_offset + prize_count * RECORD.size])
+            for position, (prize_id, string_offset, *lengths) in enumerate(records):
+                start = heap_offset + string_offset + sum(lengths[:field_index])
+                keys.append((bytes(view[start:start + lengths[field_index]]), prize_id, position))
+            keys.sort()
+            positions = self.sort_orders[(catalog_id, field)] = array("Q", [key[2] for key in keys])
+        return positions
+
+    def iter_batches(self, catalog_id, make_prize, batch_size=10000):
+        """Yield the prizes of a catalog in ID order, in lists of at most batch_size prizes built with make_prize."""
+        prize_count, heap_offset, table_offset = self.directory[catalog_id]
+        view = self.view
+
+        for batch_start in range(0, prize_count, batch_size):
+            batch_end = min(batch_start + batch_size, prize_count)
+            records = RECORD.iter_unpack(view[table_offset + batch_start * RECORD.size:table_offset + batch_end * RECORD.size])
+            batch = []
+            for prize_id, string_offset, title_length, description_length, image_length in records:
+                start = heap_offset + string_offset
+                title_end = start + title_length
+                description_end = title_end + description_length
+                batch.append(make_prize(
+                    prize_id,
+                    str(view[start:title_end], "utf-8"),
+                    str(view[title_end:description_end], "utf-8"),
+                    str(view[description_end:description_end + image_length], "utf-8"),
+                ))
+            yield batch
@@ -0,0 +1,86 @@
+# sort_index.py - Sorted indexes for ordered prize listings
+# This module keeps the prizes of a catalog sorted by a field, updated with bisect as prizes change,
+# so a page of a sorted listing is read straight from the index instead of sorting the catalog.
+
+# Authors: Edoardo Sabatini - Data Worker and ChatGPT 3.5 Python Programmer
+# Date: May 22, 2024
+
+from bisect import bisect_left, insort
+from operator import attrgetter
+
+SORT_FIELDS = ("id", "title", "description", "image")  # Fields a listing can be sorted by
+
+def parse_sort(sort_param):
+    """
+    Parse a sort parameter such as "title" or "-id" into a (field, descending) tuple.
+    Returns None for the default ID order, or False if the parameter is invalid.
+    """
+    if not sort_param:
+        return None
+    descending = sort_param.startswith("-")
+    field = sort_param[1:] if descending else sort_param
+    if field not in SORT_FIELDS:
+        return False
+    return None if (field, descending) == ("id", False) else (field, descending)
+
+class SortedIndex:
+    """The (value, prize ID) keys of a catalog sorted by one field; ties are ordered by ID."""
+    def __init__(self, field, prizes=()):
+        self.field = field
+        self.value = attrgetter(field)
+        self.keys = sorted((self.value(prize), prize.id) for prize in prizes)
+
+    def key(self, prize):
+        """Return the key of a prize in the index."""
+        return self.value(prize), prize.id
+
+    def add(self, prize):
+        """Insert the key of a new prize. A key that can't be compared raises before the index changes."""
+        insort(self.keys, self.key(prize))
+
+    def remove(self, prize):
+        """Remove the key of a deleted prize."""
+        key = self.key(prize)
+        position = bisect_left(self.keys, key)
+        if position < len(self.keys) and self.keys[position] == key:
+            del self.keys[position]
+
+    def replace(self, old, new):
+        """
+        Move the key of an updated prize in one step. The new position is found before the old key is removed,
+        so a key that can't be compared raises before the index changes.
+        """
+        old_key, new_key = self.key(old), self.key(new)
+        new_position = bisect_left(self.keys, new_key)
+        old_position = bisect_left(self.keys, old_key)
+        if old_position < len(self.keys) and self.keys[old_position] == old_key:
+            del self.keys[old_position]
+            if new_position > old_position:
+                new_position -= 1
+        self.keys.insert(new_position, new_key)
+
+class OrderedView:
+    """
+    A sliceable view of a sequence in ascending or descending order, with each item resolved to a prize,
+    so the page stage can slice a page out of a sort order without copying or sorting it.
+    """
+    def __init__(self, items, descending=False, resolve=None):
+        self.items = items
+        self.descending = descending
+        self.resolve = resolve
+
+    def __len__(self):
+        return len(self.items)
+
+    def __iter__(self):
+        items = reversed(self.items) if self.descending else iter(self.items)
+        return map(self.resolve, items) if self.resolve else items
+
+    def __getitem__(self, item):
+        start, stop, _ = item.indices(len(self.items))  # Pages are contiguous slices
+        if self.descending:
+            size = len(self.items)
+            selected = self.items[size - stop:size - start][::-1] if start < stop else []
+        else:
+            selected = self.items[start:stop]
+        return list(map(self.resolve, selected)) if self.resolve else list(selected)
@@ -0,0 +1,442 @@
+# sqlite_storage.py - SQLite storage engine for the prize database
+# This module stores catalogs and prizes in a SQLite database file, so data survives restarts
+# and is not bounded by the memory of one process. Filters and pagination run inside SQLite.
+
+# Authors: Edoardo Sabatini - Data Worker and ChatGPT 3.5 Python Programmer
+# Date: May 22, 2024
+
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from operator import attrgetter
+from data_simulation import Prize, PrizeDetails
+from query_planner import compile_filter
+from sort_index import SORT_FIELDS
+from storage import PrizeStore
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS clock (
+    value INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS catalogs (
+    id INTEGER PRIMARY KEY,
+    version INTEGER NOT NULL,
+    next_prize_id INTEGER NOT NULL DEFAULT 1
+);
+CREATE TABLE IF NOT EXISTS free_catalog_ids (
+    id INTEGER PRIMARY KEY
+);
+CREATE TABLE IF NOT EXISTS prizes (
+    catalog_id INTEGER NOT NULL,
+    id INTEGER NOT NULL,
+    title TEXT NOT NULL,
+    description TEXT NOT NULL,
+    image TEXT NOT NULL,
+    PRIMARY KEY (catalog_id, id)
+) WITHOUT ROWID;
+-- Sorted listings walk these indexes; they end with the primary key, so ties are ordered by ID
+CREATE INDEX IF NOT EXISTS prizes_by_title ON prizes (catalog_id, title);
+CREATE INDEX IF NOT EXISTS prizes_by_description ON prizes (catalog_id, description);
+CREATE INDEX IF NOT EXISTS prizes_by_image ON prizes (catalog_id, image);
+"""
+
+PRIZE_COLUMNS = "id, title, description, image"
+ITER_CHUNK_SIZE = 1000  # Number of prizes fetched per query when iterating over a catalog
+
+class ConnectionPool:
+    """Hands out one SQLite connection per thread, opened on first use and reused afterwards."""
+    def __init__(self, path, cached_statements=256):
+        self.path = path
+        self.cached_statements = cached_statements  # Size of each connection's prepared statement cache
+        self.local = threading.local()
+        self.connections = []
+        self.lock = threading.Lock()
+
+    def connection(self):
+        """Return the connection of the calling thread."""
+        connection = getattr(self.local, "connection", None)
+        if connection is None:
+            # Autocommit mode: transactions are opened explicitly by SQLitePrizeStore.transaction
+            connection = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False,
+                                         cached_statements=self.cached_statements)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self.local.connection = connection
+            with self.lock:
+                self.connections.append(connection)
+        return connection
+
+    def close(self):
+        """Close every connection opened by the pool."""
+        with self.lock:
+            for connection in self.connections:
+                connection.close()
+            self.connections.clear()
+        self.local = threading.local()
+
+class SQLitePrizeStore(PrizeStore):
+    """Prize storage engine backed by a SQLite database file, seeded with mock data when created."""
+    def __init__(self, path, num_catalogs=5, prizes_per_catalog=10):
+        started = time.perf_counter()
+        self.pool = ConnectionPool(path)
+        connection = self.pool.connection()
+        connection.executescript(SCHEMA)
+        if "next_prize_id" not in [row[1] for row in connection.execute("PRAGMA table_info(catalogs)")]:
+            self.migrate_id_allocation()
+        with self.transaction() as connection:
+            if connection.execute("SELECT COUNT(*) FROM clock").fetchone()[0] == 0:
+                # A new database: seed the version clock with the current time so versions are not reused by a new database,
+                # then the mock data, in the same transaction. Deleting every catalog later doesn't bring the mock data back.
+                connection.execute("INSERT INTO clock (value) VALUES (?)", (time.time_ns() // 1000,))
+                if connection.execute("SELECT COUNT(*) FROM catalogs").fetchone()[0] == 0:  # Older databases without a clock keep their data
+                    self.seed_mock_data(connection, num_catalogs, prizes_per_catalog)
+        self.startup_seconds = time.perf_counter() - started
+
+    def seed_mock_data(self, connection, num_catalogs, prizes_per_catalog):
+        """Insert the same mock catalogs and prizes as the in-memory storage, in batches, within the caller's transaction."""
+        for catalog_id in range(1, num_catalogs + 1):
+            connection.execute("INSERT INTO catalogs (id, version) VALUES (?, 0)", (catalog_id,))
+            connection.execute("DELETE FROM free_catalog_ids WHERE id = ?", (catalog_id,))  # Freed by a deleted catalog
+            self._bump_version(connection, catalog_id)
+            for batch in Prize.generate_mock_batches(catalog_id, prizes_per_catalog):
+                connection.executemany(
+                    "INSERT INTO prizes (catalog_id, id, title, description, image) VALUES (?, ?, ?, ?, ?)",
+                    [(catalog_id, prize.id, prize.title, prize.description, prize.image) for prize in batch]
+                )
+                connection.execute("UPDATE catalogs SET next_prize_id = ? WHERE id = ?", (batch[-1].id + 1, catalog_id))
+
+    def migrate_id_allocation(self):
+        """Add the ID allocation state to a database created before it existed."""
+        with self.transaction() as connection:
+            connection.execute("ALTER TABLE catalogs ADD COLUMN next_prize_id INTEGER NOT NULL DEFAULT 1")
+            connection.execute(
+                "UPDATE catalogs SET next_prize_id = COALESCE((SELECT MAX(id) FROM prizes WHERE catalog_id = catalogs.id), 0) + 1"
+            )
+            used_ids = {row[0] for row in connection.execute("SELECT id FROM catalogs")}
+            connection.executemany(
+                "INSERT INTO free_catalog_ids (id) VALUES (?)",
+                [(catalog_id,) for catalog_id in range(1, max(used_ids, default=0)) if catalog_id not in used_ids]
+            )
+
+    def close(self):
+        """Close all pooled connections."""
+        self.pool.close()
+
+    @contextmanager
+    def transaction(self):
+        """Run the enclosed statements in one write transaction on the calling thread's connection."""
+        connection = self.pool.connection()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            yield connection
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        connection.execute("COMMIT")
+
+    @staticmethod
+    def _bump_version(connection, catalog_id):
+        """Give a catalog a new version from the database clock after a mutation."""
+        connection.execute("UPDATE clock SET value = value + 1")
+        connection.execute("UPDATE catalogs SET version = (SELECT value FROM clock) WHERE id = ?", (catalog_id,))
+
+    @staticmethod
+    def _where(filter):
+        """
+        Translate a filter dictionary into an SQL condition appended to the catalog condition and its parameters.
+        Returns None when the filter can't match anything.
+        """
+        if not filter:
+            return "", []
+
+        query = compile_filter(filter)
+        if query is None:
+            return None
+
+        # Conditions come from the planner in the order that short-circuits soonest; text fields are whitelisted there
+        conditions = sorted(query.conditions, key=attrgetter("likelihood"), reverse=not query.match_all)
+        clauses = ["id = ?" if condition.field == "id" else f"instr({condition.field}, ?) > 0" for condition in conditions]  # Case-sensitive substring match
+        joiner = " AND " if query.match_all else " OR "
+        return f" AND ({joiner.join(clauses)})", [condition.value for condition in conditions]
+
+    @staticmethod
+    def _order_by(sort):
+        """Translate a (field, descending) sort into an ORDER BY clause, ties ordered by ID in the same direction."""
+        if sort is None:
+            return "id"
+        field, descending = sort
+        if field not in SORT_FIELDS:
+            raise ValueError(f"Prizes can't be sorted by {field}")
+        direction = " DESC" if descending else ""
+        return f"id{direction}" if field == "id" else f"{field}{direction}, id{direction}"
+
+    def _has_prizes(self, connection, catalog_id):
+        """Check whether a catalog holds at least one prize."""
+        row = connection.execute("SELECT 1 FROM prizes WHERE catalog_id = ? LIMIT 1", (catalog_id,)).fetchone()
+        return row is not None
+
+    # Catalogs
+
+    def catalog_ids(self):
+        """Return the IDs of all catalogs."""
+        rows = self.pool.connection().execute("SELECT id FROM catalogs ORDER BY id")
+        return [row[0] for row in rows]
+
+    def has_catalog(self, catalog_id):
+        """Check whether the specified catalog exists."""
+        return self.catalog_version(catalog_id) is not None
+
+    def create_catalog(self, catalog_id):
+        """Create a new catalog."""
+        with self.transaction() as connection:
+            created = self._insert_catalog(connection, catalog_id)
+        return created
+
+    def allocate_catalog(self):
+        """Create a new catalog with the lowest freed ID, or above the highest ID in use if none was freed."""
+        with self.transaction() as connection:
+            while True:
+                catalog_id = connection.execute(
+                    "SELECT MIN(id) FROM (SELECT MIN(id) AS id FROM free_catalog_ids UNION ALL SELECT COALESCE(MAX(id), 0) + 1 FROM catalogs)"
+                ).fetchone()[0]
+                if self._insert_catalog(connection, catalog_id):
+                    return catalog_id
+                # A stale free ID of a catalog that exists: drop it and try the next candidate
+                connection.execute("DELETE FROM free_catalog_ids WHERE id = ?", (catalog_id,))
+
+    def _insert_catalog(self, connection, catalog_id):
+        """Insert a catalog if it doesn't exist yet, keeping the free IDs in sync. Returns whether it was inserted."""
+        highest_id = connection.execute("SELECT COALESCE(MAX(id), 0) FROM catalogs").fetchone()[0]
+        if not connection.execute("INSERT OR IGNORE INTO catalogs (id, version) VALUES (?, 0)", (catalog_id,)).rowcount:
+            return False
+        # IDs skipped above the highest catalog become free, like IDs of deleted catalogs
+        connection.executemany("INSERT OR IGNORE INTO free_catalog_ids (id) VALUES (?)",
+                               [(skipped_id,) for skipped_id in range(highest_id + 1, catalog_id)])
+        connection.execute("DELETE FROM free_catalog_ids WHERE id = ?", (catalog_id,))
+        self._bump_version(connection, catalog_id)
+        return True
+
+    def delete_catalog(self, catalog_id):
+        """Delete a catalog and its prizes."""
+        with self.transaction() as connection:
+            deleted = connection.execute("DELETE FROM catalogs WHERE id = ?", (catalog_id,)).rowcount
+            connection.execute("DELETE FROM prizes WHERE catalog_id = ?", (catalog_id,))
+            if deleted:
+                connection.execute("INSERT OR IGNORE INTO free_catalog_ids (id) VALUES (?)", (catalog_id,))
+        return deleted == 1
+
+    @staticmethod
+    def _allocate_prize_ids(connection, catalog_id, count=1):
+        """Take count IDs from the prize ID sequence of a catalog and return the first one."""
+        return connection.execute(
+            "UPDATE catalogs SET next_prize_id = next_prize_id + ? WHERE id = ? RETURNING next_prize_id - ?", (count, catalog_id, count)
+        ).fetchone()[0]
+
+    def catalog_version(self, catalog_id):
+        """Return the current version of the specified catalog."""
+        row = self.pool.connection().execute("SELECT version FROM catalogs WHERE id = ?", (catalog_id,)).fetchone()
+        return None if row is None else row[0]
+
+    def next_prize_id(self, catalog_id):
+        """Return the next prize ID of the specified catalog."""
+        row = self.pool.connection().execute("SELECT next_prize_id FROM catalogs WHERE id = ?", (catalog_id,)).fetchone()
+        return None if row is None else row[0]
+
+    # Queries
+
+    def find_prizes(self, catalog_id, filter=None, pagination=None, with_total=True, sort=None):
+        """Retrieve one page of matching prizes, filtered, ordered and paginated by SQLite."""
+        connection = self.pool.connection()
+        if not self._has_prizes(connection, catalog_id):
+            return None
+
+        where = self._where(filter)
+        if where is None:
+            return [], 0 if with_total else None
+        condition, params = where
+
+        limit, offset = -1, 0
+        if pagination and pagination.get('per_page'):
+            limit = int(pagination['per_page'])
+            offset = (int(pagination.get('page', 1)) - 1) * limit
+
+        rows = connection.execute(
+            f"SELECT {PRIZE_COLUMNS} FROM prizes WHERE catalog_id = ?{condition} ORDER BY {self._order_by(sort)} LIMIT ? OFFSET ?",
+            [catalog_id, *params, limit, offset]
+        )
+        prizes = [PrizeDetails(*row) for row in rows]
+        if not with_total:
+            return prizes, None
+
+        total = connection.execute(f"SELECT COUNT(*) FROM prizes WHERE catalog_id = ?{condition}", [catalog_id, *params]).fetchone()[0]
+        return prizes, total
+
+    def explain_prizes(self, catalog_id, filter=None, pagination=None, with_total=True, sort=None):
+        """
+        Run find_prizes and describe how SQLite answers the filter, from EXPLAIN QUERY PLAN.
+        SQLite does not report the rows it examines, so rows_examined is None.
+        """
+        result = self.find_prizes(catalog_id, filter, pagination, with_total, sort)
+        if result is None:
+            return None
+
+        plan = {"access_path": "none", "index_conditions": [], "residual": None, "rows_examined": None, "query_plan": []}
+        where = self._where(filter)
+        if where is not None:
+            condition, params = where
+            plan["access_path"] = "sqlite"
+            plan["query_plan"] = [row[3] for row in self.pool.connection().execute(
+                f"EXPLAIN QUERY PLAN SELECT {PRIZE_COLUMNS} FROM prizes WHERE catalog_id = ?{condition} ORDER BY {self._order_by(sort)}",
+                [catalog_id, *params]
+            )]
+            if filter:
+                query = compile_filter(filter)
+                plan["residual"] = (" AND " if query.match_all else " OR ").join(term.describe() for term in query.conditions)
+        return (*result, plan)
+
+    def find_prizes_after(self, catalog_id, filter=None, after_id=None, per_page=10):
+        """Retrieve the page of matching prizes that follows the prize after_id, seeking on the primary key."""
+        connection = self.pool.connection()
+        if not self._has_prizes(connection, catalog_id):
+            return None
+
+        page = self._page_after(connection, catalog_id, filter, after_id, per_page + 1)  # One extra prize tells whether another page follows
+        if len(page) <= per_page:
+            return page, None
+        return page[:per_page], page[per_page - 1].id
+
+    def _page_after(self, connection, catalog_id, filter, after_id, limit):
+        """Return up to limit matching prizes with an ID greater than after_id."""
+        where = self._where(filter)
+        if where is None:
+            return []
+        condition, params = where
+        rows = connection.execute(
+            f"SELECT {PRIZE_COLUMNS} FROM prizes WHERE catalog_id = ? AND id > ?{condition} ORDER BY id LIMIT ?",
+            [catalog_id, after_id if after_id is not None else 0, *params, limit]
+        )
+        return [PrizeDetails(*row) for row in rows]
+
+    def iter_prizes(self, catalog_id, filter=None):
+        """Return a lazy iterator over every matching prize, fetched in keyset chunks."""
+        if not self._has_prizes(self.pool.connection(), catalog_id):
+            return None
+
+        def generate():
+            after_id = None
+            while True:
+                # Each chunk takes the connection of the thread consuming the iterator
+                chunk = self._page_after(self.pool.connection(), catalog_id, filter, after_id, ITER_CHUNK_SIZE)
+                yield from chunk
+                if len(chunk) < ITER_CHUNK_SIZE:
+                    return
+                after_id = chunk[-1].id
+
+        return generate()
+
+    # Single prizes
+
+    def get_prize(self, catalog_id, prize_id):
+        """Get a specific prize from the specified catalog."""
+        row = self.pool.connection().execute(
+            f"SELECT {PRIZE_COLUMNS} FROM prizes WHERE catalog_id = ? AND id = ?", (catalog_id, prize_id)
+        ).fetchone()
+        return None if row is None else PrizeDetails(*row)
+
+    def create_prize(self, catalog_id, prize_data):
+        """Create a new prize in the specified catalog. Returns None if the catalog doesn't exist."""
+        with self.transaction() as connection:
+            if connection.execute("SELECT 1 FROM catalogs WHERE id = ?", (catalog_id,)).fetchone() is None:
+                return None
+            new_id = self._allocate_prize_ids(connection, catalog_id)
+            new_prize = PrizeDetails(new_id, prize_data['title'], prize_data['description'], prize_data['image'])
+            self._insert(connection, catalog_id, [new_prize])
+            self._bump_version(connection, catalog_id)
+        return new_prize
+
+    @staticmethod
+    def _insert(connection, catalog_id, prizes):
+        """Insert a list of prizes into a catalog."""
+        connection.executemany(
+            "INSERT INTO prizes (catalog_id, id, title, description, image) VALUES (?, ?, ?, ?, ?)",
+            [(catalog_id, prize.id, prize.title, prize.description, prize.image) for prize in prizes]
+        )
+
+    def update_prize(self, catalog_id, prize_id, existing_prize):
+        """Update an existing prize in the specified catalog."""
+        with self.transaction() as connection:
+            updated = connection.execute(
+                "UPDATE prizes SET title = ?, description = ?, image = ? WHERE catalog_id = ? AND id = ?",
+                (existing_prize.title, existing_prize.description, existing_prize.image, catalog_id, prize_id)
+            ).rowcount
+            if not updated:
+                return None
+            self._bump_version(connection, catalog_id)
+        return PrizeDetails(prize_id, existing_prize.title, existing_prize.description, existing_prize.image)
+
+    def delete_prize(self, catalog_id, prize_id):
+        """Delete a prize from the specified catalog."""
+        with self.transaction() as connection:
+            deleted = connection.execute("DELETE FROM prizes WHERE catalog_id = ? AND id = ?", (catalog_id, prize_id)).rowcount
+            if deleted:
+                self._bump_version(connection, catalog_id)
+        return deleted == 1
+
+    def apply_batch(self, catalog_id, operations):
+        """Apply a batch of operations in one transaction, inserting and deleting with one statement each."""
+        with self.transaction() as connection:
+            if connection.execute("SELECT 1 FROM catalogs WHERE id = ?", (catalog_id,)).fetchone() is None:
+                return None
+
+            creations = sum(1 for operation in operations if operation['op'] == 'create')
+            next_id = self._allocate_prize_ids(connection, catalog_id, creations) if creations else None
+            created = {}  # Prizes created by this batch, inserted at the end
+            deleted = set()  # IDs deleted by this batch, deleted at the end
+            outcomes = []
+
+            for operation in operations:
+                op = operation['op']
+                if op == 'create':
+                    fields = operation['prize']
+                    new_prize = PrizeDetails(next_id, fields['title'], fields['description'], fields['image'])
+                    created[next_id] = new_prize
+                    next_id += 1
+                    outcomes.append(new_prize)
+                    continue
+
+                prize_id = operation['id']
+                target = created.get(prize_id)
+                if target is None and prize_id not in deleted:
+                    row = connection.execute(
+                        f"SELECT {PRIZE_COLUMNS} FROM prizes WHERE catalog_id = ? AND id = ?", (catalog_id, prize_id)
+                    ).fetchone()
+                    target = None if row is None else PrizeDetails(*row)
+
+                if target is None:
+                    outcomes.append(None)
+                elif op == 'delete':
+                    if prize_id in created:
+                        del created[prize_id]
+                    else:
+                        deleted.add(prize_id)
+                    outcomes.append(True)
+                else:
+                    fields = operation['prize']
+                    target = PrizeDetails(prize_id, fields.get('title', target.title),
+                                          fields.get('description', target.description), fields.get('image', target.image))
+                    if prize_id in created:
+                        created[prize_id] = target
+                    else:
+                        connection.execute(
+                            "UPDATE prizes SET title = ?, description = ?, image = ? WHERE catalog_id = ? AND id = ?",
+                            (target.title, target.description, target.image, catalog_id, prize_id)
+                        )
+                    outcomes.append(target)
+
+            if deleted:
+                connection.executemany("DELETE FROM prizes WHERE catalog_id = ? AND id = ?", [(catalog_id, prize_id) for prize_id in deleted])
+            if created:
+                self._insert(connection, catalog_id, created.values())
+            self._bump_version(connection, catalog_id)
+        return outcomes
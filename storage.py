@@ -0,0 +1,102 @@
+# storage.py - Storage interface for the prize database
+# This module defines the operations every prize storage engine provides to the API,
+# so the in-memory catalogs and the SQLite engine can be swapped through configuration.
+
+# Authors: Edoardo Sabatini - Data Worker and ChatGPT 3.5 Python Programmer
+# Date: May 22, 2024
+
+from abc import ABC, abstractmethod
+
+class PrizeStore(ABC):
+    """Interface of a prize storage engine, as used by the API."""
+
+    # Catalogs
+
+    @abstractmethod
+    def catalog_ids(self):
+        """Return the IDs of all catalogs."""
+
+    @abstractmethod
+    def has_catalog(self, catalog_id):
+        """Check whether the specified catalog exists."""
+
+    @abstractmethod
+    def create_catalog(self, catalog_id):
+        """Create a new, empty catalog. Returns False if it already exists."""
+
+    @abstractmethod
+    def allocate_catalog(self):
+        """Create a new, empty catalog with the lowest free ID and return that ID."""
+
+    @abstractmethod
+    def delete_catalog(self, catalog_id):
+        """Delete a catalog and its prizes. Returns False if it doesn't exist."""
+
+    @abstractmethod
+    def catalog_version(self, catalog_id):
+        """Return the current version of a catalog, which changes with every mutation, or None if it doesn't exist."""
+
+    @abstractmethod
+    def next_prize_id(self, catalog_id):
+        """Return the ID the next prize created in a catalog will get, or None if the catalog doesn't exist."""
+
+    # Queries
+
+    @abstractmethod
+    def find_prizes(self, catalog_id, filter=None, pagination=None, with_total=True, sort=None):
+        """
+        Retrieve one page of matching prizes and, if with_total is set, the total number of matches.
+        Prizes are in ID order, or ordered by a (field, descending) sort, ties in ID order in the same direction.
+        Returns a (prizes, total) tuple, or None if the catalog has no prizes.
+        """
+
+    @abstractmethod
+    def explain_prizes(self, catalog_id, filter=None, pagination=None, with_total=True, sort=None):
+        """
+        Run find_prizes and describe how the filter was answered: the access path, the index conditions,
+        the residual conditions and the rows examined. Returns a (prizes, total, plan) tuple, or None if the catalog has no prizes.
+        """
+
+    @abstractmethod
+    def find_prizes_after(self, catalog_id, filter=None, after_id=None, per_page=10):
+        """
+        Retrieve the page of matching prizes that follows the prize after_id.
+        Returns a (prizes, next_after_id) tuple, or None if the catalog has no prizes.
+        """
+
+    @abstractmethod
+    def iter_prizes(self, catalog_id, filter=None):
+        """Return a lazy iterator over every matching prize, or None if the catalog has no prizes."""
+
+    def get_prizes(self, catalog_id, filter=None, pagination=None):
+        """Retrieve prizes from the specified catalog, applying filters and pagination if provided."""
+        result = self.find_prizes(catalog_id, filter, pagination, with_total=False)
+        return None if result is None else result[0]
+
+    # Single prizes
+
+    @abstractmethod
+    def get_prize(self, catalog_id, prize_id):
+        """Get a specific prize, or None if it doesn't exist."""
+
+    @abstractmethod
+    def create_prize(self, catalog_id, prize_data):
+        """
+        Create a new prize from a dictionary with a title, a description and an image. Prize IDs of a catalog are never reused.
+        Returns None if the catalog doesn't exist: catalogs are only created by create_catalog and allocate_catalog.
+        """
+
+    @abstractmethod
+    def update_prize(self, catalog_id, prize_id, existing_prize):
+        """Copy the details of existing_prize onto the stored prize. Returns the updated prize or None."""
+
+    @abstractmethod
+    def delete_prize(self, catalog_id, prize_id):
+        """Delete a prize. Returns False if it doesn't exist."""
+
+    @abstractmethod
+    def apply_batch(self, catalog_id, operations):
+        """
+        Apply a batch of create, update and delete operations, in order.
+        Returns one outcome per operation, or None if the catalog doesn't exist.
+        """
@@ -29,7 +29,7 @@ def test_prizes_filtered_by_description_pagination():
     response = requests.get(f'{BASE_URL}/2/prizes?filter={{"description":"prize"}}&pagination={{"page":1,"per_page":1}}')
     assert response.status_code == 200
     data = response.json()
-    assert data["total"] == 1
+    assert data["total"] == 10
     assert len(data["prizes"]) == 1
 
 def test_prizes_filtered_by_description_pagination_4_results():
@@ -40,7 +40,7 @@ def test_prizes_filtered_by_description_pagination_4_results():
     response = requests.get(f'{BASE_URL}/3/prizes?filter={{"description":"prize"}}&pagination={{"page":1,"per_page":4}}')
     assert response.status_code == 200
     data = response.json()
-    assert data["total"] == 4
+    assert data["total"] == 10
     assert len(data["prizes"]) <= 4
 
 def test_prizes_filtered_by_description_pagination_page_2():
@@ -51,7 +51,7 @@ def test_prizes_filtered_by_description_pagination_page_2():
     response = requests.get(f'{BASE_URL}/3/prizes?filter={{"description":"prize"}}&pagination={{"page":2,"per_page":4}}')
     assert response.status_code == 200
     data = response.json()
-    assert data["total"] == 4
+    assert data["total"] == 10
     assert len(data["prizes"]) <= 4
 
 def test_prizes_filtered_by_description_pagination_page_3():
@@ -62,7 +62,7 @@ def test_prizes_filtered_by_description_pagination_page_3():
     response = requests.get(f'{BASE_URL}/3/prizes?filter={{"description":"prize"}}&pagination={{"page":3,"per_page":4}}')
     assert response.status_code == 200
     data = response.json()
-    assert data["total"] == 2
+    assert data["total"] == 10
     assert len(data["prizes"]) <= 4
 
 def test_prizes_filtered_by_description_hello():
@@ -84,7 +84,7 @@ def test_prizes_filtered_by_description_script():
     response = requests.get(f'{BASE_URL}/1/prizes?filter={{"description":"script"}}&pagination={{"page":1,"per_page":5}}')
     assert response.status_code == 200
     data = response.json()
-    assert data["total"] == 5
+    assert data["total"] == 10
     assert len(data["prizes"]) == 5
 
 def test_prizes_filtered_by_id_1():
@@ -106,7 +106,7 @@ def test_prizes_filtered_by_id_2_and_description_script():
     response = requests.get(f'{BASE_URL}/1/prizes?filter={{"id":"2","description":"script"}}&pagination={{"page":1,"per_page":5}}')
     assert response.status_code == 200
     data = response.json()
-    assert data["total"] == 5
+    assert data["total"] == 10
     assert len(data["prizes"]) == 5
 
 def test_prizes_filtered_by_id_2_and_description_hello():
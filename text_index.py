@@ -0,0 +1,69 @@
+# text_index.py - Inverted n-gram index for substring search
+# This module provides an inverted index from character n-grams to prize IDs,
+# used to answer description substring filters without scanning a whole catalog.
+
+# Authors: Edoardo Sabatini - Data Worker and ChatGPT 3.5 Python Programmer
+# Date: May 22, 2024
+
+NGRAM_SIZE = 3  # Length of the indexed n-grams; shorter queries can't use the index
+
+class NgramIndex:
+    """Maps every character n-gram of a text to the set of document IDs containing it."""
+    def __init__(self, n=NGRAM_SIZE):
+        self.n = n
+        self.postings = {}  # Dictionary mapping each n-gram to a set of document IDs
+
+    def grams(self, text):
+        """Return the distinct n-grams of the given text."""
+        n = self.n
+        return {text[i:i + n] for i in range(len(text) - n + 1)}
+
+    def add(self, doc_id, text):
+        """Index a document under every n-gram of its text."""
+        self.add_grams(doc_id, self.grams(text))
+
+    def add_grams(self, doc_id, grams):
+        """Index a document under n-grams worked out beforehand with grams()."""
+        postings = self.postings
+        for gram in grams:
+            posting = postings.get(gram)
+            if posting is None:
+                postings[gram] = {doc_id}
+            else:
+                posting.add(doc_id)
+
+    def remove(self, doc_id, text):
+        """Remove a document from the posting lists of every n-gram of its text."""
+        self.remove_grams(doc_id, self.grams(text))
+
+    def remove_grams(self, doc_id, grams):
+        """Remove a document from the posting lists of n-grams worked out beforehand with grams()."""
+        postings = self.postings
+        for gram in grams:
+            posting = postings.get(gram)
+            if posting is None:
+                continue
+            posting.discard(doc_id)
+            if not posting:
+                del postings[gram]
+
+    def candidates(self, query):
+        """
+        Return the sorted IDs of the documents that may contain the query,
+        or None if the query is shorter than n and cannot use the index.
+        Candidates still have to be verified against the actual text.
+        """
+        if len(query) < self.n:
+            return None
+
+        posting_lists = []
+        for gram in self.grams(query):
+            posting = self.postings.get(gram)
+            if not posting:
+                return []  # One n-gram never occurs, so nothing can match
+            posting_lists.append(posting)
+
+        # Intersect starting from the most selective posting list
+        posting_lists.sort(key=len)
+        result = posting_lists[0].intersection(*posting_lists[1:])
+        return sorted(result)